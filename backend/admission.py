@@ -0,0 +1,209 @@
+import json
+import math
+import os
+import time
+from urllib.parse import parse_qs
+
+# Admission settings. Rates are requests per minute per client, with bursts of up to `burst`
+# requests; concurrency limits are per worker process.
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") == "1"
+ADMISSION_PROXY_HOPS = int(os.getenv("ADMISSION_PROXY_HOPS", "0"))        # trusted proxies appending to X-Forwarded-For
+ADMISSION_MAX_CLIENTS = int(os.getenv("ADMISSION_MAX_CLIENTS", "50000"))  # buckets kept before idle ones are dropped
+
+RATE_LIMITS = {
+    # class: (requests per minute, burst)
+    "search": (float(os.getenv("RATE_SEARCH_PER_MINUTE", "60")), int(os.getenv("RATE_SEARCH_BURST", "20"))),
+    "login": (float(os.getenv("RATE_LOGIN_PER_MINUTE", "10")), int(os.getenv("RATE_LOGIN_BURST", "5"))),
+    "upload": (float(os.getenv("RATE_UPLOAD_PER_MINUTE", "30")), int(os.getenv("RATE_UPLOAD_BURST", "10"))),
+    "write": (float(os.getenv("RATE_WRITE_PER_MINUTE", "60")), int(os.getenv("RATE_WRITE_BURST", "20"))),
+}
+CONCURRENCY_LIMITS = {
+    # class: requests served at once; more are shed with 503 instead of queuing for a DB thread
+    "search": int(os.getenv("CONCURRENCY_SEARCH", "8")),
+    "login": int(os.getenv("CONCURRENCY_LOGIN", "8")),
+    "upload": int(os.getenv("CONCURRENCY_UPLOAD", "4")),
+    "write": int(os.getenv("CONCURRENCY_WRITE", "16")),
+}
+# Classes whose tokens are only spent by these responses: a correct password costs nothing, so
+# users sharing one NAT address are not locked out by each other's logins
+CHARGED_STATUSES = {"login": {401}}
+SHED_RETRY_AFTER = 1   # seconds clients are told to wait after a 503
+
+
+def request_class(method, path, query_string):
+    """Which budget a request draws from, and whether it costs a rate-limit token.
+
+    Returns (class, rated) or (None, False) for requests that are not limited. Upload chunks
+    and finalize calls only count against concurrency: one file is many chunks.
+    """
+    if method == "GET":
+        if path in ("/posts", "/posts/facets") and b"search=" in query_string:
+            if any(value.strip() for value in parse_qs(query_string.decode("latin-1")).get("search", [])):
+                return "search", True
+        return None, False
+    if method not in ("POST", "PUT", "PATCH", "DELETE"):
+        return None, False
+    if path == "/auth/login":
+        return "login", True
+    if path == "/upload" or path.startswith("/upload/"):
+        return "upload", method == "POST" and path in ("/upload", "/upload/sessions")
+    return "write", True
+
+
+def client_key(scope):
+    """The client's address: the peer's, or behind ADMISSION_PROXY_HOPS proxies the one the outermost added.
+
+    Each proxy appends the address it got the request from, so only the last ADMISSION_PROXY_HOPS
+    X-Forwarded-For entries can be trusted; anything left of them came from the client.
+    """
+    if ADMISSION_PROXY_HOPS:
+        forwarded = [entry.strip() for name, value in scope.get("headers", ()) if name == b"x-forwarded-for"
+                     for entry in value.decode("latin-1").split(",")]
+        if len(forwarded) >= ADMISSION_PROXY_HOPS:
+            return forwarded[-ADMISSION_PROXY_HOPS]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class AdmissionControl:
+    """Per-client token buckets and per-class concurrency limits.
+
+    Everything runs on the event loop thread (the middleware never awaits between reading and
+    updating a bucket), so there are no locks: a check is a dict lookup and a little arithmetic.
+    A bucket is [tokens, last refill time]; full buckets are dropped once there are more than
+    ADMISSION_MAX_CLIENTS of them.
+    """
+
+    def __init__(self):
+        self.buckets = {name: {} for name in RATE_LIMITS}
+        self.in_flight = {name: 0 for name in CONCURRENCY_LIMITS}
+        self.admitted = {name: 0 for name in CONCURRENCY_LIMITS}
+        self.rate_limited = {name: 0 for name in RATE_LIMITS}
+        self.shed = {name: 0 for name in CONCURRENCY_LIMITS}
+
+    def _bucket(self, name, key, now, create=True):
+        # `key`'s bucket refilled up to `now`; None if it has none and `create` is false
+        per_minute, burst = RATE_LIMITS[name]
+        buckets = self.buckets[name]
+        bucket = buckets.get(key)
+        if bucket is None:
+            if not create:
+                return None
+            if len(buckets) >= ADMISSION_MAX_CLIENTS:
+                self._prune(name, now)
+            bucket = buckets[key] = [float(burst), now]
+        else:
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * per_minute / 60)
+            bucket[1] = now
+        return bucket
+
+    def _limited(self, name, bucket):
+        self.rate_limited[name] += 1
+        rate = RATE_LIMITS[name][0] / 60
+        return (1 - bucket[0]) / rate if rate > 0 else 60
+
+    def take_token(self, name, key, now=None):
+        """Spend one token from `key`'s bucket; returns 0, or the seconds until a token is available."""
+        bucket = self._bucket(name, key, time.monotonic() if now is None else now)
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0
+        return self._limited(name, bucket)
+
+    def check(self, name, key, now=None):
+        """Like take_token without spending, for classes charged after the response (CHARGED_STATUSES)."""
+        bucket = self._bucket(name, key, time.monotonic() if now is None else now, create=False)
+        if bucket is None or bucket[0] >= 1:
+            return 0
+        return self._limited(name, bucket)
+
+    def charge(self, name, key, now=None):
+        """Spend a token after the fact; requests already in flight can take the bucket to zero, not below."""
+        bucket = self._bucket(name, key, time.monotonic() if now is None else now)
+        bucket[0] = max(0.0, bucket[0] - 1)
+
+    def _prune(self, name, now):
+        per_minute, burst = RATE_LIMITS[name]
+        rate = per_minute / 60
+        buckets = self.buckets[name]
+        # A bucket that has refilled is the same as no bucket
+        for key in [key for key, (tokens, last) in buckets.items() if tokens + (now - last) * rate >= burst]:
+            del buckets[key]
+        if len(buckets) >= ADMISSION_MAX_CLIENTS:
+            # Everyone is mid-burst: drop the oldest half (dicts keep insertion order)
+            for key in list(buckets)[:len(buckets) // 2]:
+                del buckets[key]
+
+    def enter(self, name):
+        """Claim a concurrency slot; False when the class is already at its limit."""
+        if self.in_flight[name] >= CONCURRENCY_LIMITS[name]:
+            self.shed[name] += 1
+            return False
+        self.in_flight[name] += 1
+        self.admitted[name] += 1
+        return True
+
+    def leave(self, name):
+        self.in_flight[name] -= 1
+
+    def stats(self):
+        stats = {"enabled": ADMISSION_ENABLED}
+        for name in CONCURRENCY_LIMITS:
+            stats[f"{name}_in_flight"] = self.in_flight[name]
+            stats[f"{name}_admitted"] = self.admitted[name]
+            stats[f"{name}_rate_limited"] = self.rate_limited[name]
+            stats[f"{name}_shed"] = self.shed[name]
+            stats[f"{name}_clients"] = len(self.buckets[name])
+        stats["rejected"] = sum(self.rate_limited.values()) + sum(self.shed.values())
+        return stats
+
+
+admission = AdmissionControl()
+
+
+async def _reject(send, status, detail, retry_after):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(retry_after).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """ASGI middleware: 429 when a client is over its rate, 503 when a route class is saturated.
+
+    Both answers are immediate and carry Retry-After, so excess load is turned away before it
+    queues for a DB thread or the password pool and drags everyone's latency up.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ADMISSION_ENABLED:
+            return await self.app(scope, receive, send)
+        name, rated = request_class(scope["method"], scope["path"], scope.get("query_string", b""))
+        if name is None:
+            return await self.app(scope, receive, send)
+
+        charged = CHARGED_STATUSES.get(name) if rated else None
+        if rated:
+            key = client_key(scope)
+            wait = admission.check(name, key) if charged else admission.take_token(name, key)
+            if wait:
+                return await _reject(send, 429, "Too many requests, please slow down", math.ceil(wait))
+        if not admission.enter(name):
+            return await _reject(send, 503, "Server is busy, please try again shortly", SHED_RETRY_AFTER)
+
+        async def send_and_charge(message):
+            if message["type"] == "http.response.start" and message["status"] in charged:
+                admission.charge(name, key)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_charge if charged else send)
+        finally:
+            admission.leave(name)
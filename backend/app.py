@@ -1,16 +1,22 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request, Query, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import List, Optional
-import mysql.connector
+from typing import Dict, List, Optional
+import base64
 import json
 import os
 from datetime import datetime, timedelta
-import uuid
+
+from serialization import FastJSONResponse, dumps, encode_page, extend_fragment
+from admission import admission, AdmissionMiddleware
 
 # Initialize app
-app = FastAPI(title="Lost&Found API")
+app = FastAPI(title="Lost&Found API", default_response_class=FastJSONResponse)
+
+# Rate limits and load shedding; added first so it sits inside CORS and rejections stay readable
+app.add_middleware(AdmissionMiddleware)
 
 # CORS setup
 app.add_middleware(
@@ -19,10 +25,42 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-DB-Queries", "Server-Timing", "Retry-After"],
 )
 
 # Import database functions
-from database import get_db, init_database
+from database import get_db, init_database, pool_stats, executor_stats, run_db, PoolExhaustedError, DB_ERRORS, DB_BACKEND, insert_rows, db_now
+from cache import response_cache, post_fragments, cache_key, invalidate_post_cache, cache_stats
+import uploads
+import bulk_import
+import export
+import matching
+import facets
+import autocomplete
+import post_indexes
+from expiry import run_expiry_sweep, start_expiry_scheduler, stop_expiry_scheduler, expiry_stats
+from images import derivative_urls, schedule_derivatives
+from static_files import CachedStaticFiles, precompress_directory, IMMUTABLE_CACHE
+from auth import issue_token, current_user, AUTH_TOKEN_TTL_SECONDS
+from passwords import password_hasher
+from events import post_events
+from read_model import refresh_cards, drop_cards
+from metrics import metrics, MetricsMiddleware
+
+# Outermost, so the latency covers CORS and every route
+app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(PoolExhaustedError)
+async def pool_exhausted_handler(request: Request, exc: PoolExhaustedError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please try again shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+@app.exception_handler(uploads.UploadError)
+async def upload_error_handler(request: Request, exc: uploads.UploadError):
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
 
 # Data models
 class SocialLink(BaseModel):
@@ -67,50 +105,303 @@ class PostUpdate(BaseModel):
     place: Optional[str] = None
     images: Optional[List[str]] = None
 
+# Response models (for the API docs; list routes encode rows directly, see encode_post_cards)
+class PostCard(BaseModel):
+    post_id: int
+    student_id: int
+    item_name: str
+    description: Optional[str] = None
+    item_status: str
+    place: str
+    created_at: datetime
+    expires_at: Optional[datetime] = None
+    full_name: str
+    faculty: Optional[str] = None
+    profile_photo_url: Optional[str] = None
+    images: List[str] = []
+    image_derivatives: List[Dict[str, str]] = []
+
+class SearchPostCard(PostCard):
+    relevance: Optional[float] = None
+
+class PostPage(BaseModel):
+    posts: List[SearchPostCard]
+    next_cursor: Optional[str] = None
+
+class UserPostCard(PostCard):
+    days_until_expiration: Optional[int] = None
+    is_expiring_soon: Optional[bool] = None
+
+class UserPostPage(BaseModel):
+    posts: List[UserPostCard]
+    next_cursor: Optional[str] = None
+
+class PostDetail(PostCard):
+    updated_at: Optional[datetime] = None
+    phone: Optional[str] = None
+    email: Optional[str] = None
+    social_profiles: List[SocialLink] = []
+
+class PostMatch(PostCard):
+    score: float
+    score_parts: Dict[str, float]
+
+class PostMatches(BaseModel):
+    post_id: int
+    matches: List[PostMatch]
+
+class Suggestion(BaseModel):
+    value: str
+    count: int
+
+class Suggestions(BaseModel):
+    field: str
+    suggestions: List[Suggestion]
+
+class FacetValue(BaseModel):
+    value: str
+    count: int
+
+class PostFacets(BaseModel):
+    total: int
+    item_status: Dict[str, int]
+    faculty: List[FacetValue]
+    place: List[FacetValue]
+    created: Dict[str, int]
+
 # Initialize database on startup
 @app.on_event("startup")
-def startup():
+async def startup():
     init_database()
-    check_and_update_expired_posts()
+    # Expire posts in small batches in the background instead of one big UPDATE at boot
+    start_expiry_scheduler(check_and_update_expired_posts)
+    post_events.start()
+    # Match, facet and type-ahead indexes: built in the background, updated incrementally after that
+    post_indexes.schedule_load()
+    # Facet counters are also synced and reconciled periodically
+    facets.start_facet_scheduler(post_indexes.index_worker)
+
+@app.on_event("shutdown")
+async def shutdown():
+    await stop_expiry_scheduler()
+    await facets.stop_facet_scheduler()
+    await post_events.stop()
+    password_hasher.shutdown()
 
 # Create uploads directory
-os.makedirs("uploads", exist_ok=True)
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# Uploads are content-named (they never change), so browsers may cache them forever
+os.makedirs(uploads.UPLOAD_DIR, exist_ok=True)
+app.mount("/uploads", CachedStaticFiles(directory=uploads.UPLOAD_DIR, cache_control=IMMUTABLE_CACHE), name="uploads")
+
+# Serve the frontend (when it is present next to the backend) with precompressed variants
+FRONTEND_DIR = os.getenv("FRONTEND_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "frontend"))
+if os.path.isdir(FRONTEND_DIR):
+    precompress_directory(FRONTEND_DIR)
+    app.mount("/frontend", CachedStaticFiles(directory=FRONTEND_DIR, html=True, precompressed=True), name="frontend")
+
+def posts_changed(event, post_ids, **data):
+    """After a commit that touched posts: drop cached responses, push the SSE event, re-index"""
+    invalidate_post_cache(post_ids)
+    post_events.publish(event, {"post_ids": post_ids, **data})
+    post_indexes.schedule_refresh(post_ids)
 
 def check_and_update_expired_posts():
-    """Check for expired posts and update their status"""
-    db = get_db()
-    cursor = db.cursor()
+    """Check for expired posts and update their status (runs on the expiry scheduler)"""
+    report = run_expiry_sweep()
+    if not report:
+        return report
     
+    if report['expired_ids']:
+        posts_changed("expired", report['expired_ids'])
+    if report['purged_ids']:
+        posts_changed("deleted", report['purged_ids'])
+    if report['expired_ids'] or report['purged_ids']:
+        print(f"✅ Marked {len(report['expired_ids'])} posts as expired, "
+              f"purged {len(report['purged_ids'])} in {report['batches']} batches")
+    return report
+
+def expand_card(post):
+    """Turn a post_cards row's JSON image list into post['images'] and add the image derivatives"""
+    post['images'] = json.loads(post['images'])
+    post['image_derivatives'] = [derivative_urls(url) for url in post['images']]
+    return post
+
+# Columns of a post card (PostCard) in the post_cards read model (see read_model.py)
+POST_CARD_COLUMNS = '''
+    c.post_id, c.student_id, c.item_name, c.description, c.item_status, c.place,
+    c.created_at, c.expires_at, c.full_name, c.faculty, c.profile_photo_url, c.images
+'''
+
+def encode_post_cards(posts, generation):
+    """Encoded JSON of each post_cards row, in order, reusing cached fragments.
+
+    Only posts without a fragment are expanded and encoded. `generation` is
+    post_fragments.generation read before the posts were queried.
+    """
+    fragments = post_fragments.get_many([post['post_id'] for post in posts])
+    missing = [expand_card(post) for post in posts if post['post_id'] not in fragments]
+    encoded = {post['post_id']: dumps(post) for post in missing}
+    post_fragments.put_many(encoded, generation)
+    fragments.update(encoded)
+    return [fragments[post['post_id']] for post in posts]
+
+# ========== PAGINATION HELPERS ==========
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+def encode_cursor(*values):
+    """Pack keyset values (datetimes/ints) into an opaque URL-safe cursor string"""
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor, size):
+    """Unpack a cursor made by encode_cursor, raising 400 if it was tampered with"""
     try:
-        cursor.execute('''
-            UPDATE posts 
-            SET item_status = 'expired' 
-            WHERE expires_at < CURRENT_TIMESTAMP 
-            AND item_status IN ('lost', 'found')
-        ''')
-        
-        db.commit()
-        expired_count = cursor.rowcount
-        if expired_count > 0:
-            print(f"✅ Marked {expired_count} posts as expired")
-            
-    except mysql.connector.Error as err:
-        print(f"Error updating expired posts: {err}")
-    finally:
-        cursor.close()
-        db.close()
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError("wrong cursor size")
+        return [datetime.fromisoformat(v) if isinstance(v, str) else v if isinstance(v, float) else int(v)
+                for v in values]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# ========== SEARCH HELPERS ==========
+FULLTEXT_OPERATORS = str.maketrans({c: " " for c in '+-<>()~*"@:^'})
+
+def build_fulltext_query(search, dialect="mysql"):
+    """Turn free text into a full-text query; each term is optional and adds to relevance"""
+    terms = search.translate(FULLTEXT_OPERATORS).split()
+    if dialect == "sqlite":
+        # FTS5 trigram tokens need at least 3 characters
+        return " OR ".join(f'"{term}"' for term in terms if len(term) >= 3)
+    return " ".join(terms)
+
+# Ranked post ids for a search: full-text hits on the post text plus hits on the owner's name.
+# Values are (SQL, number of times the query string is bound).
+SEARCH_HITS_SQL = {
+    "mysql": ('''
+        SELECT post_id, SUM(score) AS relevance FROM (
+            SELECT post_id, MATCH(item_name, description) AGAINST (%s IN BOOLEAN MODE) AS score
+            FROM posts
+            WHERE MATCH(item_name, description) AGAINST (%s IN BOOLEAN MODE)
+            UNION ALL
+            SELECT sp.post_id, MATCH(su.full_name) AGAINST (%s IN BOOLEAN MODE) AS score
+            FROM users su
+            JOIN posts sp ON sp.student_id = su.student_id
+            WHERE MATCH(su.full_name) AGAINST (%s IN BOOLEAN MODE)
+        ) hits
+        GROUP BY post_id
+    ''', 4),
+    # bm25() is lower-is-better, so negate it to match MySQL's higher-is-better relevance
+    "sqlite": ('''
+        SELECT post_id, SUM(score) AS relevance FROM (
+            SELECT rowid AS post_id, -bm25(posts_fts) AS score
+            FROM posts_fts
+            WHERE posts_fts MATCH %s
+            UNION ALL
+            SELECT sp.post_id, -bm25(users_fts) AS score
+            FROM users_fts
+            JOIN posts sp ON sp.student_id = users_fts.rowid
+            WHERE users_fts MATCH %s
+        ) hits
+        GROUP BY post_id
+    ''', 2),
+}
+
+# ========== RESPONSE CACHE ==========
+async def cached_json(request: Request, func, *args):
+    """Serve func(*args) from the response cache, answering If-None-Match with 304"""
+    key = cache_key(request)
+    entry = response_cache.get(key)
+    if entry is None:
+        generation = response_cache.generation
+        result = await run_db(func, *args)
+        # List routes hand back a ready-made body assembled from post fragments
+        body = result if isinstance(result, bytes) else dumps(result)
+        entry = response_cache.put(key, body, generation)
+    
+    # no-cache: browsers may keep the body but must revalidate with the ETag
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == entry.etag:
+        response_cache.record_not_modified()
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
 
 # ========== AUTHENTICATION ROUTES ==========
 @app.get("/")
 def api_status():
-    return {"status": "active", "service": "Lost&Found API", "database": "MySQL"}
+    return {"status": "active", "service": "Lost&Found API", "database": "SQLite" if DB_BACKEND == "sqlite" else "MySQL"}
+
+@app.get("/stats/db-pool")
+def get_pool_stats():
+    return pool_stats()
+
+@app.get("/stats/db-executor")
+def get_executor_stats():
+    return executor_stats()
+
+@app.get("/stats/cache")
+def get_cache_stats():
+    return cache_stats()
+
+@app.get("/stats/expiry")
+def get_expiry_stats():
+    return expiry_stats()
+
+@app.get("/stats/auth")
+def get_auth_stats():
+    return password_hasher.stats()
+
+@app.get("/stats/events")
+def get_event_stats():
+    return post_events.stats()
+
+@app.get("/stats/matching")
+def get_matching_stats():
+    return matching.match_index.stats()
+
+@app.get("/stats/facets")
+def get_facet_stats():
+    return facets.facet_index.stats()
+
+@app.get("/stats/autocomplete")
+def get_autocomplete_stats():
+    return autocomplete.autocomplete_index.stats()
+
+@app.get("/stats/admission")
+def get_admission_stats():
+    return admission.stats()
+
+@app.get("/stats/slow-queries")
+def get_slow_queries():
+    return metrics.slow_query_log()
+
+@app.get("/metrics")
+def get_metrics():
+    components = {
+        "db_pool": pool_stats(),
+        "db_executor": executor_stats(),
+        "cache": cache_stats(),
+        "expiry": expiry_stats(),
+        "auth": password_hasher.stats(),
+        "events": post_events.stats(),
+        "matching": matching.match_index.stats(),
+        "facets": facets.facet_index.stats(),
+        "autocomplete": autocomplete.autocomplete_index.stats(),
+        "admission": admission.stats(),
+    }
+    return Response(content=metrics.render(components), media_type="text/plain; version=0.0.4")
 
 @app.post("/auth/register")
 async def register_user(user: UserCreate):
     if user.password != user.confirm_password:
         raise HTTPException(status_code=400, detail="Password confirmation does not match")
-    
+    # Hash on the password process pool, never on the event loop or a DB thread
+    password_hash = await password_hasher.hash(user.password)
+    return await run_db(_register_user, user, password_hash)
+
+def _register_user(user: UserCreate, password_hash: str):
     db = get_db()
     cursor = db.cursor()
     
@@ -130,28 +421,20 @@ async def register_user(user: UserCreate):
             user.class_year,
             user.phone,
             user.email,
-            user.password,
+            password_hash,
             user.profile_photo_url
         ))
         
         student_id = cursor.lastrowid
         
-        # Insert social profiles if any
+        # Insert social profiles if any (one multi-row INSERT per table)
         if user.social_profiles:
-            for social in user.social_profiles:
-                # Insert into social_profiles table
-                cursor.execute('''
-                    INSERT INTO social_profiles (platform, profile_url)
-                    VALUES (%s, %s)
-                ''', (social.platform, social.profile_url))
-                
-                contact_id = cursor.lastrowid
-                
-                # Link to user in junction table
-                cursor.execute('''
-                    INSERT INTO user_social_profiles (student_id, contact_id)
-                    VALUES (%s, %s)
-                ''', (student_id, contact_id))
+            contact_ids = insert_rows(db, cursor, "social_profiles", ("platform", "profile_url"),
+                                      [(social.platform, social.profile_url) for social in user.social_profiles])
+            
+            # Link to user in junction table
+            insert_rows(db, cursor, "user_social_profiles", ("student_id", "contact_id"),
+                        [(student_id, contact_id) for contact_id in contact_ids])
         
         db.commit()
         
@@ -162,7 +445,7 @@ async def register_user(user: UserCreate):
             "user_email": user.email
         }
         
-    except mysql.connector.Error as err:
+    except DB_ERRORS as err:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {err}")
     finally:
@@ -171,45 +454,74 @@ async def register_user(user: UserCreate):
 
 @app.post("/auth/login")
 async def login_user(credentials: UserLogin):
+    account = await run_db(_find_account, credentials.email)
+    matches, needs_rehash = await password_hasher.verify(
+        credentials.password, account["password"] if account else None
+    )
+    if not matches:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    
+    # Legacy plaintext (or outdated-cost) passwords are upgraded transparently on login
+    new_hash = await password_hasher.hash(credentials.password) if needs_rehash else None
+    user_data = await run_db(_login_user, account, new_hash)
+    
+    return {
+        "success": True,
+        "message": "Login successful",
+        "access_token": issue_token(account["student_id"]),
+        "token_type": "bearer",
+        "expires_in": AUTH_TOKEN_TTL_SECONDS,
+        "user_data": user_data
+    }
+
+def _find_account(email: str):
     db = get_db()
     cursor = db.cursor(dictionary=True)
     
     try:
         cursor.execute('''
-            SELECT student_id, full_name, email, faculty, class_year, phone, profile_photo_url
-            FROM users WHERE email = %s AND password = %s
-        ''', (credentials.email, credentials.password))
+            SELECT student_id, full_name, email, faculty, class_year, phone, profile_photo_url, password
+            FROM users WHERE email = %s
+        ''', (email,))
+        return cursor.fetchone()
         
-        user = cursor.fetchone()
+    finally:
+        cursor.close()
+        db.close()
+
+def _login_user(user: dict, new_hash: Optional[str] = None):
+    db = get_db()
+    cursor = db.cursor(dictionary=True)
+    
+    try:
+        if new_hash:
+            cursor.execute("UPDATE users SET password = %s WHERE student_id = %s", (new_hash, user['student_id']))
+            db.commit()
         
-        if user:
-            # Get social profiles
-            cursor.execute('''
-                SELECT sp.platform, sp.profile_url
-                FROM social_profiles sp
-                JOIN user_social_profiles usp ON sp.contact_id = usp.contact_id
-                WHERE usp.student_id = %s
-            ''', (user['student_id'],))
-            
-            social_profiles = cursor.fetchall()
-            
-            return {
-                "success": True,
-                "message": "Login successful",
-                "user_data": {
-                    "student_id": user['student_id'],
-                    "name": user['full_name'],
-                    "email": user['email'],
-                    "faculty": user['faculty'],
-                    "class_year": user['class_year'],
-                    "phone": user['phone'],
-                    "profile_photo_url": user['profile_photo_url'],
-                    "social_profiles": social_profiles
-                }
-            }
+        # Get social profiles
+        cursor.execute('''
+            SELECT sp.platform, sp.profile_url
+            FROM social_profiles sp
+            JOIN user_social_profiles usp ON sp.contact_id = usp.contact_id
+            WHERE usp.student_id = %s
+        ''', (user['student_id'],))
         
-        raise HTTPException(status_code=401, detail="Invalid email or password")
+        social_profiles = cursor.fetchall()
+        
+        return {
+            "student_id": user['student_id'],
+            "name": user['full_name'],
+            "email": user['email'],
+            "faculty": user['faculty'],
+            "class_year": user['class_year'],
+            "phone": user['phone'],
+            "profile_photo_url": user['profile_photo_url'],
+            "social_profiles": social_profiles
+        }
         
+    except DB_ERRORS as err:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {err}")
     finally:
         cursor.close()
         db.close()
@@ -217,6 +529,9 @@ async def login_user(credentials: UserLogin):
 # ========== PROFILE ROUTES ==========
 @app.get("/users/{student_id}")
 async def get_user_profile(student_id: int):
+    return await run_db(_get_user_profile, student_id)
+
+def _get_user_profile(student_id: int):
     db = get_db()
     cursor = db.cursor(dictionary=True)
     
@@ -247,39 +562,54 @@ async def get_user_profile(student_id: int):
         db.close()
 
 # ========== POSTS ROUTES ==========
+@app.get("/events/posts")
+async def post_event_stream(request: Request):
+    """Server-Sent Events: created / updated / deleted / expired, each with the affected post_ids.
+
+    Reconnecting clients send Last-Event-ID and get the events they missed (or a `reset`
+    event when those are no longer kept, meaning: reload the feed).
+    """
+    return StreamingResponse(
+        post_events.stream(request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.post("/posts")
-async def create_post(post: PostCreate, student_id: int = Form(...)):
+async def create_post(post: PostCreate, student_id: int = Depends(current_user)):
+    return await run_db(_create_post, post, student_id)
+
+def _create_post(post: PostCreate, student_id: int):
     db = get_db()
     cursor = db.cursor()
     
     try:
-        # Calculate expiration date (30 days from now)
-        expires_at = datetime.now() + timedelta(days=30)
+        columns = ["student_id", "item_name", "description", "item_status", "place"]
+        values = [student_id, post.item_name, post.description, post.item_status, post.place]
+        if db.dialect != "mysql":
+            # expires_at is generated from created_at on MySQL; SQLite stores it (30 days from now)
+            columns.append("expires_at")
+            values.append(db_now() + timedelta(days=30))
         
         # Insert post
-        cursor.execute('''
-            INSERT INTO posts (student_id, item_name, description, item_status, place, expires_at)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        ''', (
-            student_id,
-            post.item_name,
-            post.description,
-            post.item_status,
-            post.place,
-            expires_at
-        ))
+        cursor.execute(
+            f"INSERT INTO posts ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(values))})",
+            values
+        )
         
         post_id = cursor.lastrowid
+        # Read the expiry back so the response reports what either backend stored
+        cursor.execute("SELECT expires_at FROM posts WHERE post_id = %s", (post_id,))
+        expires_at = cursor.fetchone()[0]
         
         # Insert images if any
         if post.images:
-            for order, image_url in enumerate(post.images):
-                cursor.execute('''
-                    INSERT INTO post_images (post_id, image_url, image_order)
-                    VALUES (%s, %s, %s)
-                ''', (post_id, image_url, order))
+            insert_rows(db, cursor, "post_images", ("post_id", "image_url", "image_order"),
+                        [(post_id, image_url, order) for order, image_url in enumerate(post.images)])
         
+        refresh_cards(db, [post_id])
         db.commit()
+        posts_changed("created", [post_id], item_status=post.item_status)
         
         return {
             "success": True, 
@@ -288,98 +618,219 @@ async def create_post(post: PostCreate, student_id: int = Form(...)):
             "expires_at": expires_at.isoformat()
         }
         
-    except mysql.connector.Error as err:
+    except DB_ERRORS as err:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {err}")
     finally:
         cursor.close()
         db.close()
 
-@app.get("/posts/user/{student_id}")
-async def get_user_posts(student_id: int):
+@app.post("/posts/import")
+async def import_posts(request: Request, format: Optional[str] = None, student_id: int = Depends(current_user)):
+    """Bulk-create posts from a streamed CSV or NDJSON request body (one post per row)."""
+    fmt = bulk_import.detect_format(format, request.headers.get("content-type"))
+    if not fmt:
+        raise HTTPException(status_code=415, detail="Send the file as text/csv or application/x-ndjson (or pass ?format=csv|ndjson)")
+
+    report = await bulk_import.import_posts(request.stream(), fmt, student_id)
+    if report["imported"]:
+        posts_changed("created", report["post_ids"])
+    print(f"✅ Imported {report['imported']} of {report['rows']} rows in {report['batches']} batches")
+    return {"success": not report["failed"] and "aborted" not in report, **report}
+
+@app.get("/posts/export")
+async def export_posts(format: str = "ndjson", item_status: Optional[str] = None, faculty: Optional[str] = None,
+                       since: Optional[datetime] = None, until: Optional[datetime] = None,
+                       after_id: int = Query(0, ge=0), student_id: int = Depends(current_user)):
+    """Stream every matching post (all statuses by default) as NDJSON or CSV, ordered by post_id.
+
+    To resume an interrupted export, pass the post_id of the last row received as after_id.
+    """
+    if format not in export.MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+    statuses = [s.strip() for s in item_status.split(",") if s.strip()] if item_status else None
+    if statuses and not set(statuses) <= set(export.EXPORT_STATUSES):
+        raise HTTPException(status_code=400, detail=f"item_status must be among {', '.join(export.EXPORT_STATUSES)}")
+
+    body = export.stream_posts(format, after_id=after_id, statuses=statuses, faculty=faculty, since=since, until=until)
+    filename = f"posts-{datetime.now():%Y%m%d-%H%M%S}.{format}"
+    return StreamingResponse(body, media_type=export.MEDIA_TYPES[format],
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@app.get("/posts/autocomplete", response_model=Suggestions)
+def autocomplete_posts(q: str = Query(..., max_length=100), field: str = "item_name",
+                       limit: int = Query(8, ge=1, le=autocomplete.AUTOCOMPLETE_MAX_LIMIT)):
+    """Type-ahead for the item name and place inputs: known values starting with `q`, most used first.
+
+    Served from memory, so it is cheap enough to call on every keystroke.
+    """
+    if field not in autocomplete.FIELDS:
+        raise HTTPException(status_code=400, detail=f"field must be one of {', '.join(autocomplete.FIELDS)}")
+    if not autocomplete.autocomplete_index.ready:
+        raise HTTPException(status_code=503, detail="Autocomplete index is still loading", headers={"Retry-After": "5"})
+    suggestions = autocomplete.autocomplete_index.suggest(field, q, limit)
+    return FastJSONResponse({"field": field, "suggestions": suggestions}, headers={"Cache-Control": "max-age=30"})
+
+@app.get("/posts/facets", response_model=PostFacets)
+async def get_post_facets(item_status: Optional[str] = None, search: Optional[str] = None):
+    """Counts per status, faculty, place and creation date of the open posts, for the home page filters.
+
+    Served from in-memory counters; with `search` the counts cover the search hits only.
+    """
+    if not facets.facet_index.ready:
+        raise HTTPException(status_code=503, detail="Facet counts are still loading", headers={"Retry-After": "5"})
+    post_ids = await run_db(_search_post_ids, search) if search else None
+    return facets.facet_index.facets(item_status, post_ids)
+
+def _search_post_ids(search: str):
+    """Every post id the full-text search matches (the facet counters filter them down to open posts)"""
+    db = get_db()
+    cursor = db.cursor()
+    
+    try:
+        ft_query = build_fulltext_query(search, db.dialect)
+        if not ft_query:
+            return []
+        hits_sql, binds = SEARCH_HITS_SQL[db.dialect]
+        cursor.execute(hits_sql, [ft_query] * binds)
+        return [row[0] for row in cursor.fetchall()]
+        
+    finally:
+        cursor.close()
+        db.close()
+
+@app.get("/posts/user/{student_id}", response_model=UserPostPage)
+async def get_user_posts(student_id: int, cursor: Optional[str] = None,
+                         limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)):
+    return FastJSONResponse(content=await run_db(_get_user_posts, student_id, cursor, limit))
+
+def _get_user_posts(student_id: int, after: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE):
     db = get_db()
     cursor = db.cursor(dictionary=True)
     
     try:
-        cursor.execute('''
-            SELECT p.*, u.full_name, u.phone, u.email, u.profile_photo_url
-            FROM posts p 
-            JOIN users u ON p.student_id = u.student_id 
-            WHERE p.student_id = %s
-            ORDER BY 
-                CASE 
-                    WHEN p.item_status IN ('lost', 'found') AND p.expires_at > CURRENT_TIMESTAMP THEN 1
-                    ELSE 2
-                END,
-                p.created_at DESC
-        ''', (student_id,))
+        # Active posts first, then newest first; the cursor carries (group, created_at, post_id)
+        sort_group = '''
+            CASE 
+                WHEN c.item_status IN ('lost', 'found') AND c.expires_at > CURRENT_TIMESTAMP THEN 1
+                ELSE 2
+            END
+        '''
+        query = f'''
+            SELECT {POST_CARD_COLUMNS}, {sort_group} AS sort_group
+            FROM post_cards c
+            WHERE c.student_id = %s
+        '''
+        params = [student_id]
         
+        if after:
+            group, created_at, post_id = decode_cursor(after, 3)
+            query += f'''
+                AND ({sort_group} > %s
+                     OR ({sort_group} = %s AND (c.created_at < %s OR (c.created_at = %s AND c.post_id < %s))))
+            '''
+            params.extend([group, group, created_at, created_at, post_id])
+        
+        query += " ORDER BY sort_group, c.created_at DESC, c.post_id DESC LIMIT %s"
+        params.append(limit + 1)
+        
+        generation = post_fragments.generation
+        cursor.execute(query, params)
         posts = cursor.fetchall()
         
-        # Get images for each post
+        next_cursor = None
+        if len(posts) > limit:
+            posts = posts[:limit]
+            last = posts[-1]
+            next_cursor = encode_cursor(last['sort_group'], last['created_at'], last['post_id'])
+        
+        # Expiration info changes by the day, so it is added to the cached card, not stored in it
+        extras = []
         for post in posts:
-            cursor.execute('''
-                SELECT image_url, image_order
-                FROM post_images 
-                WHERE post_id = %s 
-                ORDER BY image_order
-            ''', (post['post_id'],))
-            
-            post['images'] = [img['image_url'] for img in cursor.fetchall()]
-            
-            # Add expiration info
+            post.pop('sort_group')
+            extra = {}
             if post['item_status'] in ['lost', 'found'] and post['expires_at']:
                 expires_date = post['expires_at']
                 if isinstance(expires_date, str):
                     expires_date = datetime.fromisoformat(expires_date.replace('Z', '+00:00'))
-                days_left = (expires_date - datetime.now()).days
-                post['days_until_expiration'] = max(0, days_left)
-                post['is_expiring_soon'] = days_left <= 7
+                days_left = (expires_date - db_now()).days
+                extra = {'days_until_expiration': max(0, days_left), 'is_expiring_soon': days_left <= 7}
+            extras.append(extra)
         
-        return {"posts": posts}
+        fragments = encode_post_cards(posts, generation)
+        return encode_page([extend_fragment(fragment, extra) for fragment, extra in zip(fragments, extras)],
+                           next_cursor=next_cursor)
         
     finally:
         cursor.close()
         db.close()
 
-@app.get("/posts/{post_id}")
-async def get_post_details(post_id: int):
+@app.get("/posts/{post_id}", response_model=PostDetail)
+async def get_post_details(request: Request, post_id: int):
+    return await cached_json(request, _get_post_details, post_id)
+
+def _get_post_details(post_id: int):
     db = get_db()
     cursor = db.cursor(dictionary=True)
     
     try:
-        cursor.execute('''
-            SELECT p.*, u.full_name, u.phone, u.email, u.faculty, u.profile_photo_url
-            FROM posts p 
-            JOIN users u ON p.student_id = u.student_id 
-            WHERE p.post_id = %s
+        # The card already carries the images and the owner's contacts
+        cursor.execute(f'''
+            SELECT {POST_CARD_COLUMNS}, c.updated_at, c.phone, c.email, c.social_profiles
+            FROM post_cards c
+            WHERE c.post_id = %s
         ''', (post_id,))
         
         post = cursor.fetchone()
         if not post:
             raise HTTPException(status_code=404, detail="Post not found")
         
-        # Get images
-        cursor.execute('''
-            SELECT image_url, image_order
-            FROM post_images 
-            WHERE post_id = %s 
-            ORDER BY image_order
-        ''', (post_id,))
+        post['social_profiles'] = json.loads(post['social_profiles'])
+        return expand_card(post)
         
-        post['images'] = [img['image_url'] for img in cursor.fetchall()]
+    finally:
+        cursor.close()
+        db.close()
+
+@app.get("/posts/{post_id}/matches", response_model=PostMatches)
+async def get_post_matches(request: Request, post_id: int, limit: int = Query(10, ge=1, le=50)):
+    """Open posts of the opposite status (found for a lost post, and vice versa) ranked by likely match"""
+    if not matching.match_index.ready:
+        raise HTTPException(status_code=503, detail="Matching index is still loading", headers={"Retry-After": "5"})
+    return await cached_json(request, _get_post_matches, post_id, limit)
+
+def _get_post_matches(post_id: int, limit: int):
+    db = get_db()
+    cursor = db.cursor(dictionary=True)
+    
+    try:
+        cursor.execute(f"SELECT {matching.POST_COLUMNS} FROM posts WHERE post_id = %s", (post_id,))
+        post = cursor.fetchone()
+        if not post:
+            raise HTTPException(status_code=404, detail="Post not found")
+        if post['item_status'] not in matching.STATUS_CODES:
+            return {"post_id": post_id, "matches": []}
         
-        # Get social profiles
-        cursor.execute('''
-            SELECT sp.platform, sp.profile_url
-            FROM social_profiles sp
-            JOIN user_social_profiles usp ON sp.contact_id = usp.contact_id
-            WHERE usp.student_id = %s
-        ''', (post['student_id'],))
+        ranked = matching.match_index.match(post, limit)
+        if not ranked:
+            return {"post_id": post_id, "matches": []}
         
-        post['social_profiles'] = cursor.fetchall()
+        # Re-read the candidates so closed or deleted posts never show up, even if the index lags
+        placeholders = ", ".join(["%s"] * len(ranked))
+        generation = post_fragments.generation
+        cursor.execute(f'''
+            SELECT {POST_CARD_COLUMNS}
+            FROM post_cards c
+            WHERE c.post_id IN ({placeholders}) AND c.item_status IN ('lost', 'found')
+            AND c.expires_at > CURRENT_TIMESTAMP
+        ''', [candidate_id for candidate_id, _, _ in ranked])
+        posts = {row['post_id']: row for row in cursor.fetchall()}
         
-        return post
+        ranked = [(candidate_id, score, parts) for candidate_id, score, parts in ranked if candidate_id in posts]
+        fragments = encode_post_cards([posts[candidate_id] for candidate_id, _, _ in ranked], generation)
+        return encode_page([extend_fragment(fragment, {"score": round(score, 4), "score_parts": parts})
+                            for fragment, (_, score, parts) in zip(fragments, ranked)],
+                           key="matches", post_id=post_id)
         
     finally:
         cursor.close()
@@ -387,11 +838,26 @@ async def get_post_details(post_id: int):
 
 # ========== POST UPDATE & DELETE ROUTES ==========
 @app.put("/posts/{post_id}")
-async def update_post(post_id: int, post_update: PostUpdate):
+async def update_post(post_id: int, post_update: PostUpdate, student_id: int = Depends(current_user)):
+    return await run_db(_update_post, post_id, post_update, student_id)
+
+def check_post_owner(cursor, post_id: int, student_id: int):
+    """404 if the post does not exist, 403 if it belongs to someone else."""
+    cursor.execute("SELECT student_id FROM posts WHERE post_id = %s", (post_id,))
+    row = cursor.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Post not found")
+    owner = row['student_id'] if isinstance(row, dict) else row[0]
+    if owner != student_id:
+        raise HTTPException(status_code=403, detail="You can only change your own posts")
+
+def _update_post(post_id: int, post_update: PostUpdate, student_id: int):
     db = get_db()
     cursor = db.cursor(dictionary=True)
     
     try:
+        check_post_owner(cursor, post_id, student_id)
+        
         # Build update query dynamically based on provided fields
         update_fields = []
         update_values = []
@@ -419,11 +885,13 @@ async def update_post(post_id: int, post_update: PostUpdate):
         
         query = f"UPDATE posts SET {', '.join(update_fields)}, updated_at = CURRENT_TIMESTAMP WHERE post_id = %s"
         cursor.execute(query, update_values)
+        refresh_cards(db, [post_id])
         db.commit()
+        posts_changed("updated", [post_id], fields=[field.split(" = ")[0] for field in update_fields])
         
         return {"success": True, "message": "Post updated successfully"}
         
-    except mysql.connector.Error as err:
+    except DB_ERRORS as err:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {err}")
     finally:
@@ -431,94 +899,150 @@ async def update_post(post_id: int, post_update: PostUpdate):
         db.close()
 
 @app.delete("/posts/{post_id}")
-async def delete_post(post_id: int):
+async def delete_post(post_id: int, student_id: int = Depends(current_user)):
+    return await run_db(_delete_post, post_id, student_id)
+
+def _delete_post(post_id: int, student_id: int):
     db = get_db()
     cursor = db.cursor()
     
     try:
+        check_post_owner(cursor, post_id, student_id)
+        
         # Delete post images first (due to foreign key constraint)
         cursor.execute("DELETE FROM post_images WHERE post_id = %s", (post_id,))
         
-        # Delete the post
+        # Delete the card, then the post
+        drop_cards(db, [post_id])
         cursor.execute("DELETE FROM posts WHERE post_id = %s", (post_id,))
+        deleted = cursor.rowcount
         db.commit()
+        posts_changed("deleted", [post_id])
         
-        if cursor.rowcount == 0:
+        if deleted == 0:
             raise HTTPException(status_code=404, detail="Post not found")
         
         return {"success": True, "message": "Post deleted successfully"}
         
-    except mysql.connector.Error as err:
+    except DB_ERRORS as err:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {err}")
     finally:
         cursor.close()
         db.close()
 
-# ========== FILE UPLOAD ROUTE ==========
+# ========== FILE UPLOAD ROUTES ==========
 @app.post("/upload")
 async def upload_file(file: UploadFile = File(...)):
-    try:
-        # Generate unique filename
-        file_extension = file.filename.split('.')[-1]
-        filename = f"{uuid.uuid4()}.{file_extension}"
-        file_path = f"uploads/{filename}"
-        
-        # Save file
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        
-        return {
-            "success": True,
-            "filename": filename,
-            "url": f"/uploads/{filename}"
-        }
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"File upload failed: {str(e)}")
+    # Copy the spooled upload to disk in fixed-size chunks; type comes from the magic bytes
+    filename = await run_in_threadpool(uploads.save_stream, uploads.iter_file_chunks(file.file))
+    schedule_derivatives(filename)
+    
+    return {
+        "success": True,
+        "filename": filename,
+        "url": f"/uploads/{filename}"
+    }
+
+@app.post("/upload/sessions")
+async def create_upload_session():
+    return await run_in_threadpool(uploads.create_session)
+
+@app.get("/upload/sessions/{upload_id}")
+async def get_upload_session(upload_id: str):
+    offset = await run_in_threadpool(uploads.session_offset, upload_id)
+    return {"upload_id": upload_id, "offset": offset}
+
+@app.put("/upload/sessions/{upload_id}")
+async def append_upload_chunk(upload_id: str, request: Request, offset: int = Query(..., ge=0)):
+    data = bytearray()
+    async for piece in request.stream():
+        data.extend(piece)
+        if len(data) > uploads.UPLOAD_CHUNK_SIZE:
+            raise HTTPException(status_code=413, detail=f"Chunks may be at most {uploads.UPLOAD_CHUNK_SIZE} bytes")
+    
+    new_offset = await run_in_threadpool(uploads.append_chunk, upload_id, offset, bytes(data))
+    return {"upload_id": upload_id, "offset": new_offset}
+
+@app.post("/upload/sessions/{upload_id}/finalize")
+async def finalize_upload_session(upload_id: str):
+    filename = await run_in_threadpool(uploads.finalize_session, upload_id)
+    schedule_derivatives(filename)
+    
+    return {
+        "success": True,
+        "filename": filename,
+        "url": f"/uploads/{filename}"
+    }
 
 # ========== PUBLIC POSTS ROUTES ==========
-@app.get("/posts")
-async def get_all_posts(item_status: Optional[str] = None, search: Optional[str] = None):
+@app.get("/posts", response_model=PostPage)
+async def get_all_posts(request: Request, item_status: Optional[str] = None, search: Optional[str] = None,
+                        cursor: Optional[str] = None,
+                        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)):
+    return await cached_json(request, _get_all_posts, item_status, search, cursor, limit)
+
+def _get_all_posts(item_status: Optional[str] = None, search: Optional[str] = None,
+                   after: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE):
     db = get_db()
     cursor = db.cursor(dictionary=True)
     
     try:
-        query = '''
-            SELECT p.*, u.full_name, u.faculty, u.profile_photo_url
-            FROM posts p 
-            JOIN users u ON p.student_id = u.student_id 
-            WHERE p.item_status IN ('lost', 'found')
-            AND p.expires_at > CURRENT_TIMESTAMP
-        '''
+        ft_query = build_fulltext_query(search, db.dialect) if search else ""
+        if search and not ft_query:
+            return {"posts": [], "next_cursor": None}
+        
         params = []
+        if ft_query:
+            # Search: only posts the FULLTEXT indexes matched, best matches first
+            hits_sql, binds = SEARCH_HITS_SQL[db.dialect]
+            query = f'''
+                SELECT {POST_CARD_COLUMNS}, s.relevance
+                FROM ({hits_sql}) s
+                JOIN post_cards c ON c.post_id = s.post_id
+                WHERE c.listed = 1
+                AND c.expires_at > CURRENT_TIMESTAMP
+            '''
+            params.extend([ft_query] * binds)
+        else:
+            query = f'''
+                SELECT {POST_CARD_COLUMNS}
+                FROM post_cards c
+                WHERE c.listed = 1
+                AND c.expires_at > CURRENT_TIMESTAMP
+            '''
         
         if item_status:
-            query += " AND p.item_status = %s"
+            query += " AND c.item_status = %s"
             params.append(item_status)
         
-        if search:
-            query += " AND (p.item_name LIKE %s OR p.description LIKE %s OR u.full_name LIKE %s)"
-            params.extend([f"%{search}%", f"%{search}%", f"%{search}%"])
+        # Keyset pagination: continue strictly after the last (sort key, post_id) seen
+        sort_key = "s.relevance" if ft_query else "c.created_at"
+        if after:
+            last_key, post_id = decode_cursor(after, 2)
+            if isinstance(last_key, datetime) == bool(ft_query):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            query += f" AND ({sort_key} < %s OR ({sort_key} = %s AND c.post_id < %s))"
+            params.extend([last_key, last_key, post_id])
         
-        query += " ORDER BY p.created_at DESC"
+        query += f" ORDER BY {sort_key} DESC, c.post_id DESC LIMIT %s"
+        params.append(limit + 1)
         
+        generation = post_fragments.generation
         cursor.execute(query, params)
         posts = cursor.fetchall()
         
-        # Get images for each post
-        for post in posts:
-            cursor.execute('''
-                SELECT image_url, image_order
-                FROM post_images 
-                WHERE post_id = %s 
-                ORDER BY image_order
-            ''', (post['post_id'],))
-            
-            post['images'] = [img['image_url'] for img in cursor.fetchall()]
+        next_cursor = None
+        if len(posts) > limit:
+            posts = posts[:limit]
+            last = posts[-1]
+            next_cursor = encode_cursor(float(last['relevance']) if ft_query else last['created_at'], last['post_id'])
         
-        return {"posts": posts}
+        # Relevance depends on the search, so it is added to the shared card fragment
+        relevance = [{'relevance': float(post.pop('relevance'))} if ft_query else None for post in posts]
+        fragments = encode_post_cards(posts, generation)
+        return encode_page([extend_fragment(fragment, extra) for fragment, extra in zip(fragments, relevance)],
+                           next_cursor=next_cursor)
         
     finally:
         cursor.close()
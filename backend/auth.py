@@ -0,0 +1,64 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+# Access token settings
+# Tokens are stateless: HMAC-signed claims, verified without touching the database.
+AUTH_SECRET = os.getenv("AUTH_SECRET", "")
+AUTH_TOKEN_TTL_SECONDS = int(os.getenv("AUTH_TOKEN_TTL_SECONDS", str(12 * 3600)))
+
+if not AUTH_SECRET:
+    # Tokens will not survive a restart or work across several workers; set AUTH_SECRET in production
+    AUTH_SECRET = secrets.token_urlsafe(32)
+    print("AUTH_SECRET is not set, using a random per-process secret")
+
+_SECRET = AUTH_SECRET.encode()
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def _sign(payload):
+    return _b64encode(hmac.new(_SECRET, payload.encode(), hashlib.sha256).digest())
+
+def issue_token(student_id, ttl=AUTH_TOKEN_TTL_SECONDS):
+    """Signed access token for `student_id`: base64(claims).base64(hmac)."""
+    now = int(time.time())
+    payload = _b64encode(json.dumps({"sub": student_id, "iat": now, "exp": now + ttl}, separators=(",", ":")).encode())
+    return f"{payload}.{_sign(payload)}"
+
+def verify_token(token):
+    """Return the token's claims, or raise 401 if it is malformed, forged or expired."""
+    try:
+        payload, signature = token.split(".")
+        # Compare bytes: compare_digest rejects non-ASCII str with a TypeError
+        if not hmac.compare_digest(signature.encode(), _sign(payload).encode()):
+            raise ValueError("bad signature")
+        claims = json.loads(_b64decode(payload))
+        if not isinstance(claims, dict):
+            raise ValueError("claims are not an object")
+    except ValueError:  # includes UnicodeError and binascii.Error
+        raise HTTPException(status_code=401, detail="Invalid access token",
+                            headers={"WWW-Authenticate": "Bearer"})
+    if claims.get("exp", 0) < time.time():
+        raise HTTPException(status_code=401, detail="Access token has expired",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return claims
+
+def current_user(authorization: Optional[str] = Header(None)) -> int:
+    """Route dependency: the student_id from the `Authorization: Bearer` header."""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Not authenticated",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return verify_token(token.strip())["sub"]
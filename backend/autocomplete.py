@@ -0,0 +1,233 @@
+import bisect
+import heapq
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime
+
+from database import get_db, DB_ERRORS
+
+# Autocomplete settings
+AUTOCOMPLETE_MAX_POSTS = int(os.getenv("AUTOCOMPLETE_MAX_POSTS", "100000"))         # newest posts indexed (bounds memory, ~1 KB each at worst)
+AUTOCOMPLETE_HALF_LIFE_DAYS = float(os.getenv("AUTOCOMPLETE_HALF_LIFE_DAYS", "30"))  # a post's weight halves every this many days
+AUTOCOMPLETE_MAX_LIMIT = 20                                                         # suggestions per request at most
+AUTOCOMPLETE_MEMO_MIN_MATCHES = 200                                                  # prefixes matching more keys than this are memoized
+AUTOCOMPLETE_LOAD_BATCH = 5000
+
+FIELDS = ("item_name", "place")
+MAX_TERM_LENGTH = 100
+
+_INVISIBLE = re.compile(r"[\u200b\u200c\u200d\u2060\ufeff]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(text):
+    """Lookup form of user input: NFC, case-folded, zero-width characters dropped, spaces collapsed.
+
+    NFC makes Thai vowel and tone marks typed in different orders or as composed characters
+    compare equal; case folding is a no-op for Thai.
+    """
+    text = unicodedata.normalize("NFC", text or "")
+    text = _INVISIBLE.sub("", text).casefold()
+    return _WHITESPACE.sub(" ", text).strip()[:MAX_TERM_LENGTH]
+
+
+def _keys(term):
+    # One key per word start, so "wallet" finds "black wallet"; Thai has no spaces and matches from the start
+    words = term.split(" ")
+    return [" ".join(words[start:]) + "\0" + term for start in range(len(words))]
+
+
+class PrefixIndex:
+    """Distinct values of one field, looked up by prefix in a sorted key list with bisect.
+
+    A term's weight is the sum of its posts' forward-decayed weights, 2^((created - epoch) /
+    half-life): newer posts count exponentially more, and because every weight is relative to
+    the same epoch the ranking never needs recomputing as time passes. The top terms of
+    popular (short) prefixes are memoized and kept up to date as weights grow; a memoized
+    list is only dropped when one of its own terms loses weight.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.pending = []     # keys of new terms, merged into `keys` at the end of each batch
+        self.terms = {}       # term -> [weight, post count, {spelling: count}]
+        self.memo = {}        # prefix -> top AUTOCOMPLETE_MAX_LIMIT terms, best first
+
+    def merge(self):
+        if not self.pending:
+            return
+        if len(self.pending) < 64:
+            for key in self.pending:
+                bisect.insort(self.keys, key)
+        else:
+            self.keys.extend(self.pending)
+            self.keys.sort()
+        self.pending = []
+
+    def _update_memo(self, term, grew):
+        prefixes = {key[:end] for key in _keys(term) for end in range(1, key.index("\0") + 1)}
+        weight = lambda t: self.terms[t][0]
+        for prefix in prefixes & self.memo.keys():
+            top = self.memo[prefix]
+            if term in top:
+                if grew:
+                    top.sort(key=weight, reverse=True)
+                else:
+                    # Something outside the list may now outrank it: recompute on the next lookup
+                    del self.memo[prefix]
+            elif grew and (len(top) < AUTOCOMPLETE_MAX_LIMIT or weight(term) > weight(top[-1])):
+                top.append(term)
+                top.sort(key=weight, reverse=True)
+                del top[AUTOCOMPLETE_MAX_LIMIT:]
+
+    def add(self, term, spelling, weight, n=1):
+        entry = self.terms.get(term)
+        if entry is None:
+            entry = self.terms[term] = [0.0, 0, {}]
+            self.pending.extend(_keys(term))
+        entry[0] += weight * n
+        entry[1] += n
+        entry[2][spelling] = entry[2].get(spelling, 0) + n
+        if entry[1] <= 0:
+            del self.terms[term]
+            if self.pending:
+                self.merge()
+            for key in _keys(term):
+                del self.keys[bisect.bisect_left(self.keys, key)]
+        elif entry[2][spelling] <= 0:
+            del entry[2][spelling]
+        if self.memo:
+            self._update_memo(term, n > 0)
+
+    def search(self, prefix, limit):
+        """Best `limit` terms starting with (a word starting with) `prefix` as (spelling, post count)."""
+        best = self.memo.get(prefix)
+        if best is None:
+            start = bisect.bisect_left(self.keys, prefix)
+            end = bisect.bisect_left(self.keys, prefix + "\U0010ffff", start)
+            # A term can match through several of its words; rank it once
+            terms = {key[key.index("\0") + 1:] for key in self.keys[start:end]}
+            best = heapq.nlargest(AUTOCOMPLETE_MAX_LIMIT, terms, key=lambda term: self.terms[term][0])
+            if end - start > AUTOCOMPLETE_MEMO_MIN_MATCHES:
+                self.memo[prefix] = best
+        # Show each term in the spelling most posts used
+        return [(max(self.terms[term][2].items(), key=lambda item: item[1])[0], self.terms[term][1])
+                for term in best[:limit]]
+
+
+class AutocompleteIndex:
+    """item_name and place values of the newest AUTOCOMPLETE_MAX_POSTS posts, for type-ahead.
+
+    `posts` remembers what each indexed post contributed, so an edit or delete takes exactly
+    that back out; it is in insertion order, and the oldest post is dropped once it is full.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.fields = {field: PrefixIndex() for field in FIELDS}
+        self.posts = OrderedDict()
+        self.epoch = time.time()
+        self.ready = False
+        self.loaded_at = None
+        self.refreshes = 0
+        self.queries = 0
+        self.total_query_time = 0.0
+
+    def _weight(self, created_at):
+        seconds = created_at.timestamp() if isinstance(created_at, datetime) else self.epoch
+        return 2.0 ** ((seconds - self.epoch) / (AUTOCOMPLETE_HALF_LIFE_DAYS * 86400))
+
+    def _remove(self, post_id):
+        old = self.posts.pop(post_id, None)
+        if old is not None:
+            weight, values = old
+            for field, (term, spelling) in zip(FIELDS, values):
+                if term:
+                    self.fields[field].add(term, spelling, weight, -1)
+
+    def apply(self, posts, removed_ids=()):
+        """Index (or re-index) `posts` (dicts with post_id, created_at and FIELDS) and drop `removed_ids`."""
+        with self._lock:
+            for post_id in removed_ids:
+                self._remove(post_id)
+            for post in posts:
+                self._remove(post["post_id"])
+                weight = self._weight(post["created_at"])
+                values = []
+                for field in FIELDS:
+                    spelling = _WHITESPACE.sub(" ", post[field] or "").strip()[:MAX_TERM_LENGTH]
+                    term = normalize(spelling)
+                    if term:
+                        self.fields[field].add(term, spelling, weight)
+                    values.append((term, spelling))
+                self.posts[post["post_id"]] = (weight, tuple(values))
+            while len(self.posts) > AUTOCOMPLETE_MAX_POSTS:
+                self._remove(next(iter(self.posts)))
+            for index in self.fields.values():
+                index.merge()
+
+    def suggest(self, field, text, limit=8):
+        """Up to `limit` values of `field` starting with `text`, most used (recently) first."""
+        started = time.perf_counter()
+        prefix = normalize(text)
+        with self._lock:
+            results = self.fields[field].search(prefix, limit) if prefix else []
+        self.queries += 1
+        self.total_query_time += time.perf_counter() - started
+        return [{"value": spelling, "count": count} for spelling, count in results]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "posts": len(self.posts),
+                "terms": sum(len(index.terms) for index in self.fields.values()),
+                "keys": sum(len(index.keys) + len(index.pending) for index in self.fields.values()),
+                "memoized_prefixes": sum(len(index.memo) for index in self.fields.values()),
+                "loaded_at": self.loaded_at,
+                "refreshes": self.refreshes,
+                "queries": self.queries,
+                "avg_query_ms": round(self.total_query_time / self.queries * 1000, 4) if self.queries else 0.0,
+            }
+
+
+POST_COLUMNS = "post_id, item_name, place, created_at"
+
+def load_index():
+    """Index the newest posts, oldest first (runs once in the background at startup)."""
+    started = time.monotonic()
+    db = get_db()
+    cursor = db.cursor(dictionary=True)
+    try:
+        cursor.execute(f'''
+            SELECT {POST_COLUMNS} FROM (
+                SELECT {POST_COLUMNS} FROM posts ORDER BY post_id DESC LIMIT %s
+            ) newest
+            ORDER BY post_id
+        ''', (AUTOCOMPLETE_MAX_POSTS,))
+        while True:
+            rows = cursor.fetchmany(AUTOCOMPLETE_LOAD_BATCH)
+            if not rows:
+                break
+            autocomplete_index.apply(rows)
+    except DB_ERRORS as err:
+        print(f"Loading the autocomplete index failed: {err}")
+        return
+    finally:
+        cursor.close()
+        db.close()
+    autocomplete_index.ready = True
+    autocomplete_index.loaded_at = datetime.now().isoformat(timespec="seconds")
+    print(f"✅ Autocomplete index loaded {len(autocomplete_index.posts)} posts in {time.monotonic() - started:.1f}s")
+
+def apply_changes(posts, removed_ids):
+    """(Re)index created/edited posts (rows with POST_COLUMNS) and drop deleted ones."""
+    autocomplete_index.apply(posts, removed_ids=removed_ids)
+    autocomplete_index.refreshes += 1
+
+
+autocomplete_index = AutocompleteIndex()
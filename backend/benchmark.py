@@ -0,0 +1,204 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from io import BytesIO
+
+from PIL import Image
+
+# Benchmark the API in-process over ASGI against a local SQLite stand-in (no outside services).
+#
+#   python benchmark.py --users 20000 --posts 200000 --concurrency 32 --requests 2000
+#   python benchmark.py --compare bench_results/previous.json
+#
+# The database and uploads live in a scratch directory (or --workdir to reuse a seeded one).
+# Results are written as JSON so runs can be diffed. Exits 1 if any request failed, or with
+# --compare on a p95 regression.
+
+ENDPOINTS = ["GET /posts", "GET /posts?search=", "GET /posts/{id}", "POST /auth/login", "POST /upload"]
+
+SEARCH_TERMS = ["wallet", "keys", "iPhone", "umbrella", "calculator", "กระเป๋า", "บัตรนักศึกษา", "Somchai"]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def random_png(rng, size=64):
+    """A small valid PNG with random pixels, so every upload has unique bytes."""
+    image = Image.frombytes("RGB", (size, size), rng.randbytes(size * size * 3))
+    buffer = BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+def make_request(endpoint, rng, seeded):
+    """Return (method, url, kwargs) for one request to `endpoint`."""
+    if endpoint == "GET /posts":
+        return "GET", "/posts", {}
+    if endpoint == "GET /posts?search=":
+        return "GET", "/posts", {"params": {"search": rng.choice(SEARCH_TERMS)}}
+    if endpoint == "GET /posts/{id}":
+        post_id = seeded["first_post"] + rng.randrange(seeded["posts"])
+        return "GET", f"/posts/{post_id}", {}
+    if endpoint == "POST /auth/login":
+        student_id = seeded["first_user"] + rng.randrange(seeded["users"])
+        return "POST", "/auth/login", {"json": {"email": f"seed{student_id}@kmitl.ac.th", "password": "password123"}}
+    if endpoint == "POST /upload":
+        # Unique bytes per request so content-addressed storage cannot dedupe the work away
+        return "POST", "/upload", {"files": {"file": ("photo.png", random_png(rng), "image/png")}}
+    raise ValueError(f"Unknown endpoint {endpoint}")
+
+async def run_endpoint(client, endpoint, total, concurrency, seeded, query_counter, rng):
+    latencies = []
+    errors = 0
+    queue = list(range(total))
+
+    async def worker():
+        nonlocal errors
+        while queue:
+            queue.pop()
+            method, url, kwargs = make_request(endpoint, rng, seeded)
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    queries_before = query_counter()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    queries = query_counter() - queries_before
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "max_ms": round(latencies[-1], 3) if latencies else 0.0,
+        "queries_per_request": round(queries / total, 2) if total else 0.0,
+    }
+
+async def run_benchmark(args):
+    import httpx
+    from app import app
+    from database import pool_stats
+    from seed_data import seed
+    from passwords import password_hasher
+
+    query_counter = lambda: pool_stats().get("queries", 0)
+    rng = random.Random(args.seed)
+
+    async with app.router.lifespan_context(app):
+        seeded_file = os.path.join("data", "seeded.json")
+        if os.path.exists(seeded_file):
+            with open(seeded_file) as f:
+                seeded = json.load(f)
+        else:
+            started = time.perf_counter()
+            seeded = seed(args.users, args.posts, seed_value=args.seed)
+            seeded["seed_seconds"] = round(time.perf_counter() - started, 1)
+            with open(seeded_file, "w") as f:
+                json.dump(seeded, f)
+
+        transport = httpx.ASGITransport(app=app)
+        results = {}
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for endpoint in args.endpoints:
+                # Short warm-up so caches and prepared statements are in a steady state
+                await run_endpoint(client, endpoint, min(50, args.requests), args.concurrency, seeded, query_counter, rng)
+                results[endpoint] = await run_endpoint(
+                    client, endpoint, args.requests, args.concurrency, seeded, query_counter, rng
+                )
+                r = results[endpoint]
+                print(f"{endpoint:22} p50 {r['p50_ms']:8.2f}ms  p95 {r['p95_ms']:8.2f}ms  p99 {r['p99_ms']:8.2f}ms  "
+                      f"{r['throughput_rps']:8.1f} req/s  {r['queries_per_request']:5.2f} q/req  {r['errors']} errors")
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "dataset": {"users": seeded["users"], "posts": seeded["posts"]},
+        "settings": {"concurrency": args.concurrency, "requests": args.requests, "cache": not args.no_cache,
+                     "password_hash": password_hasher.stats()},
+        "results": results,
+    }
+
+def compare(current, previous, threshold):
+    """Print p95 deltas against a previous run; returns True if any endpoint regressed past `threshold`."""
+    regressed = False
+    for endpoint, result in current["results"].items():
+        before = previous.get("results", {}).get(endpoint)
+        if not before or not before["p95_ms"]:
+            continue
+        change = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"]
+        flag = "❌" if change > threshold else "✅"
+        regressed |= change > threshold
+        print(f"{flag} {endpoint:22} p95 {before['p95_ms']:.2f}ms -> {result['p95_ms']:.2f}ms ({change:+.0%}), "
+              f"q/req {before['queries_per_request']} -> {result['queries_per_request']}")
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description="Lost&Found API benchmark")
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--posts", type=int, default=200000)
+    parser.add_argument("--requests", type=int, default=1000, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--endpoints", nargs="+", default=ENDPOINTS, choices=ENDPOINTS)
+    parser.add_argument("--workdir", help="directory holding the SQLite file and uploads (reused if seeded)")
+    parser.add_argument("--output", help="where to write the JSON results")
+    parser.add_argument("--compare", help="previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed p95 slowdown before failing")
+    parser.add_argument("--no-cache", action="store_true", help="disable the response cache")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output or os.path.join(
+        "bench_results", datetime.now().strftime("%Y%m%d-%H%M%S") + ".json"))
+    previous_path = os.path.abspath(args.compare) if args.compare else None
+
+    # Configure the app before it is imported: SQLite stand-in, scratch working directory
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="lostfound-bench-"))
+    os.makedirs(workdir, exist_ok=True)
+    os.environ["DB_BACKEND"] = "sqlite"
+    os.environ["SQLITE_PATH"] = os.path.join(workdir, "data", "bench.db")
+    os.environ["ADMISSION_ENABLED"] = "0"   # measure the API, not the rate limiter's 429s
+    os.environ.setdefault("EXPIRY_INTERVAL_SECONDS", "3600")
+    if args.no_cache:
+        os.environ["RESPONSE_CACHE_TTL"] = "0"
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(workdir)
+    os.makedirs("data", exist_ok=True)
+
+    report = asyncio.run(run_benchmark(args))
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Results written to {output} (workdir {workdir})")
+
+    # Latencies of failed requests mean nothing: a run with errors fails outright
+    failed = False
+    for endpoint, result in report["results"].items():
+        if result["errors"]:
+            print(f"❌ {endpoint}: {result['errors']} of {result['requests']} requests failed")
+            failed = True
+
+    if previous_path:
+        with open(previous_path) as f:
+            previous = json.load(f)
+        failed |= compare(report, previous, args.threshold)
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import codecs
+import csv
+import json
+import os
+import time
+from datetime import timedelta
+
+from database import get_db, insert_rows, run_db, db_now, DB_ERRORS
+from read_model import refresh_cards
+
+# Bulk import settings
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))        # rows per transaction
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "50000"))
+IMPORT_MAX_REPORTED_ERRORS = int(os.getenv("IMPORT_MAX_REPORTED_ERRORS", "1000"))
+IMPORT_MAX_IMAGES = int(os.getenv("IMPORT_MAX_IMAGES", "10"))
+
+IMPORT_STATUSES = ("lost", "found", "returned", "claimed")
+REQUIRED_FIELDS = ("item_name", "item_status", "place")
+# Same limits as the VARCHAR columns in the MySQL schema
+MAX_LENGTHS = {"item_name": 100, "place": 100}
+MAX_IMAGE_URL_LENGTH = 255
+
+FORMATS_BY_CONTENT_TYPE = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/x-jsonlines": "ndjson",
+}
+
+
+class ImportAborted(Exception):
+    """The stream itself is unusable (bad encoding, too many rows); rows already committed stay."""
+
+
+def detect_format(fmt, content_type):
+    if fmt:
+        return fmt.lower() if fmt.lower() in ("csv", "ndjson") else None
+    return FORMATS_BY_CONTENT_TYPE.get((content_type or "").split(";")[0].strip().lower())
+
+async def iter_lines(chunks):
+    """Decode a byte stream into complete text lines without holding the whole body."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    try:
+        async for chunk in chunks:
+            pending += decoder.decode(chunk)
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                yield line
+        pending += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise ImportAborted("File is not valid UTF-8")
+    if pending:
+        yield pending
+
+async def iter_records(chunks, fmt):
+    """Yield (row_number, record, error) for each row of a streamed CSV or NDJSON body."""
+    row_number = 0
+    if fmt == "ndjson":
+        async for line in iter_lines(chunks):
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield row_number, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield row_number, None, "Each line must be a JSON object"
+                continue
+            yield row_number, record, None
+        return
+
+    header = None
+    record_lines = []
+    async for line in iter_lines(chunks):
+        # A quoted field may contain newlines: the record is complete once its quotes balance
+        record_lines.append(line)
+        if sum(part.count('"') for part in record_lines) % 2:
+            continue
+        text = "\n".join(record_lines)
+        record_lines = []
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip().lower() for name in values]
+            continue
+        row_number += 1
+        if len(values) != len(header):
+            yield row_number, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield row_number, dict(zip(header, values)), None
+    if record_lines:
+        yield row_number + 1, None, "Unterminated quoted field"
+
+def validate_record(record):
+    """Return (post, None) with a normalized post dict, or (None, error message)."""
+    post = {}
+    for field in ("item_name", "description", "item_status", "place"):
+        value = record.get(field)
+        if value is None:
+            value = ""
+        if not isinstance(value, str):
+            return None, f"{field} must be a string"
+        post[field] = value.strip()
+
+    missing = [field for field in REQUIRED_FIELDS if not post[field]]
+    if missing:
+        return None, f"Missing {', '.join(missing)}"
+    post["item_status"] = post["item_status"].lower()
+    if post["item_status"] not in IMPORT_STATUSES:
+        return None, f"item_status must be one of {', '.join(IMPORT_STATUSES)}"
+    for field, limit in MAX_LENGTHS.items():
+        if len(post[field]) > limit:
+            return None, f"{field} is longer than {limit} characters"
+
+    # CSV carries images as one "|"-separated column, NDJSON as a list
+    images = record.get("images") or []
+    if isinstance(images, str):
+        images = [url.strip() for url in images.split("|") if url.strip()]
+    if not isinstance(images, list) or not all(isinstance(url, str) for url in images):
+        return None, "images must be a list of URLs"
+    if len(images) > IMPORT_MAX_IMAGES:
+        return None, f"At most {IMPORT_MAX_IMAGES} images per post"
+    if any(len(url) > MAX_IMAGE_URL_LENGTH for url in images):
+        return None, f"Image URLs must be at most {MAX_IMAGE_URL_LENGTH} characters"
+    post["images"] = images
+    return post, None
+
+def _insert_posts(db, cursor, posts, student_id):
+    columns = ["student_id", "item_name", "description", "item_status", "place"]
+    rows = [[student_id, p["item_name"], p["description"], p["item_status"], p["place"]] for p in posts]
+    if db.dialect != "mysql":
+        # expires_at is generated from created_at on MySQL; SQLite stores it like create_post does
+        expires_at = db_now() + timedelta(days=30)
+        columns.append("expires_at")
+        for row in rows:
+            row.append(expires_at)
+    post_ids = insert_rows(db, cursor, "posts", columns, rows)
+
+    image_rows = [(post_id, url, order)
+                  for post_id, post in zip(post_ids, posts)
+                  for order, url in enumerate(post["images"])]
+    if image_rows:
+        insert_rows(db, cursor, "post_images", ("post_id", "image_url", "image_order"), image_rows)
+    refresh_cards(db, post_ids)
+    return post_ids
+
+def insert_batch(batch, student_id):
+    """Insert [(row_number, post)] in one transaction. Returns ([(row_number, post_id)], errors).
+
+    If the transaction fails, the batch is retried one row per transaction so a single
+    bad row is reported on its own instead of sinking its neighbours.
+    """
+    db = get_db()
+    cursor = db.cursor()
+
+    try:
+        try:
+            post_ids = _insert_posts(db, cursor, [post for _, post in batch], student_id)
+            db.commit()
+            return [(row_number, post_id) for (row_number, _), post_id in zip(batch, post_ids)], []
+        except DB_ERRORS:
+            db.rollback()
+
+        imported, errors = [], []
+        for row_number, post in batch:
+            try:
+                post_id, = _insert_posts(db, cursor, [post], student_id)
+                db.commit()
+                imported.append((row_number, post_id))
+            except DB_ERRORS as err:
+                db.rollback()
+                errors.append({"row": row_number, "error": f"Database error: {err}"})
+        return imported, errors
+
+    finally:
+        cursor.close()
+        db.close()
+
+async def import_posts(chunks, fmt, student_id):
+    """Stream-parse, validate and insert posts in batches; returns the import report."""
+    started = time.monotonic()
+    report = {"rows": 0, "imported": 0, "failed": 0, "batches": 0, "post_ids": [], "errors": []}
+
+    def add_error(error):
+        report["failed"] += 1
+        if len(report["errors"]) < IMPORT_MAX_REPORTED_ERRORS:
+            report["errors"].append(error)
+
+    async def flush(batch):
+        imported, errors = await run_db(insert_batch, batch, student_id)
+        report["batches"] += 1
+        report["imported"] += len(imported)
+        report["post_ids"].extend(post_id for _, post_id in imported)
+        for error in errors:
+            add_error(error)
+
+    batch = []
+    try:
+        async for row_number, record, error in iter_records(chunks, fmt):
+            if row_number > IMPORT_MAX_ROWS:
+                raise ImportAborted(f"Imports are limited to {IMPORT_MAX_ROWS} rows")
+            report["rows"] = row_number
+            if record is not None:
+                post, error = validate_record(record)
+            if error:
+                add_error({"row": row_number, "error": error})
+                continue
+            batch.append((row_number, post))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await flush(batch)
+                batch = []
+    except ImportAborted as e:
+        # Rows already committed stay; the report says where the import stopped
+        report["aborted"] = str(e)
+    # Rows validated before an abort are still imported, so imported + failed always equals rows
+    if batch:
+        await flush(batch)
+
+    report["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+    return report
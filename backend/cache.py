@@ -0,0 +1,178 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Cache settings
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))          # seconds an entry stays fresh
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+POST_FRAGMENT_TTL = float(os.getenv("POST_FRAGMENT_TTL", "60"))             # bounds staleness of image derivatives
+POST_FRAGMENT_MAX_ENTRIES = int(os.getenv("POST_FRAGMENT_MAX_ENTRIES", "20000"))
+
+
+class CacheEntry:
+    """A rendered JSON body with its strong ETag."""
+
+    __slots__ = ("body", "etag", "expires_at")
+
+    def __init__(self, body, expires_at):
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """In-process TTL + LRU cache of rendered responses.
+
+    Every write to posts calls invalidate(), which bumps the generation so a
+    read that started before the write cannot store its (now stale) result.
+    """
+
+    def __init__(self, ttl=RESPONSE_CACHE_TTL, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Statistics
+        self._hits = 0
+        self._misses = 0
+        self._not_modified = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry
+            if entry is not None:
+                del self._entries[key]
+            self._misses += 1
+            return None
+
+    def put(self, key, body, generation):
+        """Store body for key unless an invalidation happened since `generation` was read."""
+        entry = CacheEntry(body, time.monotonic() + self.ttl)
+        with self._lock:
+            if generation != self.generation:
+                return entry
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return entry
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._invalidations += 1
+
+    def record_not_modified(self):
+        with self._lock:
+            self._not_modified += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "not_modified": self._not_modified,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+
+class PostFragmentCache:
+    """Encoded JSON of single post cards, shared by every feed page, search and user list.
+
+    Unlike the response cache, a write only drops the fragments of the posts it touched;
+    the generation check still keeps a read that raced a write from storing stale bytes.
+    """
+
+    def __init__(self, ttl=POST_FRAGMENT_TTL, max_entries=POST_FRAGMENT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.generation = 0
+        self._entries = OrderedDict()    # post_id -> (fragment, expires_at)
+        self._lock = threading.Lock()
+        # Statistics
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get_many(self, post_ids):
+        """Fresh fragments for the ids that have one, as {post_id: bytes}."""
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for post_id in post_ids:
+                entry = self._entries.get(post_id)
+                if entry is not None and entry[1] > now:
+                    self._entries.move_to_end(post_id)
+                    found[post_id] = entry[0]
+            self._hits += len(found)
+            self._misses += len(post_ids) - len(found)
+        return found
+
+    def put_many(self, fragments, generation):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            if generation != self.generation:
+                return
+            for post_id, fragment in fragments.items():
+                self._entries[post_id] = (fragment, expires_at)
+                self._entries.move_to_end(post_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def discard(self, post_ids=None):
+        """Drop the given posts' fragments, or all of them."""
+        with self._lock:
+            self.generation += 1
+            if post_ids is None:
+                self._entries.clear()
+            for post_id in post_ids or ():
+                self._entries.pop(post_id, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "fragment_entries": len(self._entries),
+                "fragment_hits": self._hits,
+                "fragment_misses": self._misses,
+                "fragment_hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "fragment_evictions": self._evictions,
+            }
+
+
+response_cache = ResponseCache()
+post_fragments = PostFragmentCache()
+
+def cache_key(request):
+    """Route path plus sorted query parameters, so ?a=1&b=2 and ?b=2&a=1 share an entry."""
+    return request.url.path + "?" + "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+
+def invalidate_post_cache(post_ids=None):
+    """Drop every cached feed/detail response; call after any write to posts.
+
+    Pass the written post ids to keep the other posts' fragments (None drops them all).
+    """
+    response_cache.invalidate()
+    post_fragments.discard(post_ids)
+
+def cache_stats():
+    return {**response_cache.stats(), **post_fragments.stats()}
@@ -1,157 +1,368 @@
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, errorcode
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import functools
+from datetime import datetime, timezone
+import os
+import threading
+import sqlite3
+import time
+
+import sqlite_backend
+from metrics import record_query
+from migrations import apply_migrations
+
+# Storage backend: "mysql" (default) or "sqlite" for single-node deployments and CI
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql").lower()
+
+# Errors routes should treat as database failures, whichever backend is active
+DB_ERRORS = (Error, sqlite3.Error)
+
+# Connection settings (see .env.local)
+DB_HOST = os.getenv("DB_HOST", "localhost")
+DB_PORT = int(os.getenv("DB_PORT", "3306"))
+DB_USER = os.getenv("DB_USER", "root")
+DB_PASSWORD = os.getenv("DB_PASSWORD", "")  # Empty for XAMPP
+DB_NAME = os.getenv("DB_NAME", "lost_found_system")
+
+# Pool settings
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))      # seconds to wait for a free connection
+DB_POOL_RECYCLE = float(os.getenv("DB_POOL_RECYCLE", "1800"))   # seconds before a connection is replaced
+
+# Executor settings for running blocking DB work off the event loop
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", str(DB_POOL_SIZE)))
+DB_EXECUTOR_MAX_QUEUE = int(os.getenv("DB_EXECUTOR_MAX_QUEUE", "200"))  # pending jobs before new ones get a 503
+
+# Rows per multi-row INSERT statement (keeps statements under packet/variable limits)
+DB_INSERT_CHUNK_ROWS = int(os.getenv("DB_INSERT_CHUNK_ROWS", "500"))
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no pooled connection becomes free within DB_POOL_TIMEOUT."""
+
+
+class PooledConnection:
+    """Wrapper around a MySQL connection that returns it to the pool on close()."""
+
+    dialect = "mysql"
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+        self._created_at = time.monotonic()
+        self._closed = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return TimedCursor(self._conn.cursor(*args, **kwargs))
+
+    def close(self):
+        # Routes call db.close() in their finally blocks; hand the connection back instead
+        if not self._closed:
+            self._closed = True
+            self._pool._release(self)
+
+
+class TimedCursor:
+    """MySQL cursor wrapper that reports every statement's execution time to the metrics."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, sql, params=()):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(sql, params)
+        finally:
+            record_query(sql, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_params):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(sql, seq_of_params)
+        finally:
+            record_query(sql, time.perf_counter() - started)
+
+
+class ConnectionPool:
+    """Fixed-size MySQL connection pool with ping-on-checkout and stale connection recycling."""
+
+    def __init__(self, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT, recycle=DB_POOL_RECYCLE):
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self._idle = []
+        self._in_use = 0
+        self._cond = threading.Condition()
+        # Statistics
+        self._checkouts = 0
+        self._timeouts = 0
+        self._recycled = 0
+        self._waiting = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _connect(self):
+        return mysql.connector.connect(
+            host=DB_HOST,
+            port=DB_PORT,
+            user=DB_USER,
+            password=DB_PASSWORD,
+            database=DB_NAME
+        )
+
+    def _is_usable(self, pooled):
+        """Pre-ping an idle connection and drop it if it is too old or dead."""
+        if self.recycle and time.monotonic() - pooled._created_at > self.recycle:
+            return False
+        try:
+            pooled._conn.ping(reconnect=False)
+            return True
+        except Error:
+            return False
+
+    def _discard(self, pooled):
+        try:
+            pooled._conn.close()
+        except Error:
+            pass
+
+    def acquire(self):
+        started = time.monotonic()
+        with self._cond:
+            self._waiting += 1
+            try:
+                while not self._idle and self._in_use >= self.size:
+                    remaining = self.timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolExhaustedError(
+                            f"No database connection available after {self.timeout}s"
+                        )
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            pooled = self._idle.pop() if self._idle else None
+            self._in_use += 1
+
+        try:
+            if pooled is not None and not self._is_usable(pooled):
+                self._discard(pooled)
+                with self._cond:
+                    self._recycled += 1
+                pooled = None
+            if pooled is None:
+                pooled = PooledConnection(self, self._connect())
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        pooled._closed = False
+        waited = time.monotonic() - started
+        with self._cond:
+            self._checkouts += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+        return pooled
+
+    def _release(self, pooled):
+        try:
+            # Never hand a half-finished transaction to the next request
+            if pooled._conn.in_transaction:
+                pooled._conn.rollback()
+            keep = pooled._conn.is_connected()
+        except Error:
+            keep = False
+
+        if not keep:
+            self._discard(pooled)
+
+        with self._cond:
+            self._in_use -= 1
+            if keep:
+                self._idle.append(pooled)
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "recycled": self._recycled,
+                "avg_wait_ms": round(self._total_wait / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 3),
+            }
+
+
+pool = ConnectionPool()
 
 def get_db():
-    """Create a database connection for standard API operations."""
+    """Check out a pooled database connection for standard API operations.
+
+    Calling close() on the returned connection gives it back to the pool.
+    Raises PoolExhaustedError if the pool stays full for DB_POOL_TIMEOUT seconds.
+    With DB_BACKEND=sqlite this returns the calling thread's SQLite connection instead.
+    """
+    if DB_BACKEND == "sqlite":
+        return sqlite_backend.connect()
     try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="",  # Empty for XAMPP
-            database="lost_found_system"
-        )
-        return connection
+        return pool.acquire()
     except Error as e:
         print(f"Database connection failed: {e}")
         return None
 
+def pool_stats():
+    """Return a snapshot of the connection pool counters."""
+    if DB_BACKEND == "sqlite":
+        return sqlite_backend.sqlite_db.stats()
+    return pool.stats()
+
+def db_now():
+    """Current time on the database's clock, for values compared with CURRENT_TIMESTAMP.
+
+    SQLite's CURRENT_TIMESTAMP is UTC; MySQL's follows the server's (local) time zone.
+    """
+    if DB_BACKEND == "sqlite":
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+    return datetime.now()
+
+
+class DBExecutor:
+    """Bounded thread pool that runs blocking database calls for async routes."""
+
+    def __init__(self, workers=DB_EXECUTOR_WORKERS, max_queue=DB_EXECUTOR_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_queue_wait = 0.0
+        self._max_queue_wait = 0.0
+
+    def _run(self, submitted_at, func, args, kwargs):
+        waited = time.monotonic() - submitted_at
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+            self._total_queue_wait += waited
+            self._max_queue_wait = max(self._max_queue_wait, waited)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+
+    async def run(self, func, *args, **kwargs):
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._rejected += 1
+                raise PoolExhaustedError("Database work queue is full")
+            self._queued += 1
+        loop = asyncio.get_running_loop()
+        job = functools.partial(self._run, time.monotonic(), func, args, kwargs)
+        # Run in the caller's context so queries are accounted to the request that made them
+        return await loop.run_in_executor(self._executor, contextvars.copy_context().run, job)
+
+    def stats(self):
+        with self._lock:
+            started = self._completed + self._active
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queued": self._queued,
+                "active": self._active,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_queue_wait_ms": round(self._total_queue_wait / started * 1000, 3) if started else 0.0,
+                "max_queue_wait_ms": round(self._max_queue_wait * 1000, 3),
+            }
+
+
+db_executor = DBExecutor()
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking database function on the DB executor and await its result."""
+    return await db_executor.run(func, *args, **kwargs)
+
+def executor_stats():
+    """Return a snapshot of the DB executor counters."""
+    return db_executor.stats()
+
+def insert_rows(db, cursor, table, columns, rows, chunk_size=DB_INSERT_CHUNK_ROWS):
+    """Insert `rows` with multi-row INSERT statements and return the new ids, in row order.
+
+    A single multi-row INSERT gets consecutive auto-increment ids on both backends (InnoDB
+    allocates them up front for simple inserts; SQLite holds the writer lock). mysql-connector
+    reports the first id of the statement, sqlite3 the last one.
+    """
+    ids = []
+    placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([placeholders] * len(chunk))}",
+            [value for row in chunk for value in row]
+        )
+        first_id = cursor.lastrowid if db.dialect == "mysql" else cursor.lastrowid - len(chunk) + 1
+        ids.extend(range(first_id, first_id + len(chunk)))
+    return ids
+
 def init_database():
-    """Initialize database and tables."""
-    # Initialize conn and cursor to None to prevent UnboundLocalError 
-    # if the initial connection fails. (FIXED PYTHON ERROR)
+    """Create the database if needed and apply pending schema migrations."""
+    if DB_BACKEND == "sqlite":
+        return init_sqlite_database()
+    
     conn = None
     cursor = None
     
     try:
-        # First connect without specifying the database to create it
-        conn = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password=""
-        )
-        cursor = conn.cursor()
-        
-        # Create database if not exists
-        cursor.execute("CREATE DATABASE IF NOT EXISTS lost_found_system")
-        cursor.execute("USE lost_found_system")
-        
-        # --- Create 'users' table (Must be created before 'user_social_profiles') ---
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                student_id INT AUTO_INCREMENT PRIMARY KEY,
-                full_name VARCHAR(255) NOT NULL,
-                faculty ENUM(
-                    'School of Engineering',
-                    'School of Architecture, Art, and Design',
-                    'School of Industrial Education and Technology',
-                    'School of Agricultural Technology',
-                    'School of Science',
-                    'School of Food Industry',
-                    'School of Information Technology',
-                    'International College',
-                    'College of Materials Innovation and Technology',
-                    'College of Advanced Manufacturing Innovation',
-                    'KMITL Business School',
-                    'International Academy of Aviation Industry',
-                    'School of Liberal Arts',
-                    'Faculty of Medicine',
-                    'College of Innovation and Industrial Management',
-                    'Institute of Music Science and Engineering',
-                    'School of Dentistry',
-                    'School of Nursing Science',
-                    'School of Integrated Innovative Technology'
-                ) NOT NULL,
-                class_year ENUM('1', '2', '3', '4', '5', '6') NOT NULL,
-                phone VARCHAR(20) NOT NULL,
-                email VARCHAR(255) UNIQUE NOT NULL,
-                password VARCHAR(255) NOT NULL,
-                profile_photo_url VARCHAR(255),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-            ) ENGINE=InnoDB
-        ''')
-        
-        # --- Create 'social_profiles' table (Must be created before 'user_social_profiles') ---
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS social_profiles (
-                contact_id INT AUTO_INCREMENT PRIMARY KEY,
-                platform ENUM('Facebook', 'Instagram', 'LINE', 'Twitter / X', 'Discord', 'Other') NOT NULL,
-                profile_url VARCHAR(255) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            ) ENGINE=InnoDB
-        ''')
+        try:
+            conn = mysql.connector.connect(
+                host=DB_HOST,
+                port=DB_PORT,
+                user=DB_USER,
+                password=DB_PASSWORD,
+                database=DB_NAME
+            )
+            cursor = conn.cursor()
+        except Error as e:
+            if e.errno != errorcode.ER_BAD_DB_ERROR:
+                raise
+            # First run: connect without specifying the database to create it
+            conn = mysql.connector.connect(
+                host=DB_HOST,
+                port=DB_PORT,
+                user=DB_USER,
+                password=DB_PASSWORD
+            )
+            cursor = conn.cursor()
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_NAME}")
+            cursor.execute(f"USE {DB_NAME}")
         
-        # --- Create 'user_social_profiles' junction table (Many-to-Many link) ---
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_social_profiles (
-                user_social_id INT AUTO_INCREMENT PRIMARY KEY,
-                student_id INT NOT NULL,
-                contact_id INT NOT NULL,
-                -- Ensures a user can't have the same link defined twice
-                UNIQUE KEY unique_user_contact (student_id, contact_id), 
-                FOREIGN KEY (student_id) REFERENCES users(student_id) ON DELETE CASCADE,
-                FOREIGN KEY (contact_id) REFERENCES social_profiles(contact_id) ON DELETE CASCADE
-            ) ENGINE=InnoDB
-        ''')
-
-        # --- Create 'posts' table ---
-        # FIXED: expires_at is now a Generated Column for reliability (MySQL 5.7+ required)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS posts (
-                post_id INT AUTO_INCREMENT PRIMARY KEY,
-                student_id INT NOT NULL,
-                item_name VARCHAR(100) NOT NULL,
-                item_status ENUM('lost', 'found', 'returned', 'claimed', 'expired') DEFAULT 'lost',
-                place VARCHAR(100) NOT NULL,
-                description TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                -- Corrected to use GENERATED ALWAYS AS for calculation-based columns
-                expires_at DATETIME GENERATED ALWAYS AS (DATE_ADD(created_at, INTERVAL 30 DAY)) STORED,
-                FOREIGN KEY (student_id) REFERENCES users(student_id) ON DELETE CASCADE
-            ) ENGINE=InnoDB
-        ''')
-
-        # --- Create 'post_images' table ---
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS post_images (
-                post_image_id INT AUTO_INCREMENT PRIMARY KEY,
-                post_id INT NOT NULL,
-                image_url VARCHAR(255) NOT NULL,
-                image_order INT NOT NULL DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (post_id) REFERENCES posts(post_id) ON DELETE CASCADE
-            ) ENGINE=InnoDB
-        ''')
-        
-        # --- Create event to automatically handle expired posts ---
-        # NOTE: This requires the MySQL Event Scheduler to be enabled on your server.
-        # Check if the event scheduler is enabled.
-        cursor.execute("SET GLOBAL event_scheduler = ON") 
-        
-        cursor.execute('''
-            CREATE EVENT IF NOT EXISTS auto_handle_expired_posts
-            ON SCHEDULE EVERY 1 DAY
-            DO
-            BEGIN
-                -- 1. Mark posts as 'expired' when the expiration date has passed
-                UPDATE posts 
-                SET item_status = 'expired' 
-                WHERE expires_at < NOW() 
-                AND item_status IN ('lost', 'found');
-                
-                -- 2. Delete posts marked 'expired' that have been expired for an additional 30 days
-                -- (This keeps expired posts visible for 30 days after the initial expiration)
-                DELETE FROM posts 
-                WHERE item_status = 'expired' 
-                AND expires_at < (NOW() - INTERVAL 30 DAY);
-            END
-        ''')
-        
-        conn.commit()
-        print("✅ Database 'lost_found_system' initialized successfully!")
-        print("✅ All tables created with proper relationships!")
-        print("✅ Auto-expiration event created and enabled!")
+        applied = apply_migrations(conn, cursor, "mysql")
+        if applied:
+            print(f"✅ Database '{DB_NAME}' migrated to version {applied[-1]}!")
         
     except Error as e:
         print(f"Database initialization failed: {e}")
@@ -160,4 +371,19 @@ def init_database():
         if conn and conn.is_connected():
             if cursor:
                 cursor.close()
-            conn.close()
\ No newline at end of file
+            conn.close()
+
+def init_sqlite_database():
+    """Apply pending SQLite migrations (the file is created on first connect)."""
+    conn = sqlite_backend.connect()
+    cursor = conn.cursor()
+    
+    try:
+        applied = apply_migrations(conn, cursor, "sqlite")
+        if applied:
+            print(f"✅ SQLite database '{sqlite_backend.SQLITE_PATH}' migrated to version {applied[-1]}!")
+    except sqlite3.Error as e:
+        print(f"Database initialization failed: {e}")
+    finally:
+        cursor.close()
+        conn.close()
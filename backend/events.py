@@ -0,0 +1,149 @@
+import asyncio
+import json
+import os
+import secrets
+from collections import deque
+
+# Post event settings
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))        # per subscriber; a full queue drops the client
+EVENTS_HISTORY_SIZE = int(os.getenv("EVENTS_HISTORY_SIZE", "1000"))   # recent events kept for Last-Event-ID resume
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+EVENTS_RETRY_MS = int(os.getenv("EVENTS_RETRY_MS", "3000"))           # client reconnect delay
+
+# Event ids are "<boot>-<seq>"; an id from an earlier process cannot be resumed
+BOOT_ID = secrets.token_hex(4)
+
+_HEARTBEAT = object()
+_DROPPED = object()
+
+
+def format_event(event_id, name, data):
+    return f"id: {event_id}\nevent: {name}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+class Subscriber:
+    def __init__(self):
+        self.queue = asyncio.Queue(maxsize=EVENTS_QUEUE_SIZE)
+        self.dropped = False
+
+
+class EventBroker:
+    """In-process fan-out of post events to Server-Sent Events subscribers.
+
+    publish() may be called from any thread (routes run on the DB executor); delivery happens
+    on the event loop. Each subscriber has a bounded queue: a client that falls that far behind
+    is dropped and reconnects with Last-Event-ID instead of growing server memory. Idle
+    subscribers only wait on their queue; one broker-wide task sends the heartbeats.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._heartbeat_task = None
+        self._subscribers = set()
+        self._history = deque(maxlen=EVENTS_HISTORY_SIZE)
+        self._seq = 0
+        self._published = 0
+        self._dropped = 0
+
+    def start(self):
+        """Bind to the running loop and start the heartbeat (call from the startup hook)."""
+        self._loop = asyncio.get_running_loop()
+        if self._heartbeat_task is None:
+            self._heartbeat_task = self._loop.create_task(self._heartbeat())
+
+    async def stop(self):
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+        for subscriber in list(self._subscribers):
+            self._drop(subscriber)
+        self._loop = None
+
+    def publish(self, name, data):
+        """Queue an event for every subscriber; a no-op when no loop is running (CLI tools)."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._dispatch, name, data)
+
+    def _dispatch(self, name, data):
+        # Ids are assigned here, on the loop, so they follow delivery order whatever thread published
+        self._seq += 1
+        message = format_event(f"{BOOT_ID}-{self._seq}", name, data)
+        self._history.append((self._seq, message))
+        self._published += 1
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._drop(subscriber)
+
+    def _drop(self, subscriber):
+        self._subscribers.discard(subscriber)
+        if subscriber.dropped:
+            return
+        subscriber.dropped = True
+        self._dropped += 1
+        # Make room so the stream can end promptly instead of draining a full backlog
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(_DROPPED)
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(EVENTS_HEARTBEAT_SECONDS)
+            for subscriber in list(self._subscribers):
+                try:
+                    subscriber.queue.put_nowait(_HEARTBEAT)
+                except asyncio.QueueFull:
+                    self._drop(subscriber)
+
+    def _replay(self, last_event_id):
+        """Messages after `last_event_id`, or None if they are no longer (or never were) kept."""
+        boot, _, seq = (last_event_id or "").partition("-")
+        if boot != BOOT_ID or not seq.isdigit():
+            return None
+        seq = int(seq)
+        if self._history and self._history[0][0] > seq + 1:
+            return None
+        return [message for event_seq, message in self._history if event_seq > seq]
+
+    async def stream(self, last_event_id=None):
+        """Async iterator of SSE text for one client."""
+        subscriber = Subscriber()
+        # Snapshot the backlog in the same loop step as subscribing, so no event is missed or doubled
+        self._subscribers.add(subscriber)
+        missed = self._replay(last_event_id) if last_event_id else []
+        try:
+            yield f"retry: {EVENTS_RETRY_MS}\n\n"
+            if last_event_id:
+                if missed is None:
+                    # Too far behind (or the server restarted): tell the client to reload the feed
+                    yield format_event(f"{BOOT_ID}-{self._seq}", "reset", {})
+                else:
+                    for message in missed:
+                        yield message
+            while True:
+                message = await subscriber.queue.get()
+                if message is _DROPPED:
+                    return
+                yield ": keepalive\n\n" if message is _HEARTBEAT else message
+        finally:
+            self._subscribers.discard(subscriber)
+
+    def stats(self):
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self._published,
+            "dropped": self._dropped,
+            "history": len(self._history),
+            "queue_size": EVENTS_QUEUE_SIZE,
+            "heartbeat_seconds": EVENTS_HEARTBEAT_SECONDS,
+        }
+
+
+post_events = EventBroker()
@@ -0,0 +1,156 @@
+import asyncio
+import os
+import threading
+import time
+
+from database import get_db, run_db, DB_ERRORS
+from read_model import refresh_cards, drop_cards
+
+# Expiry settings
+EXPIRY_INTERVAL_SECONDS = float(os.getenv("EXPIRY_INTERVAL_SECONDS", "300"))
+EXPIRY_BATCH_SIZE = int(os.getenv("EXPIRY_BATCH_SIZE", "500"))
+EXPIRY_PURGE_AFTER_DAYS = int(os.getenv("EXPIRY_PURGE_AFTER_DAYS", "30"))  # expired posts stay visible this long
+EXPIRY_LOCK_NAME = "lost_found_expiry_sweep"
+
+_metrics_lock = threading.Lock()
+_metrics = {
+    "runs": 0,
+    "skipped_not_leader": 0,
+    "failures": 0,
+    "last_run": None,
+}
+
+
+def _in_clause(ids):
+    return ", ".join(["%s"] * len(ids))
+
+def _expire_batch(db, cursor, batch_size):
+    """Mark one batch of overdue lost/found posts as expired; returns their ids."""
+    cursor.execute('''
+        SELECT post_id FROM posts
+        WHERE item_status IN ('lost', 'found')
+        AND expires_at < CURRENT_TIMESTAMP
+        ORDER BY expires_at
+        LIMIT %s
+    ''', (batch_size,))
+    ids = [row[0] for row in cursor.fetchall()]
+    if ids:
+        cursor.execute(f'''
+            UPDATE posts SET item_status = 'expired'
+            WHERE post_id IN ({_in_clause(ids)})
+            AND item_status IN ('lost', 'found')
+        ''', ids)
+        refresh_cards(db, ids)
+    db.commit()
+    return ids
+
+def _purge_batch(db, cursor, batch_size):
+    """Delete one batch of posts that have been expired for EXPIRY_PURGE_AFTER_DAYS; returns their ids."""
+    if db.dialect == "sqlite":
+        cutoff_sql, cutoff_param = "datetime('now', %s)", f"-{EXPIRY_PURGE_AFTER_DAYS} days"
+    else:
+        cutoff_sql, cutoff_param = "(CURRENT_TIMESTAMP - INTERVAL %s DAY)", EXPIRY_PURGE_AFTER_DAYS
+    cursor.execute(f'''
+        SELECT post_id FROM posts
+        WHERE item_status = 'expired'
+        AND expires_at < {cutoff_sql}
+        ORDER BY expires_at
+        LIMIT %s
+    ''', (cutoff_param, batch_size))
+    ids = [row[0] for row in cursor.fetchall()]
+    if ids:
+        cursor.execute(f"DELETE FROM post_images WHERE post_id IN ({_in_clause(ids)})", ids)
+        drop_cards(db, ids)
+        cursor.execute(f"DELETE FROM posts WHERE post_id IN ({_in_clause(ids)})", ids)
+    db.commit()
+    return ids
+
+def run_expiry_sweep(batch_size=EXPIRY_BATCH_SIZE):
+    """Expire and purge posts in small batches, if this worker wins the advisory lock.
+
+    Each batch is its own short transaction, so row locks are held only briefly.
+    Returns a report dict, or None when another worker is already sweeping.
+    """
+    db = get_db()
+    cursor = db.cursor()
+    started = time.monotonic()
+    report = {"expired_ids": [], "purged_ids": [], "batches": 0}
+    
+    try:
+        # Only one worker (across all uvicorn processes) sweeps at a time.
+        # SQLite deployments are single-node and writes are already serialized.
+        use_lock = db.dialect == "mysql"
+        if use_lock:
+            cursor.execute("SELECT GET_LOCK(%s, 0)", (EXPIRY_LOCK_NAME,))
+        if use_lock and cursor.fetchone()[0] != 1:
+            with _metrics_lock:
+                _metrics["skipped_not_leader"] += 1
+            return None
+        
+        try:
+            for step, key in ((_expire_batch, "expired_ids"), (_purge_batch, "purged_ids")):
+                while True:
+                    ids = step(db, cursor, batch_size)
+                    if ids:
+                        report["batches"] += 1
+                        report[key].extend(ids)
+                    if len(ids) < batch_size:
+                        break
+        finally:
+            if use_lock:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (EXPIRY_LOCK_NAME,))
+                cursor.fetchone()
+        
+        report["duration_ms"] = round((time.monotonic() - started) * 1000, 3)
+        with _metrics_lock:
+            _metrics["runs"] += 1
+            _metrics["last_run"] = {
+                "finished_at": time.time(),
+                "expired": len(report["expired_ids"]),
+                "purged": len(report["purged_ids"]),
+                "batches": report["batches"],
+                "duration_ms": report["duration_ms"],
+            }
+        return report
+        
+    except DB_ERRORS as err:
+        db.rollback()
+        with _metrics_lock:
+            _metrics["failures"] += 1
+        print(f"Error updating expired posts: {err}")
+        return None
+    finally:
+        cursor.close()
+        db.close()
+
+def expiry_stats():
+    with _metrics_lock:
+        return {"interval_seconds": EXPIRY_INTERVAL_SECONDS, "batch_size": EXPIRY_BATCH_SIZE, **_metrics}
+
+
+# ========== BACKGROUND SCHEDULER ==========
+_task = None
+
+async def _scheduler_loop(sweep):
+    while True:
+        try:
+            await run_db(sweep)
+        except Exception as e:
+            print(f"Expiry sweep failed: {e}")
+        await asyncio.sleep(EXPIRY_INTERVAL_SECONDS)
+
+def start_expiry_scheduler(sweep):
+    """Run `sweep` now and then every EXPIRY_INTERVAL_SECONDS on the running event loop."""
+    global _task
+    if _task is None:
+        _task = asyncio.get_running_loop().create_task(_scheduler_loop(sweep))
+
+async def stop_expiry_scheduler():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
@@ -0,0 +1,178 @@
+import csv
+import io
+import json
+import os
+import queue
+import threading
+from datetime import datetime
+
+from starlette.concurrency import run_in_threadpool
+
+from database import get_db, DB_ERRORS, PoolExhaustedError
+
+# Export settings
+EXPORT_MAX_CONCURRENT = int(os.getenv("EXPORT_MAX_CONCURRENT", "2"))
+EXPORT_CHUNK_BYTES = int(os.getenv("EXPORT_CHUNK_BYTES", str(64 * 1024)))
+EXPORT_QUEUE_CHUNKS = int(os.getenv("EXPORT_QUEUE_CHUNKS", "8"))  # encoded chunks buffered ahead of the client
+EXPORT_FETCH_ROWS = int(os.getenv("EXPORT_FETCH_ROWS", "1000"))
+
+EXPORT_STATUSES = ("lost", "found", "returned", "claimed", "expired")
+CSV_COLUMNS = ["post_id", "student_id", "faculty", "item_name", "description", "item_status", "place",
+               "created_at", "updated_at", "expires_at", "images"]
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+_slots = threading.BoundedSemaphore(EXPORT_MAX_CONCURRENT)
+_DONE = object()
+
+
+def build_query(after_id=0, statuses=None, faculty=None, since=None, until=None):
+    """Export query: one row per (post, image), ordered by post_id so a post's rows are adjacent."""
+    conditions = ["p.post_id > %s"]
+    params = [after_id]
+    if statuses:
+        conditions.append(f"p.item_status IN ({', '.join(['%s'] * len(statuses))})")
+        params.extend(statuses)
+    if faculty:
+        conditions.append("u.faculty = %s")
+        params.append(faculty)
+    if since:
+        conditions.append("p.created_at >= %s")
+        params.append(since)
+    if until:
+        conditions.append("p.created_at < %s")
+        params.append(until)
+
+    # Ordering by post_id alone lets both backends walk the primary key instead of sorting;
+    # images are put in image_order per post while streaming.
+    return f'''
+        SELECT p.post_id, p.student_id, u.faculty, p.item_name, p.description, p.item_status, p.place,
+               p.created_at, p.updated_at, p.expires_at, pi.image_url, pi.image_order
+        FROM posts p
+        JOIN users u ON u.student_id = p.student_id
+        LEFT JOIN post_images pi ON pi.post_id = p.post_id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY p.post_id
+    ''', params
+
+def iter_posts(cursor):
+    """Group the (post, image) rows of an unbuffered cursor back into one dict per post."""
+    post, images = None, []
+    while True:
+        rows = cursor.fetchmany(EXPORT_FETCH_ROWS)
+        if not rows:
+            break
+        for row in rows:
+            if post is None or row["post_id"] != post["post_id"]:
+                if post is not None:
+                    post["images"] = [url for _, url in sorted(images)]
+                    yield post
+                image_url, image_order = row.pop("image_url"), row.pop("image_order")
+                post, images = row, []
+            else:
+                image_url, image_order = row["image_url"], row["image_order"]
+            if image_url is not None:
+                images.append((image_order, image_url))
+    if post is not None:
+        post["images"] = [url for _, url in sorted(images)]
+        yield post
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def encode_posts(posts, fmt):
+    """Encode posts as NDJSON lines or CSV rows (images joined with "|", like the bulk import)."""
+    buffer = io.StringIO()
+    writer = None
+    if fmt == "csv":
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_COLUMNS)
+    for post in posts:
+        if writer:
+            writer.writerow([
+                "|".join(post["images"]) if column == "images"
+                else post[column].isoformat() if isinstance(post[column], datetime)
+                else post[column]
+                for column in CSV_COLUMNS
+            ])
+        else:
+            buffer.write(json.dumps(post, ensure_ascii=False, default=_json_default))
+            buffer.write("\n")
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+def _put(chunks, item, stop):
+    """Queue `item` for the response, giving up if the client has gone away."""
+    while not stop.is_set():
+        try:
+            chunks.put(item, timeout=1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _produce(chunks, fmt, query, params, stop):
+    """Export thread: read the unbuffered cursor and hand encoded chunks to the response."""
+    db = cursor = None
+    try:
+        db = get_db()
+        # Unbuffered: MySQL streams rows from the server instead of materializing the result
+        # client-side; SQLite cursors are always lazy.
+        cursor = db.cursor(dictionary=True, buffered=False)
+        cursor.execute(query, params)
+        for chunk in encode_posts(iter_posts(cursor), fmt):
+            if not _put(chunks, chunk, stop):
+                return
+        result = _DONE
+    except Exception as e:
+        result = e
+    finally:
+        if cursor is not None:
+            try:
+                cursor.close()
+            except DB_ERRORS:
+                # Client went away mid-result; the pool drops the connection with its unread rows
+                pass
+        if db is not None:
+            db.close()
+        _slots.release()
+    _put(chunks, result, stop)
+
+def stream_posts(fmt, **filters):
+    """Start an export and return an async iterator of encoded chunks (bounded memory).
+
+    The rows are read on a dedicated thread (SQLite connections belong to one thread and a long
+    export should not hold a DB executor worker); a bounded queue gives backpressure.
+    """
+    if not _slots.acquire(blocking=False):
+        raise PoolExhaustedError("Too many exports running")
+    query, params = build_query(**filters)
+    chunks = queue.Queue(maxsize=EXPORT_QUEUE_CHUNKS)
+    stop = threading.Event()
+    threading.Thread(target=_produce, args=(chunks, fmt, query, params, stop),
+                     name="export", daemon=True).start()
+
+    async def body():
+        try:
+            while True:
+                try:
+                    # Short waits so a cancelled response never strands a threadpool worker
+                    chunk = await run_in_threadpool(chunks.get, True, 1)
+                except queue.Empty:
+                    continue
+                if chunk is _DONE:
+                    return
+                if isinstance(chunk, Exception):
+                    # Headers are already sent; all we can do is cut the stream short
+                    print(f"Export failed: {chunk}")
+                    return
+                yield chunk
+        finally:
+            stop.set()
+
+    return body()
@@ -0,0 +1,308 @@
+import asyncio
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from database import get_db, db_now, DB_ERRORS
+
+# Facet settings
+FACET_SYNC_SECONDS = float(os.getenv("FACET_SYNC_SECONDS", "30"))             # re-read the counts table (other workers' writes)
+FACET_RECONCILE_SECONDS = float(os.getenv("FACET_RECONCILE_SECONDS", "3600"))  # recount from posts/users and fix drift
+FACET_TOP_VALUES = int(os.getenv("FACET_TOP_VALUES", "20"))                   # values returned per facet
+FACET_LOCK_NAME = "lost_found_facet_reconcile"
+
+# Only open posts are counted; expiry flips them to 'expired', which takes them out again
+STATUSES = ("lost", "found")
+FACETS = ("faculty", "place", "day")
+CREATED_BUCKETS = (("today", 1), ("last_7_days", 7), ("last_30_days", 30))
+
+UPSERT_SQL = {
+    "mysql": '''
+        INSERT INTO post_facet_counts (item_status, facet, value, post_count) VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE post_count = post_count + VALUES(post_count)
+    ''',
+    "sqlite": '''
+        INSERT INTO post_facet_counts (item_status, facet, value, post_count) VALUES (%s, %s, %s, %s)
+        ON CONFLICT (item_status, facet, value) DO UPDATE SET post_count = post_count + excluded.post_count
+    ''',
+}
+
+
+def facet_key(item_status, faculty, place, created_at):
+    """(status, faculty, place, day) of a post, or None if it is not counted."""
+    if item_status not in STATUSES:
+        return None
+    day = created_at.date().isoformat() if isinstance(created_at, datetime) else str(created_at)[:10]
+    return (item_status, faculty or "", place or "", day)
+
+def _count_rows(key):
+    # One counter per facet value, plus the status total
+    status, faculty, place, day = key
+    return [(status, "status", status), (status, "faculty", faculty), (status, "place", place), (status, "day", day)]
+
+def _apply_deltas(cursor, dialect, deltas):
+    # Sorted, so concurrent writers lock counter rows in the same order
+    rows = sorted((status, facet, value, n) for (status, facet, value), n in deltas.items() if n)
+    if rows:
+        cursor.executemany(UPSERT_SQL[dialect], rows)
+
+def update_counts(cursor, dialect, old_keys, new_keys):
+    """Move the stored counts from `old_keys` to `new_keys` (facet_key tuples, None ignored).
+
+    Runs inside the writer's transaction (read_model.refresh_cards calls it), so the counts
+    commit or roll back with the post change.
+    """
+    deltas = Counter()
+    for key in new_keys:
+        if key is not None:
+            deltas.update(_count_rows(key))
+    for key in old_keys:
+        if key is not None:
+            deltas.subtract(_count_rows(key))
+    _apply_deltas(cursor, dialect, deltas)
+
+
+def _empty_counts():
+    return {status: {facet: Counter() for facet in ("status",) + FACETS} for status in STATUSES}
+
+
+class FacetIndex:
+    """Facet counters for the home page filters, kept in memory.
+
+    `counts` mirrors the post_facet_counts table (re-read every FACET_SYNC_SECONDS, so writes
+    on other workers show up) and is adjusted right away for writes made by this process.
+    `posts` maps each open post to its facet values, so the counts for a search are a
+    dictionary lookup per hit instead of a GROUP BY.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.posts = {}
+        self.counts = _empty_counts()
+        self.ready = False
+        self.loaded_at = None
+        self.synced_at = None
+        self.reconciled_at = None
+        self.refreshes = 0
+        self.reconciles = 0
+        self.last_drift = 0
+
+    def _add(self, counts, key, n):
+        for status, facet, value in _count_rows(key):
+            counts[status][facet][value] += n
+
+    def set_counts(self, rows):
+        counts = _empty_counts()
+        for status, facet, value, post_count in rows:
+            if status in counts and post_count > 0:
+                counts[status].setdefault(facet, Counter())[value] = post_count
+        with self._lock:
+            self.counts = counts
+        self.synced_at = time.time()
+
+    def set_posts(self, posts):
+        with self._lock:
+            self.posts = posts
+
+    def apply(self, keys_by_post):
+        """Local writes: replace the facet values of the given posts (None = no longer counted)."""
+        with self._lock:
+            for post_id, key in keys_by_post.items():
+                old = self.posts.pop(post_id, None)
+                if old is not None:
+                    self._add(self.counts, old, -1)
+                if key is not None:
+                    self.posts[post_id] = key
+                    self._add(self.counts, key, 1)
+
+    def facets(self, item_status=None, post_ids=None):
+        """Counts per facet value, optionally for one status and/or a set of posts (search hits)."""
+        with self._lock:
+            if post_ids is None:
+                counts = self.counts
+            else:
+                counts = _empty_counts()
+                for post_id in post_ids:
+                    key = self.posts.get(post_id)
+                    if key is not None:
+                        self._add(counts, key, 1)
+            # A facet never filters itself: the status counts ignore item_status
+            by_status = {status: counts[status]["status"][status] for status in STATUSES}
+            merged = {facet: Counter() for facet in FACETS}
+            for status in ([item_status] if item_status in STATUSES else STATUSES):
+                for facet in FACETS:
+                    merged[facet].update(counts[status][facet])
+
+        today = db_now().date()
+        created = {}
+        for name, days in CREATED_BUCKETS:
+            since = (today - timedelta(days=days - 1)).isoformat()
+            created[name] = sum(n for day, n in merged["day"].items() if day >= since)
+        return {
+            "total": sum(by_status[status] for status in ([item_status] if item_status in STATUSES else STATUSES)),
+            "item_status": by_status,
+            "faculty": [{"value": value, "count": n} for value, n in merged["faculty"].most_common(FACET_TOP_VALUES) if n > 0],
+            "place": [{"value": value, "count": n} for value, n in merged["place"].most_common(FACET_TOP_VALUES) if n > 0],
+            "created": created,
+        }
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "open_posts": len(self.posts),
+                "counters": sum(len(values) for facets in self.counts.values() for values in facets.values()),
+                "loaded_at": self.loaded_at,
+                "synced_at": self.synced_at,
+                "reconciled_at": self.reconciled_at,
+                "refreshes": self.refreshes,
+                "reconciles": self.reconciles,
+                "last_drift": self.last_drift,
+            }
+
+
+facet_index = FacetIndex()
+
+
+def _read_counts(cursor):
+    cursor.execute("SELECT item_status, facet, value, post_count FROM post_facet_counts WHERE post_count > 0")
+    return cursor.fetchall()
+
+def _read_posts(cursor):
+    cursor.execute("SELECT post_id, item_status, faculty, place, created_at FROM post_cards WHERE listed = 1")
+    return {row[0]: facet_key(*row[1:]) for row in cursor.fetchall()}
+
+def _source_counts(cursor):
+    # The expensive GROUP BY the counters replace; only run by the migration and reconcile_counts
+    cursor.execute('''
+        SELECT p.item_status, u.faculty, p.place, DATE(p.created_at) AS day, COUNT(*) AS n
+        FROM posts p
+        JOIN users u ON p.student_id = u.student_id
+        WHERE p.item_status IN ('lost', 'found')
+        GROUP BY p.item_status, u.faculty, p.place, DATE(p.created_at)
+    ''')
+    counts = Counter()
+    for status, faculty, place, day, n in cursor.fetchall():
+        for row in _count_rows(facet_key(status, faculty, place, str(day))):
+            counts[row] += n
+    return counts
+
+def backfill_counts(cursor, dialect):
+    """Fill an empty post_facet_counts from posts/users in the current transaction (used by the migration)."""
+    _apply_deltas(cursor, dialect, _source_counts(cursor))
+
+def load_facets():
+    """Load the counters and the per-post facet values (runs in the background at startup)."""
+    started = time.monotonic()
+    db = get_db()
+    cursor = db.cursor()
+    try:
+        facet_index.set_counts(_read_counts(cursor))
+        facet_index.set_posts({post_id: key for post_id, key in _read_posts(cursor).items() if key})
+    except DB_ERRORS as err:
+        print(f"Loading facet counts failed: {err}")
+        return
+    finally:
+        cursor.close()
+        db.close()
+    facet_index.ready = True
+    facet_index.loaded_at = time.time()
+    print(f"✅ Facet counts loaded for {len(facet_index.posts)} open posts in {time.monotonic() - started:.1f}s")
+
+def apply_changes(posts, removed_ids):
+    """Move changed posts (card rows) between counters; removed posts are no longer counted."""
+    keys = {post["post_id"]: facet_key(post["item_status"], post["faculty"], post["place"], post["created_at"])
+            for post in posts}
+    keys.update(dict.fromkeys(removed_ids))
+    facet_index.apply(keys)
+    facet_index.refreshes += 1
+
+def sync_counts():
+    db = get_db()
+    cursor = db.cursor()
+    try:
+        facet_index.set_counts(_read_counts(cursor))
+    except DB_ERRORS as err:
+        print(f"Facet sync failed: {err}")
+    finally:
+        cursor.close()
+        db.close()
+
+def reconcile_counts():
+    """Recount from posts JOIN users and correct post_facet_counts; returns the number of drifted counters.
+
+    Source and stored counts are read in one transaction and corrected with increments, so
+    writes that commit meanwhile are not lost. Only one worker reconciles at a time.
+    """
+    db = get_db()
+    cursor = db.cursor()
+    use_lock = db.dialect == "mysql"
+    try:
+        if use_lock:
+            cursor.execute("SELECT GET_LOCK(%s, 0)", (FACET_LOCK_NAME,))
+            if cursor.fetchone()[0] != 1:
+                return None
+        try:
+            # Start with a write: on SQLite this takes the writer lock, so the reads below see a stable snapshot
+            cursor.execute("DELETE FROM post_facet_counts WHERE post_count = 0")
+            deltas = _source_counts(cursor)
+            for status, facet, value, post_count in _read_counts(cursor):
+                deltas[status, facet, value] -= post_count
+            drift = sum(1 for n in deltas.values() if n)
+            _apply_deltas(cursor, db.dialect, deltas)
+            db.commit()
+        finally:
+            if use_lock:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (FACET_LOCK_NAME,))
+                cursor.fetchone()
+
+        facet_index.set_counts(_read_counts(cursor))
+        facet_index.set_posts({post_id: key for post_id, key in _read_posts(cursor).items() if key})
+        facet_index.reconciled_at = time.time()
+        facet_index.reconciles += 1
+        facet_index.last_drift = drift
+        if drift:
+            print(f"Facet counts drifted on {drift} counters; corrected")
+        return drift
+    except DB_ERRORS as err:
+        db.rollback()
+        print(f"Facet reconcile failed: {err}")
+        return None
+    finally:
+        cursor.close()
+        db.close()
+
+
+_task = None
+
+async def _scheduler_loop(executor):
+    loop = asyncio.get_running_loop()
+    last_reconcile = time.monotonic()
+    while True:
+        await asyncio.sleep(FACET_SYNC_SECONDS)
+        if time.monotonic() - last_reconcile >= FACET_RECONCILE_SECONDS:
+            last_reconcile = time.monotonic()
+            await loop.run_in_executor(executor, reconcile_counts)
+        else:
+            await loop.run_in_executor(executor, sync_counts)
+
+def start_facet_scheduler(executor):
+    """Sync every FACET_SYNC_SECONDS and reconcile every FACET_RECONCILE_SECONDS on the running loop.
+
+    Both run on `executor`, the worker that applies post changes, so they never interleave.
+    """
+    global _task
+    if _task is None:
+        _task = asyncio.get_running_loop().create_task(_scheduler_loop(executor))
+
+async def stop_facet_scheduler():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
@@ -0,0 +1,105 @@
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+from uploads import UPLOAD_DIR, iter_stored_files
+
+# Derivative settings
+DERIVED_DIR = os.path.join(UPLOAD_DIR, "derived")
+DERIVATIVE_WIDTHS = tuple(int(w) for w in os.getenv("IMAGE_DERIVATIVE_WIDTHS", "320,640,1280").split(","))
+DERIVATIVE_QUALITY = int(os.getenv("IMAGE_DERIVATIVE_QUALITY", "80"))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+
+os.makedirs(DERIVED_DIR, exist_ok=True)
+
+_executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="images")
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def derivative_name(filename, width):
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    return f"{stem}_{width}.webp"
+
+def generate_derivatives(filename):
+    """Write a WebP copy of uploads/<filename> at each DERIVATIVE_WIDTHS width.
+
+    EXIF orientation is applied to the pixels and no metadata is copied to the output.
+    Images narrower than a width are not upscaled.
+    """
+    source = os.path.join(UPLOAD_DIR, filename)
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+        for width in DERIVATIVE_WIDTHS:
+            target = os.path.join(DERIVED_DIR, derivative_name(filename, width))
+            if os.path.exists(target):
+                continue
+            resized = image
+            if image.width > width:
+                height = round(image.height * width / image.width)
+                resized = image.resize((width, height), Image.LANCZOS)
+            # Write to a temp name first so readers never see a half-written file
+            resized.save(target + ".tmp", "WEBP", quality=DERIVATIVE_QUALITY, method=4)
+            os.replace(target + ".tmp", target)
+
+def _run(filename):
+    try:
+        generate_derivatives(filename)
+    except Exception as e:
+        print(f"Image derivatives failed for {filename}: {e}")
+    finally:
+        with _pending_lock:
+            _pending.discard(filename)
+
+def schedule_derivatives(filename):
+    """Queue derivative generation on the image worker pool; returns immediately."""
+    with _pending_lock:
+        if filename in _pending:
+            return
+        _pending.add(filename)
+    _executor.submit(_run, filename)
+
+def derivative_urls(image_url):
+    """Map width -> URL for the derivatives of an /uploads/ image that exist so far."""
+    filename = os.path.basename(image_url or "")
+    urls = {}
+    for width in DERIVATIVE_WIDTHS:
+        name = derivative_name(filename, width)
+        if os.path.exists(os.path.join(DERIVED_DIR, name)):
+            urls[str(width)] = f"/uploads/derived/{name}"
+    return urls
+
+def delete_derivatives(filename):
+    """Remove the derivatives of an upload; returns the bytes freed."""
+    freed = 0
+    for width in DERIVATIVE_WIDTHS:
+        path = os.path.join(DERIVED_DIR, derivative_name(filename, width))
+        try:
+            freed += os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    return freed
+
+def backfill():
+    """Generate missing derivatives for every file already in uploads/."""
+    done = failed = 0
+    for filename, _ in sorted(iter_stored_files()):
+        try:
+            generate_derivatives(filename)
+            done += 1
+        except Exception as e:
+            failed += 1
+            print(f"Skipped {filename}: {e}")
+    print(f"✅ Derivatives ready for {done} images ({failed} skipped)")
+
+if __name__ == "__main__":
+    # Usage: python images.py backfill
+    if sys.argv[1:] == ["backfill"]:
+        backfill()
+    else:
+        print("Usage: python images.py backfill")
@@ -0,0 +1,276 @@
+import math
+import os
+import re
+import threading
+import time
+from array import array
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+
+from database import get_db, db_now, DB_ERRORS
+
+# Matching settings
+MATCH_WEIGHT_TEXT = float(os.getenv("MATCH_WEIGHT_TEXT", "0.7"))
+MATCH_WEIGHT_PLACE = float(os.getenv("MATCH_WEIGHT_PLACE", "0.2"))
+MATCH_WEIGHT_RECENCY = float(os.getenv("MATCH_WEIGHT_RECENCY", "0.1"))
+MATCH_RECENCY_DAYS = float(os.getenv("MATCH_RECENCY_DAYS", "14"))     # score halves every this many days apart
+MATCH_MAX_DF_RATIO = float(os.getenv("MATCH_MAX_DF_RATIO", "0.5"))    # n-grams in more posts than this carry no signal
+MATCH_MAX_DF_MIN_DOCS = 1000                                           # ...once a group is big enough for that to hold
+MATCH_LOAD_BATCH = int(os.getenv("MATCH_LOAD_BATCH", "5000"))
+
+NGRAM = 3
+STATUS_CODES = {"lost": 1, "found": 2}    # 0 = no longer open
+OPPOSITE = {"lost": 2, "found": 1}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def ngrams(text):
+    """Character trigrams of normalized text: no word breaking needed, so Thai works as well as English."""
+    text = " " + _WHITESPACE.sub(" ", (text or "").lower()).strip() + " "
+    return Counter(text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)) if len(text) >= NGRAM else Counter()
+
+
+class TextIndex:
+    """Incremental BM25 over character n-grams, stored as one postings list per (group, n-gram).
+
+    Postings are append-only array('i'/'f') buffers that NumPy reads without copying, so adding
+    a post is O(its n-grams) and scoring is one np.bincount over the query's postings. Groups
+    (lost / found) keep separate postings, so a query only reads the posts it can match.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocab = {}
+        self.slots = []
+        self.weights = []
+        self.docs = Counter()
+        self.total_length = 0
+
+    def _weights(self, grams):
+        length = sum(grams.values())
+        docs = sum(self.docs.values())
+        avg = (self.total_length / docs) if docs else length or 1
+        norm = self.k1 * (1 - self.b + self.b * length / avg)
+        return {gram: tf * (self.k1 + 1) / (tf + norm) for gram, tf in grams.items()}
+
+    def add(self, slot, text, group):
+        grams = ngrams(text)
+        self.docs[group] += 1
+        self.total_length += sum(grams.values())
+        for gram, weight in self._weights(grams).items():
+            feature = self.vocab.get((group, gram))
+            if feature is None:
+                feature = self.vocab[group, gram] = len(self.slots)
+                self.slots.append(array("i"))
+                self.weights.append(array("f"))
+            self.slots[feature].append(slot)
+            self.weights[feature].append(weight)
+
+    def scores(self, text, size, group):
+        """Similarity of `text` to every slot in `group`, scaled so a document matching itself scores about 1."""
+        scores = np.zeros(size, dtype=np.float32)
+        docs = self.docs[group]
+        max_df = MATCH_MAX_DF_RATIO * docs if docs >= MATCH_MAX_DF_MIN_DOCS else docs
+        slot_parts, weight_parts, best = [], [], 0.0
+        for gram, query_weight in self._weights(ngrams(text)).items():
+            feature = self.vocab.get((group, gram))
+            df = len(self.slots[feature]) if feature is not None else 0
+            idf = math.log(1 + (docs - df + 0.5) / (df + 0.5))
+            best += idf * query_weight
+            if not df or df > max_df:
+                continue
+            slot_parts.append(np.frombuffer(self.slots[feature], dtype=np.int32))
+            weight_parts.append(np.frombuffer(self.weights[feature], dtype=np.float32) * np.float32(idf * query_weight))
+        if slot_parts and best:
+            scores += np.bincount(np.concatenate(slot_parts), np.concatenate(weight_parts), minlength=size)[:size]
+            scores /= best
+            np.minimum(scores, 1.0, out=scores)
+        return scores
+
+
+class MatchIndex:
+    """Open lost/found posts, indexed for "which found item could this lost item be?" queries.
+
+    Each post occupies a slot in parallel NumPy arrays. Changing a post closes its old slot and
+    indexes it into a new one; closed slots are skipped by a status mask and compacted away by a
+    rebuild once they outnumber the live ones.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+        self.ready = False
+        self.loaded_at = None
+        self.refreshes = 0
+        self.queries = 0
+        self.total_query_time = 0.0
+
+    def _reset(self):
+        self.text = TextIndex()
+        self.place = TextIndex()
+        self.slot_of = {}
+        self.size = 0
+        self.post_ids = np.zeros(1024, dtype=np.int64)
+        self.status = np.zeros(1024, dtype=np.int8)
+        self.created = np.zeros(1024, dtype=np.float64)
+        self.expires = np.zeros(1024, dtype=np.float64)
+
+    def _grow(self):
+        capacity = len(self.post_ids) * 2
+        for name in ("post_ids", "status", "created", "expires"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _close(self, post_id):
+        slot = self.slot_of.pop(post_id, None)
+        if slot is not None:
+            self.status[slot] = 0
+
+    def _add(self, post):
+        self._close(post["post_id"])
+        if post["item_status"] not in STATUS_CODES:
+            return
+        if self.size == len(self.post_ids):
+            self._grow()
+        slot = self.size
+        self.size += 1
+        self.slot_of[post["post_id"]] = slot
+        self.post_ids[slot] = post["post_id"]
+        self.status[slot] = STATUS_CODES[post["item_status"]]
+        self.created[slot] = post["created_at"].timestamp()
+        self.expires[slot] = post["expires_at"].timestamp() if post["expires_at"] else math.inf
+        group = STATUS_CODES[post["item_status"]]
+        self.text.add(slot, f"{post['item_name']} {post['description'] or ''}", group)
+        self.place.add(slot, post["place"], group)
+
+    def apply(self, posts, removed_ids=()):
+        """Index (or re-index) `posts` and drop `removed_ids`."""
+        with self._lock:
+            for post_id in removed_ids:
+                self._close(post_id)
+            for post in posts:
+                self._add(post)
+
+    def needs_compaction(self):
+        return self.size > 1024 and len(self.slot_of) < self.size / 2
+
+    def compact(self):
+        """Rebuild from the live slots, swapping the new arrays in only if the rebuild succeeds.
+
+        Only the arrays are kept, so texts are re-read from the database, outside the lock so
+        matches keep being served meanwhile. Must run on post_indexes.index_worker: an update applied
+        between the read and the swap would be lost.
+        """
+        with self._lock:
+            live_ids = list(self.slot_of)
+        try:
+            posts = _load_posts(live_ids)
+        except DB_ERRORS as err:
+            print(f"Match index compaction failed, keeping the current index: {err}")
+            return False
+        rebuilt = MatchIndex()
+        rebuilt.apply(posts)
+        with self._lock:
+            for name in SLOT_STATE:
+                setattr(self, name, getattr(rebuilt, name))
+        return True
+
+    def match(self, post, limit=10):
+        """Top `limit` open posts of the opposite status as (post_id, score, parts) tuples."""
+        started = time.perf_counter()
+        with self._lock:
+            size = self.size
+            group = OPPOSITE[post["item_status"]]
+            text = self.text.scores(f"{post['item_name']} {post['description'] or ''}", size, group)
+            place = self.place.scores(post["place"], size, group)
+            days_apart = np.abs(self.created[:size] - post["created_at"].timestamp()) / 86400
+            recency = np.exp2(-days_apart / MATCH_RECENCY_DAYS).astype(np.float32)
+            score = MATCH_WEIGHT_TEXT * text + MATCH_WEIGHT_PLACE * place + MATCH_WEIGHT_RECENCY * recency
+
+            # expires holds naive database-clock times read as local, so compare on the same clock
+            candidates = (self.status[:size] == group) & (self.expires[:size] > db_now().timestamp())
+            # Require some textual overlap: place and recency alone are not a match
+            candidates &= text > 0
+            score = np.where(candidates, score, -1.0)
+            count = min(limit, int(candidates.sum()))
+            top = np.argpartition(-score, count - 1)[:count] if count else np.array([], dtype=np.int64)
+            top = top[np.argsort(-score[top])]
+            results = [(int(self.post_ids[slot]), float(score[slot]),
+                        {"text": round(float(text[slot]), 4), "place": round(float(place[slot]), 4),
+                         "recency": round(float(recency[slot]), 4)})
+                       for slot in top]
+        self.queries += 1
+        self.total_query_time += time.perf_counter() - started
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "open_posts": len(self.slot_of),
+                "slots": self.size,
+                "ngrams": len(self.text.vocab),
+                "loaded_at": self.loaded_at,
+                "refreshes": self.refreshes,
+                "queries": self.queries,
+                "avg_query_ms": round(self.total_query_time / self.queries * 1000, 3) if self.queries else 0.0,
+            }
+
+
+POST_COLUMNS = "post_id, item_name, description, item_status, place, created_at, expires_at"
+SLOT_STATE = ("text", "place", "slot_of", "size", "post_ids", "status", "created", "expires")
+
+def _load_posts(post_ids):
+    db = get_db()
+    cursor = db.cursor(dictionary=True)
+    try:
+        posts = []
+        for start in range(0, len(post_ids), MATCH_LOAD_BATCH):
+            chunk = post_ids[start:start + MATCH_LOAD_BATCH]
+            cursor.execute(f"SELECT {POST_COLUMNS} FROM posts WHERE post_id IN ({', '.join(['%s'] * len(chunk))})", chunk)
+            posts.extend(cursor.fetchall())
+        return posts
+    finally:
+        cursor.close()
+        db.close()
+
+def load_index():
+    """Index every open lost/found post (runs once in the background at startup)."""
+    started = time.monotonic()
+    db = get_db()
+    cursor = db.cursor(dictionary=True)
+    try:
+        cursor.execute(f'''
+            SELECT {POST_COLUMNS} FROM posts
+            WHERE item_status IN ('lost', 'found') AND expires_at > CURRENT_TIMESTAMP
+        ''')
+        while True:
+            rows = cursor.fetchmany(MATCH_LOAD_BATCH)
+            if not rows:
+                break
+            match_index.apply(rows)
+    except DB_ERRORS as err:
+        print(f"Loading the match index failed: {err}")
+        return
+    finally:
+        cursor.close()
+        db.close()
+    match_index.ready = True
+    match_index.loaded_at = datetime.now().isoformat(timespec="seconds")
+    print(f"✅ Match index loaded {len(match_index.slot_of)} open posts in {time.monotonic() - started:.1f}s")
+
+def apply_changes(posts, removed_ids):
+    """Update the index from changed posts (rows with POST_COLUMNS): open ones are indexed, others dropped."""
+    match_index.apply(posts, removed_ids)
+    match_index.refreshes += 1
+    if match_index.needs_compaction():
+        match_index.compact()
+
+
+match_index = MatchIndex()
@@ -0,0 +1,265 @@
+import bisect
+import contextvars
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from starlette.routing import Match
+
+# Metrics settings
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))                  # statements slower than this are logged
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "100"))        # distinct normalized statements kept
+METRICS_QUERY_WARN = int(os.getenv("METRICS_QUERY_WARN", "50"))           # queries per request before warning (N+1)
+METRICS_DEBUG_HEADERS = os.getenv("METRICS_DEBUG_HEADERS", "1") == "1"    # X-DB-Queries / Server-Timing headers
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Queries outside any HTTP request (expiry sweeps, index loads) are attributed to this route
+BACKGROUND = "background"
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """Collapse literals, placeholders and IN/VALUES lists so one statement shape is one entry."""
+    sql = _WHITESPACE.sub(" ", sql).strip()
+    sql = _STRING.sub("?", sql).replace("%s", "?")
+    sql = _NUMBER.sub("?", sql)
+    return _LIST.sub("(...)", sql)
+
+
+def statement_type(sql):
+    word = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+    return word if word in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") else "OTHER"
+
+
+class RequestStats:
+    """DB work done on behalf of one HTTP request."""
+
+    __slots__ = ("route", "queries", "db_time")
+
+    def __init__(self, route):
+        self.route = route
+        self.queries = 0
+        self.db_time = 0.0
+
+
+# Set by the middleware; DBExecutor copies the context into its threads so queries find it
+current_request = contextvars.ContextVar("current_request", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """Process-wide request and query metrics, rendered in the Prometheus text format.
+
+    Everything is kept in plain dicts behind one lock: recording is a few dict lookups, and
+    the label sets are bounded (route templates, not raw paths).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}                                   # (method, route, status) -> count
+        self.in_flight = {}                                  # (method, route) -> count
+        self.latency = Histogram(LATENCY_BUCKETS)            # (method, route)
+        self.request_queries = Histogram(QUERY_COUNT_BUCKETS)  # (route,)
+        self.query_time = Histogram(QUERY_BUCKETS)           # (route, statement)
+        self.slow_queries = OrderedDict()                    # normalized sql -> entry
+        self.slow_total = 0
+
+    def request_started(self, method, route):
+        with self._lock:
+            self.in_flight[method, route] = self.in_flight.get((method, route), 0) + 1
+
+    def request_finished(self, method, route, status, seconds, stats):
+        with self._lock:
+            self.in_flight[method, route] -= 1
+            key = (method, route, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.latency.observe((method, route), seconds)
+            self.request_queries.observe((route,), stats.queries)
+        if METRICS_QUERY_WARN and stats.queries > METRICS_QUERY_WARN:
+            print(f"{method} {route} ran {stats.queries} queries ({stats.db_time * 1000:.1f} ms), possible N+1")
+
+    def record_query(self, sql, seconds):
+        """Account one executed statement to the current request (called from the DB cursors)."""
+        stats = current_request.get()
+        route = BACKGROUND
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += seconds
+            route = stats.route
+        with self._lock:
+            self.query_time.observe((route, statement_type(sql)), seconds)
+        if seconds * 1000 >= SLOW_QUERY_MS:
+            self._record_slow(sql, seconds, route)
+
+    def _record_slow(self, sql, seconds, route):
+        normalized = normalize_sql(sql)
+        ms = seconds * 1000
+        with self._lock:
+            self.slow_total += 1
+            entry = self.slow_queries.pop(normalized, None)
+            if entry is None:
+                entry = {"sql": normalized, "count": 0, "total_ms": 0.0, "max_ms": 0.0, "routes": []}
+            entry["count"] += 1
+            entry["total_ms"] += ms
+            entry["max_ms"] = max(entry["max_ms"], ms)
+            entry["last_seen"] = time.time()
+            if route not in entry["routes"]:
+                entry["routes"].append(route)
+            self.slow_queries[normalized] = entry
+            while len(self.slow_queries) > SLOW_QUERY_LOG_SIZE:
+                self.slow_queries.popitem(last=False)
+        print(f"Slow query ({ms:.1f} ms, {route}): {normalized[:500]}")
+
+    def slow_query_log(self):
+        """Logged statement shapes, slowest total time first."""
+        with self._lock:
+            entries = [dict(entry, routes=list(entry["routes"])) for entry in self.slow_queries.values()]
+        for entry in entries:
+            entry["avg_ms"] = round(entry["total_ms"] / entry["count"], 3)
+            entry["total_ms"] = round(entry["total_ms"], 3)
+            entry["max_ms"] = round(entry["max_ms"], 3)
+        entries.sort(key=lambda entry: entry["total_ms"], reverse=True)
+        return {"threshold_ms": SLOW_QUERY_MS, "logged": self.slow_total, "queries": entries}
+
+    def render(self, components=None):
+        """Prometheus exposition text; `components` maps a name to a stats() dict exported as gauges."""
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def histogram(name, help_text, label_names, hist):
+            header(name, "histogram", help_text)
+            for labels, (counts, total, count) in sorted(hist.series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(hist.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = f'le="{_number(float(bound))}"'
+                    lines.append(f"{name}_bucket{_labels(label_names, labels, le)} {cumulative}")
+                lines.append(f"{name}_sum{_labels(label_names, labels)} {_number(total)}")
+                lines.append(f"{name}_count{_labels(label_names, labels)} {count}")
+
+        with self._lock:
+            header("lostfound_http_requests_total", "counter", "HTTP requests by route template and status.")
+            for labels, count in sorted(self.requests.items()):
+                lines.append(f"lostfound_http_requests_total{_labels(('method', 'route', 'status'), labels)} {count}")
+            header("lostfound_http_requests_in_flight", "gauge", "HTTP requests currently being served.")
+            for labels, count in sorted(self.in_flight.items()):
+                lines.append(f"lostfound_http_requests_in_flight{_labels(('method', 'route'), labels)} {count}")
+            histogram("lostfound_http_request_duration_seconds", "Time from request to the last response byte.",
+                      ("method", "route"), self.latency)
+            histogram("lostfound_http_request_db_queries", "SQL statements executed per request.",
+                      ("route",), self.request_queries)
+            histogram("lostfound_db_query_duration_seconds", "SQL statement execution time.",
+                      ("route", "statement"), self.query_time)
+            header("lostfound_db_slow_queries_total", "counter", f"Statements slower than {SLOW_QUERY_MS:g} ms.")
+            lines.append(f"lostfound_db_slow_queries_total {self.slow_total}")
+
+        for component, stats in (components or {}).items():
+            for key, value in stats.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    name = f"lostfound_{component}_{key}"
+                    header(name, "gauge", f"{component} {key.replace('_', ' ')}.")
+                    lines.append(f"{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def record_query(sql, seconds):
+    metrics.record_query(sql, seconds)
+
+
+def route_template(scope):
+    """The path template the router will pick for this request, e.g. /posts/{post_id}."""
+    app = scope.get("app")
+    partial = None
+    for route in getattr(getattr(app, "router", None), "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware: per-route latency, in-flight gauge and per-request DB accounting.
+
+    With METRICS_DEBUG_HEADERS on, each response carries the request's query count and DB
+    time (X-DB-Queries and a Server-Timing "db" entry), so N+1 patterns show in devtools.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        route = route_template(scope)
+        stats = RequestStats(route)
+        token = current_request.set(stats)
+        status = 500
+        started = time.perf_counter()
+        metrics.request_started(method, route)
+
+        async def send_with_metrics(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if METRICS_DEBUG_HEADERS:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-db-queries", str(stats.queries).encode()))
+                    headers.append((b"server-timing",
+                                    f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries"'.encode()))
+                    message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            metrics.request_finished(method, route, status, time.perf_counter() - started, stats)
+            current_request.reset(token)
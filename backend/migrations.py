@@ -0,0 +1,510 @@
+import sqlite3
+
+from mysql.connector import Error, errorcode
+
+# Versioned schema migrations, one list per storage backend. Each entry runs once; applied versions are recorded in
+# schema_migrations, so a worker that starts on an up-to-date schema runs no DDL at all.
+# Append new migrations at the end; never edit or renumber one that has shipped.
+
+MIGRATIONS_LOCK_NAME = "lost_found_migrations"
+
+
+def ensure_index(cursor, table, index_name, definition):
+    """Add an index unless it already exists (MySQL has no IF NOT EXISTS for indexes)."""
+    cursor.execute('''
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+    ''', (table, index_name))
+    if cursor.fetchone()[0] == 0:
+        cursor.execute(f"ALTER TABLE {table} ADD {definition}")
+
+
+def migration_001_base_tables(cursor):
+    # --- Create 'users' table (Must be created before 'user_social_profiles') ---
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            student_id INT AUTO_INCREMENT PRIMARY KEY,
+            full_name VARCHAR(255) NOT NULL,
+            faculty ENUM(
+                'School of Engineering',
+                'School of Architecture, Art, and Design',
+                'School of Industrial Education and Technology',
+                'School of Agricultural Technology',
+                'School of Science',
+                'School of Food Industry',
+                'School of Information Technology',
+                'International College',
+                'College of Materials Innovation and Technology',
+                'College of Advanced Manufacturing Innovation',
+                'KMITL Business School',
+                'International Academy of Aviation Industry',
+                'School of Liberal Arts',
+                'Faculty of Medicine',
+                'College of Innovation and Industrial Management',
+                'Institute of Music Science and Engineering',
+                'School of Dentistry',
+                'School of Nursing Science',
+                'School of Integrated Innovative Technology'
+            ) NOT NULL,
+            class_year ENUM('1', '2', '3', '4', '5', '6') NOT NULL,
+            phone VARCHAR(20) NOT NULL,
+            email VARCHAR(255) UNIQUE NOT NULL,
+            password VARCHAR(255) NOT NULL,
+            profile_photo_url VARCHAR(255),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB
+    ''')
+    
+    # --- Create 'social_profiles' table (Must be created before 'user_social_profiles') ---
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS social_profiles (
+            contact_id INT AUTO_INCREMENT PRIMARY KEY,
+            platform ENUM('Facebook', 'Instagram', 'LINE', 'Twitter / X', 'Discord', 'Other') NOT NULL,
+            profile_url VARCHAR(255) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB
+    ''')
+    
+    # --- Create 'user_social_profiles' junction table (Many-to-Many link) ---
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_social_profiles (
+            user_social_id INT AUTO_INCREMENT PRIMARY KEY,
+            student_id INT NOT NULL,
+            contact_id INT NOT NULL,
+            -- Ensures a user can't have the same link defined twice
+            UNIQUE KEY unique_user_contact (student_id, contact_id), 
+            FOREIGN KEY (student_id) REFERENCES users(student_id) ON DELETE CASCADE,
+            FOREIGN KEY (contact_id) REFERENCES social_profiles(contact_id) ON DELETE CASCADE
+        ) ENGINE=InnoDB
+    ''')
+
+    # --- Create 'posts' table ---
+    # FIXED: expires_at is now a Generated Column for reliability (MySQL 5.7+ required)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS posts (
+            post_id INT AUTO_INCREMENT PRIMARY KEY,
+            student_id INT NOT NULL,
+            item_name VARCHAR(100) NOT NULL,
+            item_status ENUM('lost', 'found', 'returned', 'claimed', 'expired') DEFAULT 'lost',
+            place VARCHAR(100) NOT NULL,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            -- Corrected to use GENERATED ALWAYS AS for calculation-based columns
+            expires_at DATETIME GENERATED ALWAYS AS (DATE_ADD(created_at, INTERVAL 30 DAY)) STORED,
+            FOREIGN KEY (student_id) REFERENCES users(student_id) ON DELETE CASCADE
+        ) ENGINE=InnoDB
+    ''')
+
+    # --- Create 'post_images' table ---
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS post_images (
+            post_image_id INT AUTO_INCREMENT PRIMARY KEY,
+            post_id INT NOT NULL,
+            image_url VARCHAR(255) NOT NULL,
+            image_order INT NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (post_id) REFERENCES posts(post_id) ON DELETE CASCADE
+        ) ENGINE=InnoDB
+    ''')
+
+
+def migration_002_fulltext_search(cursor):
+    # ngram parser so Thai text is tokenized too
+    ensure_index(cursor, "posts", "ft_posts_item_text",
+                 "FULLTEXT INDEX ft_posts_item_text (item_name, description) WITH PARSER ngram")
+    ensure_index(cursor, "users", "ft_users_full_name",
+                 "FULLTEXT INDEX ft_users_full_name (full_name) WITH PARSER ngram")
+
+
+def migration_003_hot_path_indexes(cursor):
+    # Feed filter + expiry sweep: item_status IN (...) AND expires_at ...
+    ensure_index(cursor, "posts", "idx_posts_status_expires_created",
+                 "INDEX idx_posts_status_expires_created (item_status, expires_at, created_at)")
+    # Feed keyset order: created_at DESC, post_id DESC (post_id rides along as the PK)
+    ensure_index(cursor, "posts", "idx_posts_created",
+                 "INDEX idx_posts_created (created_at)")
+    # GET /posts/user/{student_id}
+    ensure_index(cursor, "posts", "idx_posts_student_created",
+                 "INDEX idx_posts_student_created (student_id, created_at)")
+    # Batched image loads: post_id IN (...) ORDER BY post_id, image_order
+    ensure_index(cursor, "post_images", "idx_post_images_post_order",
+                 "INDEX idx_post_images_post_order (post_id, image_order)")
+
+
+def migration_004_drop_expiry_event(cursor):
+    # Expiry moved to the in-app scheduler (expiry.py); remove the old EVENT if we may
+    try:
+        cursor.execute("DROP EVENT IF EXISTS auto_handle_expired_posts")
+    except Error as e:
+        print(f"Could not drop legacy expiry event (drop it manually): {e}")
+
+
+def migration_005_post_cards(cursor):
+    # Denormalized read model of post cards, see read_model.py
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS post_cards (
+            post_id INT PRIMARY KEY,
+            student_id INT NOT NULL,
+            item_name VARCHAR(100) NOT NULL,
+            description TEXT,
+            item_status ENUM('lost', 'found', 'returned', 'claimed', 'expired') NOT NULL,
+            place VARCHAR(100) NOT NULL,
+            created_at TIMESTAMP NULL,
+            expires_at DATETIME NULL,
+            updated_at TIMESTAMP NULL,
+            full_name VARCHAR(255) NOT NULL,
+            faculty VARCHAR(100),
+            profile_photo_url VARCHAR(255),
+            phone VARCHAR(20),
+            email VARCHAR(255),
+            images TEXT NOT NULL,
+            social_profiles TEXT NOT NULL,
+            listed TINYINT NOT NULL,
+            -- Feed: listed = 1 in keyset order created_at DESC, post_id DESC (post_id rides along as the PK)
+            INDEX idx_post_cards_listed_created (listed, created_at),
+            INDEX idx_post_cards_status_created (item_status, created_at),
+            INDEX idx_post_cards_student_created (student_id, created_at),
+            FOREIGN KEY (post_id) REFERENCES posts(post_id) ON DELETE CASCADE
+        ) ENGINE=InnoDB
+    ''')
+    from read_model import backfill_cards
+    backfill_cards(cursor)
+
+
+def migration_006_post_facet_counts(cursor):
+    # Per-status counts of open posts by faculty, place and creation day, see facets.py
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS post_facet_counts (
+            item_status VARCHAR(10) NOT NULL,
+            facet VARCHAR(10) NOT NULL,
+            value VARCHAR(255) NOT NULL,
+            post_count INT NOT NULL,
+            PRIMARY KEY (item_status, facet, value)
+        ) ENGINE=InnoDB
+    ''')
+    from facets import backfill_counts
+    backfill_counts(cursor, "mysql")
+
+
+MIGRATIONS = [
+    (1, "base tables", migration_001_base_tables),
+    (2, "ngram FULLTEXT indexes for search", migration_002_fulltext_search),
+    (3, "indexes for hot query predicates", migration_003_hot_path_indexes),
+    (4, "drop legacy MySQL expiry event", migration_004_drop_expiry_event),
+    (5, "post_cards read model", migration_005_post_cards),
+    (6, "post_facet_counts for the home page filters", migration_006_post_facet_counts),
+]
+
+# ========== SQLITE SCHEMA ==========
+FACULTIES = (
+    'School of Engineering',
+    'School of Architecture, Art, and Design',
+    'School of Industrial Education and Technology',
+    'School of Agricultural Technology',
+    'School of Science',
+    'School of Food Industry',
+    'School of Information Technology',
+    'International College',
+    'College of Materials Innovation and Technology',
+    'College of Advanced Manufacturing Innovation',
+    'KMITL Business School',
+    'International Academy of Aviation Industry',
+    'School of Liberal Arts',
+    'Faculty of Medicine',
+    'College of Innovation and Industrial Management',
+    'Institute of Music Science and Engineering',
+    'School of Dentistry',
+    'School of Nursing Science',
+    'School of Integrated Innovative Technology',
+)
+
+def _sql_list(values):
+    return ", ".join("'" + v.replace("'", "''") + "'" for v in values)
+
+
+def sqlite_001_base_tables(cursor):
+    # Same tables as the MySQL schema; ENUMs become CHECK constraints
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS users (
+            student_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            full_name TEXT NOT NULL,
+            faculty TEXT NOT NULL CHECK (faculty IN ({_sql_list(FACULTIES)})),
+            class_year TEXT NOT NULL CHECK (class_year IN ('1', '2', '3', '4', '5', '6')),
+            phone TEXT NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            profile_photo_url TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS social_profiles (
+            contact_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            platform TEXT NOT NULL CHECK (platform IN ('Facebook', 'Instagram', 'LINE', 'Twitter / X', 'Discord', 'Other')),
+            profile_url TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_social_profiles (
+            user_social_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER NOT NULL REFERENCES users(student_id) ON DELETE CASCADE,
+            contact_id INTEGER NOT NULL REFERENCES social_profiles(contact_id) ON DELETE CASCADE,
+            UNIQUE (student_id, contact_id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS posts (
+            post_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER NOT NULL REFERENCES users(student_id) ON DELETE CASCADE,
+            item_name TEXT NOT NULL,
+            item_status TEXT DEFAULT 'lost' CHECK (item_status IN ('lost', 'found', 'returned', 'claimed', 'expired')),
+            place TEXT NOT NULL,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            -- A plain column (not generated) because create_post writes expires_at itself
+            expires_at TIMESTAMP DEFAULT (datetime('now', '+30 days'))
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS post_images (
+            post_image_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            post_id INTEGER NOT NULL REFERENCES posts(post_id) ON DELETE CASCADE,
+            image_url TEXT NOT NULL,
+            image_order INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def sqlite_002_fulltext_search(cursor):
+    # FTS5 with the trigram tokenizer matches substrings, so Thai text works without word breaking.
+    # Both are external-content tables kept in sync by triggers.
+    for table, key, columns in (("posts", "post_id", "item_name, description"), ("users", "student_id", "full_name")):
+        new_values = ", ".join(f"new.{c.strip()}" for c in columns.split(","))
+        old_values = ", ".join(f"old.{c.strip()}" for c in columns.split(","))
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts
+            USING fts5({columns}, content='{table}', content_rowid='{key}', tokenize='trigram')
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO {table}_fts (rowid, {columns}) VALUES (new.{key}, {new_values});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+                INSERT INTO {table}_fts ({table}_fts, rowid, {columns}) VALUES ('delete', old.{key}, {old_values});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF {columns} ON {table} BEGIN
+                INSERT INTO {table}_fts ({table}_fts, rowid, {columns}) VALUES ('delete', old.{key}, {old_values});
+                INSERT INTO {table}_fts (rowid, {columns}) VALUES (new.{key}, {new_values});
+            END
+        ''')
+        cursor.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+
+
+def sqlite_003_hot_path_indexes(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_posts_status_expires_created ON posts (item_status, expires_at, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_posts_created ON posts (created_at, post_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_posts_student_created ON posts (student_id, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_post_images_post_order ON post_images (post_id, image_order)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_social_profiles_student ON user_social_profiles (student_id)")
+
+
+def sqlite_004_post_cards(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS post_cards (
+            post_id INTEGER PRIMARY KEY REFERENCES posts(post_id) ON DELETE CASCADE,
+            student_id INTEGER NOT NULL,
+            item_name TEXT NOT NULL,
+            description TEXT,
+            item_status TEXT NOT NULL,
+            place TEXT NOT NULL,
+            created_at TIMESTAMP,
+            expires_at TIMESTAMP,
+            updated_at TIMESTAMP,
+            full_name TEXT NOT NULL,
+            faculty TEXT,
+            profile_photo_url TEXT,
+            phone TEXT,
+            email TEXT,
+            images TEXT NOT NULL,
+            social_profiles TEXT NOT NULL,
+            listed INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_post_cards_listed_created ON post_cards (listed, created_at, post_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_post_cards_status_created ON post_cards (item_status, created_at, post_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_post_cards_student_created ON post_cards (student_id, created_at)")
+    from read_model import backfill_cards
+    backfill_cards(cursor)
+
+
+def sqlite_005_post_facet_counts(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS post_facet_counts (
+            item_status TEXT NOT NULL,
+            facet TEXT NOT NULL,
+            value TEXT NOT NULL,
+            post_count INTEGER NOT NULL,
+            PRIMARY KEY (item_status, facet, value)
+        )
+    ''')
+    from facets import backfill_counts
+    backfill_counts(cursor, "sqlite")
+
+
+SQLITE_MIGRATIONS = [
+    (1, "base tables", sqlite_001_base_tables),
+    (2, "FTS5 trigram search tables", sqlite_002_fulltext_search),
+    (3, "indexes for hot query predicates", sqlite_003_hot_path_indexes),
+    (4, "post_cards read model", sqlite_004_post_cards),
+    (5, "post_facet_counts for the home page filters", sqlite_005_post_facet_counts),
+]
+
+MIGRATIONS_BY_DIALECT = {"mysql": MIGRATIONS, "sqlite": SQLITE_MIGRATIONS}
+
+
+def current_version(cursor):
+    """Highest applied migration; 0 when schema_migrations does not exist yet."""
+    try:
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+        return cursor.fetchone()[0]
+    except sqlite3.OperationalError as e:
+        if "no such table" in str(e):
+            return 0
+        raise
+    except Error as e:
+        if e.errno == errorcode.ER_NO_SUCH_TABLE:
+            return 0
+        raise
+
+def apply_migrations(conn, cursor, dialect="mysql"):
+    """Bring the schema up to the latest version; returns the list of versions applied.
+
+    When the schema is current this is a single SELECT.
+    """
+    migrations = MIGRATIONS_BY_DIALECT[dialect]
+    if current_version(cursor) >= migrations[-1][0]:
+        return []
+    
+    # Serialize migrations across MySQL workers that boot at the same time
+    # (SQLite writes are already serialized by its writer lock)
+    if dialect == "mysql":
+        cursor.execute("SELECT GET_LOCK(%s, 60)", (MIGRATIONS_LOCK_NAME,))
+        cursor.fetchone()
+    try:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT PRIMARY KEY,
+                description VARCHAR(255) NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        version = current_version(cursor)
+        applied = []
+        for number, description, migrate in migrations:
+            if number <= version:
+                continue
+            migrate(cursor)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                (number, description)
+            )
+            conn.commit()
+            applied.append(number)
+            print(f"✅ Applied migration {number}: {description}")
+        return applied
+    finally:
+        if dialect == "mysql":
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATIONS_LOCK_NAME,))
+            cursor.fetchone()
+
+
+# ========== QUERY PLAN CHECKS ==========
+# The hot queries from app.py/expiry.py with representative parameters. Each must be
+# served by an index; a plan row with access type ALL on a large table is a regression.
+HOT_QUERIES = [
+    ("feed", '''
+        SELECT c.post_id FROM post_cards c
+        WHERE c.listed = 1 AND c.expires_at > CURRENT_TIMESTAMP
+        ORDER BY c.created_at DESC, c.post_id DESC LIMIT 21
+    ''', ()),
+    ("feed by status", '''
+        SELECT c.post_id FROM post_cards c
+        WHERE c.listed = 1 AND c.expires_at > CURRENT_TIMESTAMP
+        AND c.item_status = %s
+        ORDER BY c.created_at DESC, c.post_id DESC LIMIT 21
+    ''', ("lost",)),
+    ("user posts", '''
+        SELECT c.post_id FROM post_cards c WHERE c.student_id = %s ORDER BY c.created_at DESC
+    ''', (1,)),
+    ("post details", "SELECT * FROM post_cards c WHERE c.post_id = %s", (1,)),
+    ("card refresh images", '''
+        SELECT post_id, image_url FROM post_images WHERE post_id IN (%s, %s, %s)
+        ORDER BY post_id, image_order
+    ''', (1, 2, 3)),
+    ("search", '''
+        SELECT post_id FROM posts
+        WHERE MATCH(item_name, description) AGAINST (%s IN BOOLEAN MODE)
+    ''', ("wallet",)),
+    ("expiry batch", '''
+        SELECT post_id FROM posts WHERE item_status IN ('lost', 'found')
+        AND expires_at < CURRENT_TIMESTAMP ORDER BY expires_at LIMIT 500
+    ''', ()),
+    ("login", "SELECT student_id FROM users WHERE email = %s", ("someone@kmitl.ac.th",)),
+]
+
+# Tables small enough that a scan is the right plan
+SCAN_ALLOWED_TABLES = {"schema_migrations"}
+
+def check_query_plans(cursor, dialect="mysql"):
+    """EXPLAIN every hot query; returns a list of (query name, table) pairs that do a full scan."""
+    regressions = []
+    for name, sql, params in HOT_QUERIES:
+        if dialect == "sqlite":
+            if "MATCH(" in sql:
+                continue  # FTS5 lookups are always index-driven
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            for row in cursor.fetchall():
+                detail = row[-1]
+                # "SCAN p" is a full scan; "SCAN p USING INDEX ..." walks an index in order
+                if detail.startswith("SCAN ") and "USING" not in detail:
+                    regressions.append((name, detail.split()[1]))
+            continue
+        cursor.execute("EXPLAIN " + sql, params)
+        columns = [c[0] for c in cursor.description]
+        for row in cursor.fetchall():
+            plan = dict(zip(columns, row))
+            if plan.get("type") == "ALL" and plan.get("table") not in SCAN_ALLOWED_TABLES:
+                regressions.append((name, plan.get("table")))
+    return regressions
+
+
+if __name__ == "__main__":
+    # Usage: python migrations.py            -> apply pending migrations
+    #        python migrations.py explain    -> fail (exit 1) if a hot query does a full table scan
+    import sys
+    from database import get_db, init_database, DB_BACKEND
+    
+    init_database()
+    if sys.argv[1:] == ["explain"]:
+        db = get_db()
+        cursor = db.cursor()
+        try:
+            regressions = check_query_plans(cursor, DB_BACKEND)
+        finally:
+            cursor.close()
+            db.close()
+        for name, table in regressions:
+            print(f"❌ {name}: full table scan on {table}")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ All {len(HOT_QUERIES)} hot queries use an index")
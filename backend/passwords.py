@@ -0,0 +1,144 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Password hashing settings
+# scrypt cost: N is the CPU/memory factor, memory use is 128 * N * r bytes per hash.
+PASSWORD_HASH_N = int(os.getenv("PASSWORD_HASH_N", str(2 ** 14)))
+PASSWORD_HASH_R = int(os.getenv("PASSWORD_HASH_R", "8"))
+PASSWORD_HASH_P = int(os.getenv("PASSWORD_HASH_P", "1"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "256"))
+
+SCHEME = "scrypt"
+
+# This module is imported by the worker processes, so it only depends on the standard library.
+
+
+def _b64encode(raw):
+    return base64.b64encode(raw).decode().rstrip("=")
+
+def _b64decode(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r, dklen=32)
+
+def is_hashed(stored):
+    return stored.startswith(SCHEME + "$")
+
+def hash_password_sync(password, n=PASSWORD_HASH_N, r=PASSWORD_HASH_R, p=PASSWORD_HASH_P):
+    """Hash `password` as scrypt$N$r$p$salt$hash (CPU heavy, runs in a worker process)."""
+    salt = secrets.token_bytes(16)
+    return f"{SCHEME}${n}${r}${p}${_b64encode(salt)}${_b64encode(_scrypt(password, salt, n, r, p))}"
+
+def verify_password_sync(password, stored):
+    """Check `password` against a stored scrypt hash (CPU heavy, runs in a worker process)."""
+    try:
+        _, n, r, p, salt, expected = stored.split("$")
+        actual = _scrypt(password, _b64decode(salt), int(n), int(r), int(p))
+    except ValueError:
+        return False
+    return hmac.compare_digest(actual, _b64decode(expected))
+
+def needs_rehash(stored, n=PASSWORD_HASH_N, r=PASSWORD_HASH_R, p=PASSWORD_HASH_P):
+    """True for legacy plaintext rows and for hashes made with a different cost."""
+    if not is_hashed(stored):
+        return True
+    return stored.split("$")[1:4] != [str(n), str(r), str(p)]
+
+
+class PasswordHasher:
+    """Bounded process pool for password hashing, so scrypt never runs on the event loop."""
+
+    def __init__(self, workers=PASSWORD_HASH_WORKERS, max_queue=PASSWORD_HASH_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._legacy_logins = 0
+        self._total_time = 0.0
+        self._max_time = 0.0
+        self._dummy_hash = None
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process that already runs threads (DB executor, uvicorn) is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    async def _run(self, func, *args):
+        with self._lock:
+            if self._pending >= self.max_queue:
+                self._rejected += 1
+                from database import PoolExhaustedError
+                raise PoolExhaustedError("Password hashing queue is full")
+            self._pending += 1
+        started = time.monotonic()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool(), func, *args)
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._pending -= 1
+                self._completed += 1
+                self._total_time += elapsed
+                self._max_time = max(self._max_time, elapsed)
+
+    async def hash(self, password):
+        return await self._run(hash_password_sync, password)
+
+    async def verify(self, password, stored):
+        """Returns (matches, needs_rehash). `stored` is None when the account does not exist."""
+        if stored is None:
+            # Do the same work as a real check so response time does not reveal which emails exist
+            if self._dummy_hash is None:
+                self._dummy_hash = await self.hash(secrets.token_hex(8))
+            await self._run(verify_password_sync, password, self._dummy_hash)
+            return False, False
+        if not is_hashed(stored):
+            # Legacy plaintext row: compare directly, the caller upgrades it to a hash
+            matches = hmac.compare_digest(password.encode(), stored.encode())
+            if matches:
+                with self._lock:
+                    self._legacy_logins += 1
+            return matches, matches
+        matches = await self._run(verify_password_sync, password, stored)
+        return matches, matches and needs_rehash(stored)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "scheme": SCHEME,
+                "cost": {"n": PASSWORD_HASH_N, "r": PASSWORD_HASH_R, "p": PASSWORD_HASH_P},
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "pending": self._pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "legacy_upgrades": self._legacy_logins,
+                "avg_ms": round(self._total_time / self._completed * 1000, 3) if self._completed else 0.0,
+                "max_ms": round(self._max_time * 1000, 3),
+            }
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,56 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import autocomplete
+import facets
+import matching
+from cache import invalidate_post_cache
+from database import get_db, DB_ERRORS
+
+# Post index settings
+POST_INDEX_BATCH = 500   # post ids per lookup after a write
+
+# Everything the in-memory indexes need from a changed post, read from its card in one query
+CARD_COLUMNS = "post_id, item_name, description, item_status, place, created_at, expires_at, faculty"
+
+# One worker keeps index loads, updates and facet syncs in order and off the request path
+index_worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="post-indexes")
+
+
+def _read_cards(post_ids):
+    db = get_db()
+    cursor = db.cursor(dictionary=True)
+    try:
+        posts = []
+        for start in range(0, len(post_ids), POST_INDEX_BATCH):
+            chunk = post_ids[start:start + POST_INDEX_BATCH]
+            cursor.execute(f"SELECT {CARD_COLUMNS} FROM post_cards WHERE post_id IN ({', '.join(['%s'] * len(chunk))})", chunk)
+            posts.extend(cursor.fetchall())
+        return posts
+    finally:
+        cursor.close()
+        db.close()
+
+def refresh_posts(post_ids):
+    """Re-read changed posts once and hand the rows to every index; posts without a card were deleted."""
+    try:
+        posts = _read_cards(post_ids)
+    except DB_ERRORS as err:
+        print(f"Post index refresh failed: {err}")
+        return
+    found = {post["post_id"] for post in posts}
+    removed_ids = [post_id for post_id in post_ids if post_id not in found]
+    matching.apply_changes(posts, removed_ids)
+    facets.apply_changes(posts, removed_ids)
+    autocomplete.apply_changes(posts, removed_ids)
+    # Cached /matches responses may predate this update
+    invalidate_post_cache(post_ids)
+
+def schedule_load():
+    """Build the match, facet and autocomplete indexes in the background."""
+    for load in (matching.load_index, facets.load_facets, autocomplete.load_index):
+        index_worker.submit(load)
+
+def schedule_refresh(post_ids):
+    """Queue an index update for posts that were created, changed, expired or deleted."""
+    if post_ids:
+        index_worker.submit(refresh_posts, list(post_ids))
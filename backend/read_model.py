@@ -0,0 +1,255 @@
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from database import get_db, DB_ERRORS
+from facets import facet_key, update_counts
+
+# Read model settings
+READ_MODEL_BATCH = int(os.getenv("READ_MODEL_BATCH", "500"))    # posts rebuilt per statement / transaction
+READ_MODEL_REPORT_IDS = 100                                      # ids listed per problem in check reports
+
+# post_cards holds one denormalized row per post: the post, its owner's display and contact
+# fields, its image URLs (in order) and the owner's social links (both JSON arrays). `listed`
+# is 1 for lost/found posts, so the feed walks one index in created_at order. Every
+# write to posts or post_images refreshes the affected cards in the same transaction with
+# refresh_cards(), so the read routes need a single indexed lookup. Profiles are only written
+# at registration, before the user has posts; a profile update route would have to refresh
+# that user's cards too.
+CARD_COLUMNS = (
+    "post_id", "student_id", "item_name", "description", "item_status", "place",
+    "created_at", "expires_at", "updated_at",
+    "full_name", "faculty", "profile_photo_url", "phone", "email",
+    "images", "social_profiles", "listed",
+)
+LISTED_STATUSES = ("lost", "found")
+JSON_COLUMNS = ("images", "social_profiles")
+
+
+def _in_clause(ids):
+    return ", ".join(["%s"] * len(ids))
+
+def build_cards(cursor, post_ids):
+    """Card rows (tuples in CARD_COLUMNS order) for the posts in `post_ids` that exist, from the normalized tables."""
+    post_ids = list(post_ids)
+    if not post_ids:
+        return []
+    cursor.execute(f'''
+        SELECT p.post_id, p.student_id, p.item_name, p.description, p.item_status, p.place,
+               p.created_at, p.expires_at, p.updated_at,
+               u.full_name, u.faculty, u.profile_photo_url, u.phone, u.email
+        FROM posts p
+        JOIN users u ON p.student_id = u.student_id
+        WHERE p.post_id IN ({_in_clause(post_ids)})
+    ''', post_ids)
+    posts = cursor.fetchall()
+    if not posts:
+        return []
+
+    images = {row[0]: [] for row in posts}
+    cursor.execute(f'''
+        SELECT post_id, image_url
+        FROM post_images
+        WHERE post_id IN ({_in_clause(images)})
+        ORDER BY post_id, image_order
+    ''', list(images))
+    for post_id, image_url in cursor.fetchall():
+        images[post_id].append(image_url)
+
+    socials = {row[1]: [] for row in posts}
+    cursor.execute(f'''
+        SELECT usp.student_id, sp.platform, sp.profile_url
+        FROM user_social_profiles usp
+        JOIN social_profiles sp ON sp.contact_id = usp.contact_id
+        WHERE usp.student_id IN ({_in_clause(socials)})
+        ORDER BY usp.student_id, usp.user_social_id
+    ''', list(socials))
+    for student_id, platform, profile_url in cursor.fetchall():
+        socials[student_id].append({"platform": platform, "profile_url": profile_url})
+
+    return [tuple(row) + (json.dumps(images[row[0]], ensure_ascii=False),
+                          json.dumps(socials[row[1]], ensure_ascii=False),
+                          int(row[4] in LISTED_STATUSES))
+            for row in posts]
+
+def _card_key(card):
+    values = dict(zip(CARD_COLUMNS, card))
+    return facet_key(values["item_status"], values["faculty"], values["place"], values["created_at"])
+
+def _refresh(cursor, post_ids, dialect=None, build=True):
+    # With a dialect, post_facet_counts moves along with the cards (the migrations fill it themselves)
+    post_ids = list(post_ids)
+    for start in range(0, len(post_ids), READ_MODEL_BATCH):
+        chunk = post_ids[start:start + READ_MODEL_BATCH]
+        cards = build_cards(cursor, chunk) if build else []
+        old_keys = []
+        if dialect:
+            cursor.execute(f'''
+                SELECT item_status, faculty, place, created_at FROM post_cards
+                WHERE post_id IN ({_in_clause(chunk)})
+            ''', chunk)
+            old_keys = [facet_key(*row) for row in cursor.fetchall()]
+        cursor.execute(f"DELETE FROM post_cards WHERE post_id IN ({_in_clause(chunk)})", chunk)
+        if cards:
+            cursor.executemany(f'''
+                INSERT INTO post_cards ({", ".join(CARD_COLUMNS)})
+                VALUES ({_in_clause(CARD_COLUMNS)})
+            ''', cards)
+        if dialect:
+            update_counts(cursor, dialect, old_keys, [_card_key(card) for card in cards])
+
+def refresh_cards(db, post_ids):
+    """Rewrite the cards (and facet counts) of `post_ids` inside the caller's transaction; posts that are gone lose theirs.
+
+    Call after writing posts/post_images and before commit, so the card commits (or rolls
+    back) together with the change.
+    """
+    cursor = db.cursor()
+    try:
+        _refresh(cursor, post_ids, db.dialect)
+    finally:
+        cursor.close()
+
+def drop_cards(db, post_ids):
+    """Remove the cards (and facet counts) of posts about to be deleted; call before the DELETE.
+
+    The ON DELETE CASCADE would drop the cards too, but without taking them out of the counts.
+    """
+    cursor = db.cursor()
+    try:
+        _refresh(cursor, post_ids, db.dialect, build=False)
+    finally:
+        cursor.close()
+
+def _post_id_batches(cursor, after_id=0):
+    """Every post id above `after_id`, in ascending batches of READ_MODEL_BATCH."""
+    while True:
+        cursor.execute(
+            "SELECT post_id FROM posts WHERE post_id > %s ORDER BY post_id LIMIT %s",
+            (after_id, READ_MODEL_BATCH)
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            return
+        yield ids
+        after_id = ids[-1]
+
+def backfill_cards(cursor):
+    """Build the card of every post in the current transaction (used by the migration)."""
+    batches = list(_post_id_batches(cursor))
+    for ids in batches:
+        _refresh(cursor, ids)
+    return sum(len(ids) for ids in batches)
+
+def rebuild_cards(db, after_id=0):
+    """Rewrite the cards of all posts above `after_id`, one short transaction per batch; returns the count."""
+    cursor = db.cursor()
+    rebuilt = 0
+    try:
+        for ids in list(_post_id_batches(cursor, after_id)):
+            _refresh(cursor, ids, db.dialect)
+            db.commit()
+            rebuilt += len(ids)
+        if not after_id:
+            cursor.execute('''
+                DELETE FROM post_cards
+                WHERE NOT EXISTS (SELECT 1 FROM posts p WHERE p.post_id = post_cards.post_id)
+            ''')
+            db.commit()
+        return rebuilt
+    except DB_ERRORS:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def _comparable(card):
+    values = dict(zip(CARD_COLUMNS, card))
+    for column in JSON_COLUMNS:
+        values[column] = json.loads(values[column] or "[]")
+    for column in ("created_at", "expires_at", "updated_at"):
+        # SQLite may hand back text for rows written outside the app
+        if isinstance(values[column], str):
+            values[column] = datetime.fromisoformat(values[column])
+    return values
+
+def check_cards(db, repair=False):
+    """Compare every card with what the normalized tables say it should be.
+
+    Returns counts and (the first READ_MODEL_REPORT_IDS) ids of missing, stale and orphaned
+    cards; with repair=True those cards are rewritten.
+    """
+    cursor = db.cursor()
+    started = time.monotonic()
+    checked = 0
+    problems = {"missing": [], "stale": [], "orphaned": []}
+    try:
+        for ids in list(_post_id_batches(cursor)):
+            expected = {card[0]: card for card in build_cards(cursor, ids)}
+            cursor.execute(f"SELECT {', '.join(CARD_COLUMNS)} FROM post_cards WHERE post_id IN ({_in_clause(ids)})", ids)
+            stored = {row[0]: row for row in cursor.fetchall()}
+            checked += len(ids)
+            for post_id, card in expected.items():
+                if post_id not in stored:
+                    problems["missing"].append(post_id)
+                elif _comparable(stored[post_id]) != _comparable(card):
+                    problems["stale"].append(post_id)
+            # A post without a resolvable owner cannot have a card either
+            problems["orphaned"].extend(post_id for post_id in stored if post_id not in expected)
+
+        cursor.execute('''
+            SELECT c.post_id FROM post_cards c
+            WHERE NOT EXISTS (SELECT 1 FROM posts p WHERE p.post_id = c.post_id)
+        ''')
+        problems["orphaned"].extend(row[0] for row in cursor.fetchall())
+
+        repaired = 0
+        if repair:
+            bad_ids = [post_id for ids in problems.values() for post_id in ids]
+            _refresh(cursor, bad_ids, db.dialect)
+            db.commit()
+            repaired = len(bad_ids)
+        else:
+            db.rollback()
+
+        report = {"checked": checked, "repaired": repaired}
+        for name, ids in problems.items():
+            report[name] = len(ids)
+            report[f"{name}_ids"] = ids[:READ_MODEL_REPORT_IDS]
+        report["duration_ms"] = round((time.monotonic() - started) * 1000, 3)
+        return report
+    except DB_ERRORS:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+if __name__ == "__main__":
+    # Usage: python read_model.py check            -> report cards that disagree with the posts tables (exit 1 if any)
+    #        python read_model.py check --repair   -> ... and rewrite them
+    #        python read_model.py rebuild          -> rewrite every card
+    from database import init_database
+
+    init_database()
+    db = get_db()
+    try:
+        if sys.argv[1:2] == ["rebuild"]:
+            started = time.monotonic()
+            count = rebuild_cards(db)
+            print(f"✅ Rebuilt {count} post cards in {time.monotonic() - started:.1f}s")
+        elif sys.argv[1:2] == ["check"]:
+            report = check_cards(db, repair="--repair" in sys.argv[2:])
+            print(json.dumps(report, indent=2))
+            bad = report["missing"] + report["stale"] + report["orphaned"]
+            if bad and not report["repaired"]:
+                print(f"❌ {bad} post cards are out of date (run with --repair or 'rebuild')")
+                sys.exit(1)
+            print(f"✅ Checked {report['checked']} posts, repaired {report['repaired']} cards")
+        else:
+            print("Usage: python read_model.py check [--repair] | rebuild")
+            sys.exit(2)
+    finally:
+        db.close()
@@ -0,0 +1,132 @@
+import argparse
+import random
+from datetime import timedelta
+
+from database import get_db, init_database, db_now
+from migrations import FACULTIES
+from passwords import hash_password_sync
+from read_model import rebuild_cards
+
+# Synthetic campus data for benchmarks: realistic names, items and places in Thai and English.
+# Every seeded user logs in with SEED_PASSWORD.
+SEED_PASSWORD = "password123"
+
+FIRST_NAMES = ["Somchai", "Somsak", "Napat", "Kittipong", "Pimchanok", "Nattaya", "Thanawat", "Siriporn",
+               "Chanon", "Ploy", "Anan", "Waraporn", "สมชาย", "สมหญิง", "ณัฐพล", "กิตติ", "พิมพ์ชนก", "ธนวัฒน์"]
+LAST_NAMES = ["Jaidee", "Srisuk", "Wongsawat", "Charoenrat", "Boonmee", "Saetang", "Kaewkla", "Thongdee",
+              "ใจดี", "ศรีสุข", "วงศ์สวัสดิ์", "บุญมี"]
+ITEMS = [
+    ("Wallet", "Black leather wallet with student ID inside"),
+    ("Student ID card", "KMITL student card"),
+    ("iPhone", "iPhone in a clear case, lock screen is a cat"),
+    ("AirPods", "White AirPods case, one earbud missing"),
+    ("Keys", "Bunch of keys with a blue keychain"),
+    ("Umbrella", "Folding umbrella, navy blue"),
+    ("Water bottle", "Stainless steel bottle with stickers"),
+    ("Laptop charger", "USB-C 65W charger"),
+    ("Calculator", "Casio fx-991 scientific calculator"),
+    ("Backpack", "Grey backpack with notebooks"),
+    ("กระเป๋าสตางค์", "กระเป๋าสตางค์สีน้ำตาล มีบัตรนักศึกษาอยู่ข้างใน"),
+    ("บัตรนักศึกษา", "บัตรนักศึกษา สจล. หล่นหาย"),
+    ("กุญแจ", "พวงกุญแจรถมอเตอร์ไซค์"),
+    ("ร่ม", "ร่มพับสีดำ"),
+    ("แว่นตา", "แว่นสายตากรอบดำ อยู่ในกล่องสีแดง"),
+]
+PLACES = ["ECC Building", "HM Building", "Central Library", "Canteen A", "Engineering Building 12",
+          "KMITL Sports Complex", "Airport Link Station", "Prathep Building", "ตึกโหล", "หอสมุดกลาง",
+          "โรงอาหาร", "ลานพระบิดา", "ตึก ECC"]
+STATUSES = ["lost"] * 45 + ["found"] * 40 + ["returned"] * 8 + ["claimed"] * 5 + ["expired"] * 2
+PLATFORMS = ["Facebook", "Instagram", "LINE", "Twitter / X", "Discord", "Other"]
+CLASS_YEARS = ["1", "2", "3", "4", "5", "6"]
+
+BATCH_SIZE = 5000
+
+
+def _batches(rows, size=BATCH_SIZE):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+def _insert(db, cursor, sql, rows):
+    for batch in _batches(rows):
+        cursor.executemany(sql, batch)
+        db.commit()
+
+def seed(users=20000, posts=200000, max_images=3, days=60, seed_value=42):
+    """Insert `users` users (with social profiles) and `posts` posts (with images)."""
+    rng = random.Random(seed_value)
+    init_database()
+    db = get_db()
+    cursor = db.cursor()
+    now = db_now()
+    # One hash shared by every seeded user: hashing 20k passwords individually would dominate seeding
+    password_hash = hash_password_sync(SEED_PASSWORD)
+
+    try:
+        cursor.execute("SELECT COALESCE(MAX(student_id), 0) FROM users")
+        first_user = cursor.fetchone()[0] + 1
+        user_rows = []
+        for i in range(users):
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            user_rows.append((
+                name, rng.choice(FACULTIES), rng.choice(CLASS_YEARS),
+                f"08{rng.randrange(10**8):08d}", f"seed{first_user + i}@kmitl.ac.th", password_hash, None
+            ))
+        _insert(db, cursor, '''
+            INSERT INTO users (full_name, faculty, class_year, phone, email, password, profile_photo_url)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ''', user_rows)
+        user_ids = list(range(first_user, first_user + users))
+
+        cursor.execute("SELECT COALESCE(MAX(contact_id), 0) FROM social_profiles")
+        first_contact = cursor.fetchone()[0] + 1
+        social_rows, link_rows = [], []
+        for student_id in user_ids:
+            for _ in range(rng.randint(1, 2)):
+                social_rows.append((rng.choice(PLATFORMS), f"https://social.example/{student_id}/{len(social_rows)}"))
+                link_rows.append((student_id, first_contact + len(social_rows) - 1))
+        _insert(db, cursor, "INSERT INTO social_profiles (platform, profile_url) VALUES (%s, %s)", social_rows)
+        _insert(db, cursor, "INSERT INTO user_social_profiles (student_id, contact_id) VALUES (%s, %s)", link_rows)
+
+        cursor.execute("SELECT COALESCE(MAX(post_id), 0) FROM posts")
+        first_post = cursor.fetchone()[0] + 1
+        post_rows, image_rows = [], []
+        for i in range(posts):
+            item_name, description = rng.choice(ITEMS)
+            created_at = now - timedelta(seconds=rng.randrange(days * 86400))
+            post_rows.append((
+                rng.choice(user_ids), item_name, description, rng.choice(STATUSES),
+                rng.choice(PLACES), created_at, created_at, created_at + timedelta(days=30)
+            ))
+            for order in range(rng.randint(0, max_images)):
+                image_rows.append((first_post + i, f"/uploads/seed/{first_post + i}_{order}.jpg", order))
+        if db.dialect == "mysql":
+            # expires_at is generated from created_at on MySQL
+            post_rows = [row[:-1] for row in post_rows]
+            post_sql = '''
+                INSERT INTO posts (student_id, item_name, description, item_status, place, created_at, updated_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            '''
+        else:
+            post_sql = '''
+                INSERT INTO posts (student_id, item_name, description, item_status, place, created_at, updated_at, expires_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            '''
+        _insert(db, cursor, post_sql, post_rows)
+        _insert(db, cursor, "INSERT INTO post_images (post_id, image_url, image_order) VALUES (%s, %s, %s)", image_rows)
+        rebuild_cards(db, after_id=first_post - 1)
+
+        print(f"✅ Seeded {users} users, {len(social_rows)} social profiles, {posts} posts, {len(image_rows)} images")
+        return {"first_user": first_user, "users": users, "first_post": first_post, "posts": posts}
+
+    finally:
+        cursor.close()
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed the database with synthetic campus data")
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--posts", type=int, default=200000)
+    parser.add_argument("--max-images", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    seed(args.users, args.posts, args.max_images, seed_value=args.seed)
@@ -0,0 +1,51 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson  # optional: pip install orjson for several times faster encoding
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    # Same conversions jsonable_encoder applies to what the DB drivers return
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.decode()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    """Encode obj to compact UTF-8 JSON bytes (datetimes as ISO 8601, like jsonable_encoder)."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def extend_fragment(fragment, fields):
+    """Append `fields` to an encoded JSON object without re-encoding it."""
+    if not fields:
+        return fragment
+    extra = dumps(fields)
+    return fragment[:-1] + b"," + extra[1:] if len(fragment) > 2 else extra
+
+
+def encode_page(fragments, key="posts", **fields):
+    """A {key: [...], **fields} body assembled from already-encoded fragments."""
+    head = b'{' + dumps(key) + b':['
+    return head + b",".join(fragments) + b"]" + (b"," + dumps(fields)[1:] if fields else b"}")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with dumps(); passes pre-encoded bytes through untouched."""
+
+    def render(self, content):
+        return content if isinstance(content, bytes) else dumps(content)
@@ -0,0 +1,217 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from metrics import record_query
+
+# SQLite settings
+SQLITE_PATH = os.getenv("SQLITE_PATH", os.path.join("data", "lost_found.db"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_KB = int(os.getenv("SQLITE_CACHE_KB", "65536"))
+SQLITE_MMAP_BYTES = int(os.getenv("SQLITE_MMAP_BYTES", str(256 * 1024 * 1024)))
+SQLITE_STATEMENT_CACHE = int(os.getenv("SQLITE_STATEMENT_CACHE", "256"))
+
+# Tuned for a read-heavy workload: WAL lets readers run alongside the single writer
+PRAGMAS = [
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}",
+    f"PRAGMA cache_size = -{SQLITE_CACHE_KB}",
+    f"PRAGMA mmap_size = {SQLITE_MMAP_BYTES}",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA foreign_keys = ON",
+]
+
+READ_STATEMENT = re.compile(r"^\s*(SELECT|WITH|EXPLAIN|PRAGMA)\b", re.IGNORECASE)
+
+# TIMESTAMP columns come back as datetime objects, the same as with mysql-connector
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("TIMESTAMP", lambda raw: datetime.fromisoformat(raw.decode()))
+
+
+class SQLiteDatabase:
+    """One SQLite connection per thread (many readers) and a process-wide writer lock (one writer).
+
+    The executor threads are long-lived, so each thread's connection and its
+    prepared-statement cache are reused across requests.
+    """
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._writer_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._connections = 0
+        self._queries = 0
+        self._writes = 0
+        self._writer_wait = 0.0
+        self._max_writer_wait = 0.0
+
+    def thread_connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path,
+                detect_types=sqlite3.PARSE_DECLTYPES,
+                cached_statements=SQLITE_STATEMENT_CACHE,
+            )
+            for pragma in PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            with self._stats_lock:
+                self._connections += 1
+        return conn
+
+    def acquire_writer(self):
+        started = time.monotonic()
+        if not self._writer_lock.acquire(timeout=SQLITE_BUSY_TIMEOUT_MS / 1000):
+            from database import PoolExhaustedError
+            raise PoolExhaustedError("SQLite writer is busy")
+        waited = time.monotonic() - started
+        with self._stats_lock:
+            self._writes += 1
+            self._writer_wait += waited
+            self._max_writer_wait = max(self._max_writer_wait, waited)
+
+    def release_writer(self):
+        self._writer_lock.release()
+
+    def count_query(self, n=1):
+        with self._stats_lock:
+            self._queries += n
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "backend": "sqlite",
+                "path": self.path,
+                "connections": self._connections,
+                "queries": self._queries,
+                "writer_busy": self._writer_lock.locked(),
+                "write_transactions": self._writes,
+                "avg_writer_wait_ms": round(self._writer_wait / self._writes * 1000, 3) if self._writes else 0.0,
+                "max_writer_wait_ms": round(self._max_writer_wait * 1000, 3),
+            }
+
+
+class SQLiteConnection:
+    """Connection wrapper exposing the subset of the mysql-connector API the routes use."""
+
+    dialect = "sqlite"
+
+    def __init__(self, database):
+        self._database = database
+        self._conn = database.thread_connection()
+        self._holds_writer = False
+
+    def cursor(self, dictionary=False, buffered=None):
+        # sqlite3 cursors always read lazily; `buffered` is accepted for mysql-connector parity
+        return SQLiteCursor(self, dictionary)
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    def _begin_write(self):
+        if not self._holds_writer:
+            self._database.acquire_writer()
+            self._holds_writer = True
+
+    def _end_write(self):
+        if self._holds_writer:
+            self._holds_writer = False
+            self._database.release_writer()
+
+    def commit(self):
+        try:
+            self._conn.commit()
+        finally:
+            self._end_write()
+
+    def rollback(self):
+        try:
+            self._conn.rollback()
+        finally:
+            self._end_write()
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        # The thread keeps its connection; just make sure nothing is left open
+        if self._conn.in_transaction:
+            self._conn.rollback()
+        self._end_write()
+
+
+class SQLiteCursor:
+    """Translates %s placeholders to ? and returns dict rows when dictionary=True."""
+
+    def __init__(self, connection, dictionary):
+        self._connection = connection
+        self._cursor = connection._conn.cursor()
+        self._dictionary = dictionary
+
+    def execute(self, sql, params=()):
+        if not READ_STATEMENT.match(sql):
+            self._connection._begin_write()
+        self._connection._database.count_query()
+        started = time.perf_counter()
+        try:
+            self._cursor.execute(sql.replace("%s", "?"), tuple(params or ()))
+        finally:
+            record_query(sql, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_params):
+        self._connection._begin_write()
+        self._connection._database.count_query()
+        started = time.perf_counter()
+        try:
+            self._cursor.executemany(sql.replace("%s", "?"), [tuple(p) for p in seq_of_params])
+        finally:
+            record_query(sql, time.perf_counter() - started)
+
+    def _convert(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip([c[0] for c in self._cursor.description], row))
+
+    def fetchone(self):
+        return self._convert(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._convert(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._convert(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        for row in self._cursor:
+            yield self._convert(row)
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+
+sqlite_db = SQLiteDatabase()
+
+def connect():
+    return SQLiteConnection(sqlite_db)
@@ -0,0 +1,137 @@
+import gzip
+import os
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response, StreamingResponse
+from starlette.staticfiles import StaticFiles
+
+try:
+    import brotli  # optional: pip install brotli to also serve .br variants
+except ImportError:
+    brotli = None
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".svg", ".json", ".txt")
+RANGE_CHUNK_SIZE = 64 * 1024
+
+
+def precompress_directory(directory):
+    """Write .gz (and .br when brotli is installed) next to every text asset that changed.
+
+    Run once at startup or deploy; the files are reused until the source is newer.
+    """
+    written = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            source = os.path.join(root, name)
+            with open(source, "rb") as f:
+                data = None
+                for suffix, compress in ((".gz", _gzip), (".br", brotli and brotli.compress)):
+                    target = source + suffix
+                    if not compress or (os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source)):
+                        continue
+                    data = data if data is not None else f.read()
+                    with open(target + ".tmp", "wb") as out:
+                        out.write(compress(data))
+                    os.replace(target + ".tmp", target)
+                    written += 1
+    return written
+
+def _gzip(data):
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+def _parse_range(header, size):
+    """Parse a single 'bytes=start-end' range; returns (start, end) inclusive or None."""
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start, _, end = header[6:].strip().partition("-")
+    try:
+        if start == "":
+            length = int(end)
+            if length <= 0:
+                return None
+            return max(0, size - length), size - 1
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        return None
+    return start, end
+
+def _iter_range(path, start, end):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles with a Cache-Control policy, single-range requests and precompressed variants.
+
+    ETag / If-None-Match handling comes from Starlette's StaticFiles.
+    """
+
+    def __init__(self, *args, cache_control=REVALIDATE_CACHE, precompressed=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_control = cache_control
+        self.precompressed = precompressed
+
+    def _compressed_variant(self, full_path, request_headers):
+        accepted = request_headers.get("accept-encoding", "")
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if encoding in accepted:
+                variant = str(full_path) + suffix
+                try:
+                    return encoding, variant, os.stat(variant)
+                except FileNotFoundError:
+                    continue
+        return None
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        request_headers = Headers(scope=scope)
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        response.headers["Cache-Control"] = self.cache_control
+        if response.status_code == 304 or status_code != 200:
+            return response
+
+        if self.precompressed and str(full_path).endswith(COMPRESSIBLE_EXTENSIONS):
+            response.headers["Vary"] = "Accept-Encoding"
+            variant = self._compressed_variant(full_path, request_headers)
+            if variant:
+                encoding, variant_path, variant_stat = variant
+                # Identity ETag plus the encoding, so caches can tell the variants apart
+                etag = '"' + response.headers["etag"].strip('"') + "-" + encoding + '"'
+                headers = {"etag": etag, "cache-control": self.cache_control, "vary": "Accept-Encoding"}
+                if_none_match = request_headers.get("if-none-match", "")
+                if etag in [tag.strip() for tag in if_none_match.split(",")]:
+                    return Response(status_code=304, headers=headers)
+                compressed = FileResponse(variant_path, stat_result=variant_stat, method=scope["method"],
+                                          media_type=response.media_type)
+                compressed.headers.update(headers)
+                compressed.headers["last-modified"] = response.headers["last-modified"]
+                compressed.headers["content-encoding"] = encoding
+                return compressed
+            return response
+
+        response.headers["Accept-Ranges"] = "bytes"
+        byte_range = _parse_range(request_headers.get("range"), stat_result.st_size)
+        if_range = request_headers.get("if-range")
+        if byte_range is None or (if_range and if_range != response.headers["etag"]):
+            return response
+
+        start, end = byte_range
+        headers = {name: response.headers[name] for name in ("etag", "last-modified", "cache-control", "accept-ranges")}
+        headers["Content-Range"] = f"bytes {start}-{end}/{stat_result.st_size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(_iter_range(full_path, start, end), status_code=206,
+                                 media_type=response.media_type, headers=headers)
@@ -0,0 +1,30 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Configure the app before it is imported: SQLite in a scratch directory, no outside services
+WORKDIR = tempfile.mkdtemp(prefix="lostfound-tests-")
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.path.join(WORKDIR, "data", "test.db")
+os.environ["ADMISSION_ENABLED"] = "0"
+os.makedirs(os.path.join(WORKDIR, "data"), exist_ok=True)
+os.chdir(WORKDIR)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def db():
+    """The migrated scratch database; yields a connection factory (database.get_db)."""
+    from database import init_database, get_db
+    init_database()
+    return get_db
+
+
+@pytest.fixture
+def client(db):
+    """An httpx client bound to the app over ASGI (use inside asyncio.run)."""
+    import httpx
+    from app import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
@@ -0,0 +1,55 @@
+import asyncio
+
+import httpx
+
+import admission
+from admission import AdmissionControl, AdmissionMiddleware, client_key
+
+
+def _scope(*forwarded, peer="10.0.0.1"):
+    return {"client": (peer, 1234), "headers": [(b"x-forwarded-for", value.encode()) for value in forwarded]}
+
+
+def test_client_key_ignores_forwarded_for_without_proxies(monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_PROXY_HOPS", 0)
+    assert client_key(_scope("1.2.3.4")) == "10.0.0.1"
+
+
+def test_client_key_takes_the_entry_the_trusted_proxy_added(monkeypatch):
+    # The client sent "6.6.6.6" itself; the proxy appended the address it really came from
+    monkeypatch.setattr(admission, "ADMISSION_PROXY_HOPS", 1)
+    assert client_key(_scope("6.6.6.6, 203.0.113.7")) == "203.0.113.7"
+    assert client_key(_scope("6.6.6.6", "203.0.113.7")) == "203.0.113.7"
+    monkeypatch.setattr(admission, "ADMISSION_PROXY_HOPS", 2)
+    assert client_key(_scope("6.6.6.6, 203.0.113.7, 10.1.1.1")) == "203.0.113.7"
+    assert client_key(_scope("10.1.1.1")) == "10.0.0.1"
+
+
+def _login_client(monkeypatch, password_ok):
+    monkeypatch.setattr(admission, "ADMISSION_ENABLED", True)
+    monkeypatch.setattr(admission, "admission", AdmissionControl())
+
+    async def app(scope, receive, send):
+        status = 200 if password_ok() else 401
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=AdmissionMiddleware(app)), base_url="http://test")
+
+
+def _logins(client, count):
+    async def call():
+        async with client:
+            return [(await client.post("/auth/login")).status_code for _ in range(count)]
+    return asyncio.run(call())
+
+
+def test_successful_logins_are_not_rate_limited(monkeypatch):
+    burst = admission.RATE_LIMITS["login"][1]
+    assert _logins(_login_client(monkeypatch, lambda: True), burst * 4) == [200] * (burst * 4)
+
+
+def test_failed_logins_are_rate_limited(monkeypatch):
+    burst = admission.RATE_LIMITS["login"][1]
+    statuses = _logins(_login_client(monkeypatch, lambda: False), burst + 2)
+    assert statuses == [401] * burst + [429, 429]
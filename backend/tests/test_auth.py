@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from auth import issue_token, verify_token
+
+
+def test_valid_token():
+    assert verify_token(issue_token(42))["sub"] == 42
+
+
+@pytest.mark.parametrize("token", [
+    "garbage",
+    "a.b.c",
+    "payload.sïgnature",
+    "pâyload.signature",
+    issue_token(42)[:-1] + "é",
+    issue_token(42, ttl=-1),
+])
+def test_bad_tokens_are_401(token):
+    with pytest.raises(HTTPException) as raised:
+        verify_token(token)
+    assert raised.value.status_code == 401
+
+
+def test_non_ascii_bearer_header_is_401(client):
+    async def call():
+        async with client:
+            return await client.post("/posts", json={}, headers={"Authorization": "Bearer x.éé".encode("latin-1")})
+
+    assert asyncio.run(call()).status_code == 401
@@ -0,0 +1,40 @@
+import asyncio
+import json
+import time
+
+import bulk_import
+
+
+def _student(db):
+    conn = db()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            INSERT INTO users (full_name, faculty, class_year, phone, email, password)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        ''', ("Import Test", "School of Science", "1", "0800000000", f"import-{time.time_ns()}@example.com", "x"))
+        conn.commit()
+        return cursor.lastrowid
+    finally:
+        cursor.close()
+        conn.close()
+
+
+async def _chunks(records):
+    for record in records:
+        yield (json.dumps(record) + "\n").encode()
+
+
+def test_rows_pending_at_the_row_limit_are_imported(db, monkeypatch):
+    monkeypatch.setattr(bulk_import, "IMPORT_MAX_ROWS", 4)
+    monkeypatch.setattr(bulk_import, "IMPORT_BATCH_SIZE", 10)
+    post = {"item_name": "Scarf", "item_status": "lost", "place": "Hall"}
+    records = [post, post, {"item_name": "No place", "item_status": "lost"}, post, post, post]
+
+    report = asyncio.run(bulk_import.import_posts(_chunks(records), "ndjson", _student(db)))
+
+    assert "aborted" in report
+    assert report["rows"] == 4
+    assert (report["imported"], report["failed"]) == (3, 1)
+    assert report["imported"] + report["failed"] == report["rows"]
+    assert len(report["post_ids"]) == 3
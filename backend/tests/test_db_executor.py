@@ -0,0 +1,39 @@
+import asyncio
+import time
+
+from database import get_db, run_db, executor_stats
+
+SLOW_QUERY = '''
+    WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 3000000)
+    SELECT COUNT(*) FROM n
+'''
+
+
+def _slow_query():
+    db = get_db()
+    cursor = db.cursor()
+    try:
+        cursor.execute(SLOW_QUERY)
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+        db.close()
+
+
+def test_slow_query_does_not_stall_health_check(client):
+    async def main():
+        async with client:
+            slow = asyncio.create_task(run_db(_slow_query))
+            while executor_stats()["active"] == 0:
+                await asyncio.sleep(0.001)
+
+            started = time.perf_counter()
+            response = await client.get("/")
+            elapsed = time.perf_counter() - started
+
+            assert response.status_code == 200
+            assert not slow.done(), "the slow query finished first; make it slower"
+            assert elapsed < 0.25
+            assert await slow == 3000000
+
+    asyncio.run(main())
@@ -0,0 +1,134 @@
+import time
+from datetime import timedelta
+
+import pytest
+
+from database import db_now
+from read_model import refresh_cards
+
+
+@pytest.fixture
+def behind_utc(monkeypatch):
+    # Local time five hours behind UTC, so a local/UTC mix-up expires posts hours early
+    monkeypatch.setenv("TZ", "EST+5")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def _user(cursor):
+    cursor.execute('''
+        INSERT INTO users (full_name, faculty, class_year, phone, email, password)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    ''', ("Clock Test", "School of Science", "1", "0800000000", f"clock-{time.time_ns()}@example.com", "x"))
+    return cursor.lastrowid
+
+
+def _status(cursor, post_id):
+    cursor.execute("SELECT item_status FROM posts WHERE post_id = %s", (post_id,))
+    return cursor.fetchone()[0]
+
+
+def test_db_now_matches_current_timestamp(db, behind_utc):
+    conn = db()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT (julianday(%s) - julianday(CURRENT_TIMESTAMP)) * 86400", (db_now(),))
+        assert abs(cursor.fetchone()[0]) < 5
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def test_new_posts_do_not_expire_early(db, behind_utc):
+    from app import PostCreate, _create_post
+    from expiry import run_expiry_sweep
+
+    conn = db()
+    cursor = conn.cursor()
+    try:
+        student_id = _user(cursor)
+        conn.commit()
+        created = _create_post(PostCreate(item_name="Umbrella", description="Blue", item_status="lost", place="Library"), student_id)
+        cursor.execute('''
+            SELECT (julianday(expires_at) - julianday(CURRENT_TIMESTAMP)) * 24 FROM posts WHERE post_id = %s
+        ''', (created["post_id"],))
+        assert abs(cursor.fetchone()[0] - 30 * 24) < 0.01
+
+        # One due in an hour, one an hour overdue
+        ids = []
+        for offset in (timedelta(hours=1), -timedelta(hours=1)):
+            cursor.execute('''
+                INSERT INTO posts (student_id, item_name, description, item_status, place, expires_at)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            ''', (student_id, "Keys", "Ring of three", "found", "Canteen", db_now() + offset))
+            ids.append(cursor.lastrowid)
+        conn.commit()
+
+        run_expiry_sweep()
+        assert _status(cursor, created["post_id"]) == "lost"
+        assert _status(cursor, ids[0]) == "found"
+        assert _status(cursor, ids[1]) == "expired"
+    finally:
+        cursor.close()
+        conn.close()
+
+
+class _MySQLDialect:
+    """The SQLite connection, reporting itself as MySQL and recording the SQL it runs."""
+
+    dialect = "mysql"
+
+    def __init__(self, conn, statements):
+        self._conn = conn
+        self._statements = statements
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        cursor = self._conn.cursor(*args, **kwargs)
+        execute = cursor.execute
+        def recorded(sql, params=()):
+            self._statements.append(sql)
+            return execute(sql, params)
+        cursor.execute = recorded
+        return cursor
+
+
+def test_create_post_leaves_expires_at_to_mysql(db, monkeypatch):
+    # posts.expires_at is a generated column on MySQL, which rejects explicit values
+    import app
+    from app import PostCreate, _create_post
+
+    conn = db()
+    cursor = conn.cursor()
+    try:
+        student_id = _user(cursor)
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+    statements = []
+    monkeypatch.setattr(app, "get_db", lambda: _MySQLDialect(db(), statements))
+    # The card and facet SQL is MySQL-only from here on; the card is built for real below
+    monkeypatch.setattr(app, "refresh_cards", lambda conn, post_ids: None)
+    monkeypatch.setattr(app, "posts_changed", lambda *args, **kwargs: None)
+    created = _create_post(PostCreate(item_name="Lunch box", description="Red", item_status="found", place="Canteen"), student_id)
+    monkeypatch.undo()
+
+    insert = next(sql for sql in statements if "INSERT INTO posts" in sql)
+    assert "expires_at" not in insert
+
+    conn = db()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT expires_at FROM posts WHERE post_id = %s", (created["post_id"],))
+        assert created["expires_at"] == cursor.fetchone()[0].isoformat()
+        refresh_cards(conn, [created["post_id"]])
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
@@ -0,0 +1,105 @@
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import matching
+from database import db_now
+from matching import MatchIndex, match_index
+
+
+def _post(post_id, item_status="found"):
+    created = datetime(2026, 1, 1) + timedelta(minutes=post_id)
+    return {"post_id": post_id, "item_name": f"black wallet {post_id}", "description": "leather",
+            "item_status": item_status, "place": "Library", "created_at": created,
+            "expires_at": created + timedelta(days=3650)}
+
+
+def _index_with_closed_slots():
+    index = MatchIndex()
+    index.apply([_post(post_id) for post_id in range(1, 1501)])
+    index.apply([], removed_ids=range(1, 1001))
+    assert index.needs_compaction()
+    return index
+
+
+def _matches(index):
+    return {post_id for post_id, _, _ in index.match(_post(0, "lost"), limit=1000)}
+
+
+def test_failed_compaction_keeps_the_index(monkeypatch):
+    index = _index_with_closed_slots()
+    before = _matches(index)
+
+    def fail(post_ids):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(matching, "_load_posts", fail)
+    assert index.compact() is False
+    assert index.size == 1500
+    assert set(index.slot_of) == set(range(1001, 1501))
+    assert _matches(index) == before
+
+
+def test_compaction_drops_closed_slots(monkeypatch):
+    index = _index_with_closed_slots()
+    monkeypatch.setattr(matching, "_load_posts", lambda post_ids: [_post(post_id) for post_id in post_ids])
+    assert index.compact() is True
+    assert index.size == 500
+    assert not index.needs_compaction()
+    assert set(index.slot_of) == set(range(1001, 1501))
+    assert _matches(index) and _matches(index) <= set(range(1001, 1501))
+
+
+@pytest.mark.parametrize("tz", ["EST+5", "ICT-7"])
+def test_expiry_cutoff_uses_the_database_clock(monkeypatch, tz):
+    # Stored expiry times are naive database-clock (UTC on SQLite) values, whatever the local zone
+    monkeypatch.setenv("TZ", tz)
+    time.tzset()
+    try:
+        index = MatchIndex()
+        now = db_now()
+        index.apply([{**_post(1), "expires_at": now + timedelta(hours=1)},
+                     {**_post(2), "expires_at": now - timedelta(hours=1)}])
+        assert _matches(index) == {1}
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+
+def test_matches_skip_posts_expired_in_the_database(db):
+    import json
+    import post_indexes
+    from app import PostCreate, _create_post, _get_post_matches
+
+    conn = db()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            INSERT INTO users (full_name, faculty, class_year, phone, email, password)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        ''', ("Match Test", "School of Science", "1", "0800000000", f"match-{time.time_ns()}@example.com", "x"))
+        student_id = cursor.lastrowid
+        conn.commit()
+        found = _create_post(PostCreate(item_name="Silver Thermos", description="Dented lid", item_status="found",
+                                        place="Stadium"), student_id)["post_id"]
+        lost = _create_post(PostCreate(item_name="Silver Thermos", description="Dented lid", item_status="lost",
+                                       place="Stadium"), student_id)["post_id"]
+        post_indexes.index_worker.submit(lambda: None).result(timeout=10)
+
+        def matched():
+            return [match["post_id"] for match in json.loads(_get_post_matches(lost, 10))["matches"]]
+
+        assert found in matched()
+        # Overdue, but neither the expiry sweep nor an index refresh has run: the index still lists it
+        for table in ("posts", "post_cards"):
+            cursor.execute(f"UPDATE {table} SET expires_at = %s WHERE post_id = %s",
+                           (db_now() - timedelta(minutes=1), found))
+        conn.commit()
+        assert found in {post_id for post_id, _, _ in match_index.match(_post(0, "lost") | {
+            "item_name": "Silver Thermos", "description": "Dented lid", "place": "Stadium"})}
+        assert found not in matched()
+    finally:
+        cursor.close()
+        conn.close()
@@ -0,0 +1,58 @@
+import time
+
+import post_indexes
+from autocomplete import autocomplete_index
+from facets import facet_index
+from matching import match_index
+
+
+def _drain():
+    # Jobs run in order on the one worker: once this no-op is done, earlier updates are applied
+    post_indexes.index_worker.submit(lambda: None).result(timeout=10)
+
+
+def test_one_read_updates_every_index(db, monkeypatch):
+    from app import PostCreate, PostUpdate, _create_post, _update_post, _delete_post
+
+    reads = []
+    read_cards = post_indexes._read_cards
+    monkeypatch.setattr(post_indexes, "_read_cards", lambda post_ids: reads.append(post_ids) or read_cards(post_ids))
+
+    conn = db()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            INSERT INTO users (full_name, faculty, class_year, phone, email, password)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        ''', ("Index Test", "School of Science", "1", "0800000000", f"index-{time.time_ns()}@example.com", "x"))
+        student_id = cursor.lastrowid
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+    post_id = _create_post(PostCreate(item_name="Green Backpack", description="Canvas", item_status="lost",
+                                      place="Gym"), student_id)["post_id"]
+    _drain()
+    assert reads == [[post_id]]
+    assert post_id in match_index.slot_of
+    assert post_id in facet_index.posts
+    assert post_id in autocomplete_index.posts
+
+    _update_post(post_id, PostUpdate(item_status="returned"), student_id)
+    _drain()
+    assert len(reads) == 2
+    assert post_id not in match_index.slot_of
+    assert post_id not in facet_index.posts
+    assert post_id in autocomplete_index.posts
+
+    _delete_post(post_id, student_id)
+    _drain()
+    assert len(reads) == 3
+    assert post_id not in autocomplete_index.posts
+
+
+def test_schedule_load_builds_every_index(db):
+    post_indexes.schedule_load()
+    _drain()
+    assert match_index.ready and facet_index.ready and autocomplete_index.ready
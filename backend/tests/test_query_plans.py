@@ -0,0 +1,23 @@
+import migrations
+from migrations import HOT_QUERIES, check_query_plans
+
+
+def _regressions(db):
+    conn = db()
+    cursor = conn.cursor()
+    try:
+        return check_query_plans(cursor, conn.dialect)
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def test_hot_queries_use_an_index(db):
+    assert _regressions(db) == []
+
+
+def test_full_scan_is_reported(db, monkeypatch):
+    # users.full_name has no index: the check must flag it
+    scan = ("scan", "SELECT student_id FROM users WHERE full_name = %s", ("someone",))
+    monkeypatch.setattr(migrations, "HOT_QUERIES", HOT_QUERIES + [scan])
+    assert _regressions(db) == [("scan", "users")]
@@ -0,0 +1,22 @@
+import os
+
+import uploads
+
+
+def test_derivatives_are_deleted_under_the_storage_lock():
+    path = os.path.join(uploads.UPLOAD_DIR, "orphan-gc-test.png")
+    with open(path, "wb") as f:
+        f.write(b"x" * 10)
+    os.utime(path, (0, 0))
+
+    held = []
+    def on_delete(filename):
+        # A concurrent upload of the same bytes would block on this lock until GC is done
+        held.append((filename, uploads._storage_thread_lock.locked()))
+        return 5
+
+    report = uploads.collect_garbage(set(), grace_seconds=60, on_delete=on_delete)
+
+    assert held == [("orphan-gc-test.png", True)]
+    assert not os.path.exists(path)
+    assert report["deleted"] == 1 and report["reclaimed_bytes"] >= 15
@@ -0,0 +1,32 @@
+import sys
+
+from database import get_db
+from images import delete_derivatives
+from uploads import collect_garbage, upload_filename, UPLOAD_GC_GRACE_SECONDS
+
+def referenced_uploads():
+    """Every upload still referenced by a post image or a profile photo."""
+    db = get_db()
+    cursor = db.cursor()
+    
+    try:
+        cursor.execute('''
+            SELECT image_url FROM post_images
+            UNION
+            SELECT profile_photo_url FROM users WHERE profile_photo_url IS NOT NULL
+        ''')
+        return {name for (url,) in cursor.fetchall() if (name := upload_filename(url))}
+    finally:
+        cursor.close()
+        db.close()
+
+def run_upload_gc(grace_seconds=UPLOAD_GC_GRACE_SECONDS):
+    """Reclaim unreferenced uploads older than the grace period; safe to run while uploads happen."""
+    report = collect_garbage(referenced_uploads(), grace_seconds, on_delete=delete_derivatives)
+    print(f"✅ Upload GC: deleted {report['deleted']} of {report['scanned']} files, "
+          f"{report['stale_sessions']} stale sessions, reclaimed {report['reclaimed_bytes']} bytes")
+    return report
+
+if __name__ == "__main__":
+    # Usage: python upload_gc.py [grace_seconds]
+    run_upload_gc(int(sys.argv[1]) if len(sys.argv) > 1 else UPLOAD_GC_GRACE_SECONDS)
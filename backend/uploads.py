@@ -0,0 +1,243 @@
+import hashlib
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl  # cross-process locking on Linux/macOS (Docker)
+except ImportError:
+    fcntl = None
+
+# Upload settings
+UPLOAD_DIR = "uploads"
+INCOMING_DIR = "uploads_incoming"   # partial uploads; kept outside the public /uploads mount
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+# Magic bytes -> extension; the client's filename is never trusted
+IMAGE_SIGNATURES = [
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+]
+
+UPLOAD_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+os.makedirs(INCOMING_DIR, exist_ok=True)
+
+
+class UploadError(Exception):
+    """Upload rejected; carries the HTTP status code to answer with."""
+
+    def __init__(self, status_code, detail):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def sniff_image_type(head):
+    """Return the file extension for the image format in `head`, or None if unsupported."""
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+def _read_head(path, size=16):
+    with open(path, "rb") as f:
+        return f.read(size)
+
+def _append(path, data):
+    with open(path, "ab") as f:
+        f.write(data)
+
+def _discard(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def content_path(digest, extension):
+    """Sharded location for content: ab/cd/abcd....ext (relative to UPLOAD_DIR)."""
+    return f"{digest[:2]}/{digest[2:4]}/{digest}.{extension}"
+
+_storage_thread_lock = threading.Lock()
+
+@contextmanager
+def storage_lock():
+    """Serialize storing and garbage collection so GC never deletes a file an upload just reused."""
+    with _storage_thread_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(INCOMING_DIR, ".storage.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _store(part_path):
+    """Check the magic bytes of a completed upload and move it to its content-addressed path.
+
+    Identical bytes map to the same file, so a re-upload only refreshes its mtime
+    (which restarts the GC grace period) and the new copy is dropped.
+    """
+    extension = sniff_image_type(_read_head(part_path))
+    if extension is None:
+        _discard(part_path)
+        raise UploadError(415, "Unsupported file type, please upload a JPEG, PNG, GIF or WebP image")
+    filename = content_path(_file_sha256(part_path), extension)
+    target = os.path.join(UPLOAD_DIR, filename)
+    with storage_lock():
+        if os.path.exists(target):
+            os.utime(target)
+            _discard(part_path)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(part_path, target)
+    return filename
+
+
+# ========== SINGLE-REQUEST UPLOADS ==========
+def save_stream(chunks):
+    """Write an iterable of byte chunks to disk, enforcing UPLOAD_MAX_BYTES; returns the stored filename."""
+    part_path = os.path.join(INCOMING_DIR, f"{uuid.uuid4().hex}.part")
+    size = 0
+    try:
+        with open(part_path, "wb") as f:
+            for chunk in chunks:
+                size += len(chunk)
+                if size > UPLOAD_MAX_BYTES:
+                    raise UploadError(413, f"File is larger than {UPLOAD_MAX_BYTES} bytes")
+                f.write(chunk)
+    except BaseException:
+        _discard(part_path)
+        raise
+    return _store(part_path)
+
+def iter_file_chunks(file):
+    """Read a SpooledTemporaryFile (UploadFile.file) in UPLOAD_CHUNK_SIZE pieces."""
+    file.seek(0)
+    while True:
+        chunk = file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
+# ========== RESUMABLE UPLOADS ==========
+# Protocol: create a session, PUT chunks at the current offset, then finalize.
+# The session's offset is simply the size of its .part file, so it survives restarts.
+_session_locks = {}
+_session_locks_guard = threading.Lock()
+
+def _session_path(upload_id):
+    if not UPLOAD_ID_PATTERN.match(upload_id):
+        raise UploadError(404, "Upload session not found")
+    path = os.path.join(INCOMING_DIR, f"{upload_id}.part")
+    if not os.path.exists(path):
+        raise UploadError(404, "Upload session not found")
+    return path
+
+def _session_lock(upload_id):
+    with _session_locks_guard:
+        return _session_locks.setdefault(upload_id, threading.Lock())
+
+def create_session():
+    upload_id = uuid.uuid4().hex
+    open(os.path.join(INCOMING_DIR, f"{upload_id}.part"), "wb").close()
+    return {"upload_id": upload_id, "offset": 0, "chunk_size": UPLOAD_CHUNK_SIZE, "max_bytes": UPLOAD_MAX_BYTES}
+
+def session_offset(upload_id):
+    return os.path.getsize(_session_path(upload_id))
+
+def append_chunk(upload_id, offset, data):
+    """Append data at `offset`; a mismatched offset returns 409 so the client can resume from the real one."""
+    path = _session_path(upload_id)
+    with _session_lock(upload_id):
+        current = os.path.getsize(path)
+        if offset != current:
+            raise UploadError(409, f"Offset mismatch, upload is at byte {current}")
+        if current + len(data) > UPLOAD_MAX_BYTES:
+            raise UploadError(413, f"File is larger than {UPLOAD_MAX_BYTES} bytes")
+        _append(path, data)
+        return current + len(data)
+
+def finalize_session(upload_id):
+    path = _session_path(upload_id)
+    with _session_lock(upload_id):
+        try:
+            return _store(path)
+        finally:
+            with _session_locks_guard:
+                _session_locks.pop(upload_id, None)
+
+
+# ========== GARBAGE COLLECTION ==========
+UPLOAD_GC_GRACE_SECONDS = int(os.getenv("UPLOAD_GC_GRACE_SECONDS", str(24 * 3600)))
+
+def upload_filename(url):
+    """Normalize an image URL (relative or absolute) to its path under UPLOAD_DIR, or None."""
+    if not url or "/uploads/" not in url:
+        return None
+    return url.split("/uploads/", 1)[1].split("?", 1)[0]
+
+def iter_stored_files():
+    """Yield (relative filename, absolute path) for every original upload (derivatives excluded)."""
+    for root, dirs, files in os.walk(UPLOAD_DIR):
+        dirs[:] = [d for d in dirs if d != "derived"]
+        for name in files:
+            path = os.path.join(root, name)
+            yield os.path.relpath(path, UPLOAD_DIR).replace(os.sep, "/"), path
+
+def collect_garbage(referenced, grace_seconds=UPLOAD_GC_GRACE_SECONDS, on_delete=None):
+    """Delete uploads not in `referenced` whose mtime is older than the grace period.
+
+    The grace period protects files that were just uploaded but are not saved in a
+    post/profile yet; the mtime is re-checked under storage_lock() right before
+    deleting, so an upload that reuses a file concurrently keeps it alive.
+    Stale resumable sessions are removed as well. Returns a summary dict.
+    """
+    cutoff = time.time() - grace_seconds
+    report = {"scanned": 0, "deleted": 0, "reclaimed_bytes": 0, "stale_sessions": 0}
+
+    for filename, path in list(iter_stored_files()):
+        report["scanned"] += 1
+        if filename in referenced:
+            continue
+        with storage_lock():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime > cutoff:
+                continue
+            _discard(path)
+            report["deleted"] += 1
+            report["reclaimed_bytes"] += stat.st_size
+            # Still under the lock: an upload of the same bytes must not re-create derivatives in between
+            if on_delete:
+                report["reclaimed_bytes"] += on_delete(filename)
+
+    for name in os.listdir(INCOMING_DIR):
+        path = os.path.join(INCOMING_DIR, name)
+        if name.endswith(".part") and os.path.getmtime(path) < cutoff:
+            report["reclaimed_bytes"] += os.path.getsize(path)
+            _discard(path)
+            report["stale_sessions"] += 1
+
+    return report
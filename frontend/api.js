@@ -2,17 +2,24 @@
 const API_BASE = "http://localhost:8000";
 
 class LostFoundAPI {
+    // Bearer header for the access token issued by /auth/login (empty when logged out)
+    static authHeaders() {
+        const token = localStorage.getItem('access_token');
+        return token ? { 'Authorization': `Bearer ${token}` } : {};
+    }
+
     static async request(endpoint, options = {}) {
         const url = `${API_BASE}${endpoint}`;
         const config = {
+            ...options,
             headers: {
                 'Content-Type': 'application/json',
+                ...this.authHeaders(),
                 ...options.headers,
             },
-            ...options
         };
         
-        console.log(`API Request: ${config.method} ${url}`, config.body ? JSON.parse(config.body) : 'No body');
+        console.log(`API Request: ${config.method} ${url}`, typeof config.body === 'string' ? JSON.parse(config.body) : (config.body || 'No body'));
         
         try {
             const response = await fetch(url, config);
@@ -55,11 +62,93 @@ class LostFoundAPI {
     }
 
     // Posts endpoints
+    // Returns one page: { posts, next_cursor }. Pass filters.cursor to fetch the next page.
     static async getPosts(filters = {}) {
-        const params = new URLSearchParams(filters);
+        const params = new URLSearchParams();
+        Object.entries(filters).forEach(([key, value]) => {
+            if (value !== undefined && value !== null && value !== '') {
+                params.append(key, value);
+            }
+        });
         return this.request(`/posts?${params}`);
     }
 
+    // Infinite scroll: loads the next page whenever `sentinel` scrolls into view.
+    // onPage(posts) is called for each page; returns a function that stops loading.
+    static infiniteScrollPosts(sentinel, onPage, filters = {}) {
+        let nextCursor = null;
+        let loading = false;
+        let done = false;
+
+        const loadNext = async () => {
+            if (loading || done) return;
+            loading = true;
+            try {
+                const data = await this.getPosts({ ...filters, cursor: nextCursor });
+                nextCursor = data.next_cursor;
+                done = !nextCursor;
+                onPage(data.posts || [], done);
+                if (done) observer.disconnect();
+            } finally {
+                loading = false;
+            }
+        };
+
+        const observer = new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                loadNext().catch(error => console.error('Failed to load more posts:', error));
+            }
+        }, { rootMargin: '400px' });
+        observer.observe(sentinel);
+
+        const stop = () => {
+            done = true;
+            observer.disconnect();
+        };
+        stop.loadNext = loadNext;
+        return stop;
+    }
+
+    // Filter counts for the home page: { total, item_status, faculty, place, created }.
+    // Pass the same item_status/search as getPosts to count within the current results.
+    static async getPostFacets(filters = {}) {
+        const params = new URLSearchParams();
+        ['item_status', 'search'].forEach(key => {
+            if (filters[key]) params.append(key, filters[key]);
+        });
+        return this.request(`/posts/facets?${params}`);
+    }
+
+    // Known item names / places starting with `q` (field: 'item_name' or 'place'), most used first
+    static async autocomplete(field, q, limit = 8) {
+        const params = new URLSearchParams({ field, q, limit });
+        const response = await fetch(`${API_BASE}/posts/autocomplete?${params}`);
+        if (!response.ok) return [];
+        return (await response.json()).suggestions || [];
+    }
+
+    // Fills the <datalist> linked to `input` with suggestions as the user types
+    static attachAutocomplete(input, field, delay = 150) {
+        const datalist = document.getElementById(input.getAttribute('list'));
+        let timer = null;
+        let latest = 0;
+        input.addEventListener('input', () => {
+            clearTimeout(timer);
+            const q = input.value.trim();
+            if (!q) return;
+            timer = setTimeout(async () => {
+                const requestId = ++latest;
+                const suggestions = await this.autocomplete(field, q).catch(() => []);
+                if (requestId !== latest) return;  // a newer keystroke already asked
+                datalist.replaceChildren(...suggestions.map(({ value }) => {
+                    const option = document.createElement('option');
+                    option.value = value;
+                    return option;
+                }));
+            }, delay);
+        });
+    }
+
     static async createPost(postData) {
         return this.request('/posts', {
             method: 'POST',
@@ -67,14 +156,79 @@ class LostFoundAPI {
         });
     }
 
+    // Follows next_cursor until every page of the user's posts is loaded
     static async getUserPosts(studentId) {
-        return this.request(`/posts/user/${studentId}`);
+        const posts = [];
+        let cursor = null;
+        do {
+            const params = new URLSearchParams({ limit: 100 });
+            if (cursor) params.append('cursor', cursor);
+            const data = await this.request(`/posts/user/${studentId}?${params}`);
+            posts.push(...(data.posts || []));
+            cursor = data.next_cursor;
+        } while (cursor);
+        return { posts };
     }
 
     static async getPostDetails(postId) {
         return this.request(`/posts/${postId}`);
     }
 
+    // Likely matches for a lost (or found) post: open posts of the opposite status, best first
+    static async getPostMatches(postId, limit = 10) {
+        return this.request(`/posts/${postId}/matches?limit=${limit}`);
+    }
+
+    // Live feed over Server-Sent Events. handlers: { created, updated, deleted, expired, reset },
+    // each called with the event data ({ post_ids, ... }). EventSource reconnects by itself and
+    // sends Last-Event-ID, so missed events are replayed. Returns the EventSource (call .close()).
+    static subscribePostEvents(handlers) {
+        const source = new EventSource(`${API_BASE}/events/posts`);
+        Object.entries(handlers).forEach(([name, handler]) => {
+            source.addEventListener(name, event => handler(JSON.parse(event.data || '{}')));
+        });
+        return source;
+    }
+
+    // Upload endpoints
+    // Resumable upload: sends the file in chunks and, after a network error,
+    // asks the server for its current offset and continues from there.
+    static async uploadFileResumable(file, maxRetries = 5) {
+        const session = await this.request('/upload/sessions', { method: 'POST' });
+        const uploadId = session.upload_id;
+        let offset = 0;
+        let retries = 0;
+
+        while (offset < file.size) {
+            const chunk = file.slice(offset, offset + session.chunk_size);
+            try {
+                const response = await fetch(`${API_BASE}/upload/sessions/${uploadId}?offset=${offset}`, {
+                    method: 'PUT',
+                    headers: { 'Content-Type': 'application/octet-stream' },
+                    body: chunk
+                });
+                const data = await response.json();
+                if (response.ok) {
+                    offset = data.offset;
+                    retries = 0;
+                    continue;
+                }
+                if (response.status !== 409) {
+                    throw new Error(data.detail || `Upload failed with status ${response.status}`);
+                }
+            } catch (error) {
+                if (++retries > maxRetries) throw error;
+                console.log(`Chunk upload failed, resuming (attempt ${retries})...`, error);
+                await new Promise(resolve => setTimeout(resolve, 500 * retries));
+            }
+            // Resume from wherever the server says the upload is
+            const status = await this.request(`/upload/sessions/${uploadId}`);
+            offset = status.offset;
+        }
+
+        return this.request(`/upload/sessions/${uploadId}/finalize`, { method: 'POST' });
+    }
+
     // User endpoints
     static async getUserProfile(studentId) {
         return this.request(`/users/${studentId}`);
@@ -138,6 +292,16 @@ class LostFoundAPI {
         });
     }
 
+    // Bulk import posts from a .csv or .ndjson File; the browser streams the file as the body
+    static async importPosts(file) {
+        const format = file.name.toLowerCase().endsWith('.csv') ? 'csv' : 'ndjson';
+        return this.request(`/posts/import?format=${format}`, {
+            method: 'POST',
+            headers: { 'Content-Type': format === 'csv' ? 'text/csv' : 'application/x-ndjson' },
+            body: file
+        });
+    }
+
     // Temporary debug function - call this in console to test endpoints
     static async testEndpoints(studentId) {
         const testData = { full_name: "Test Name" };